@@ -0,0 +1,196 @@
+"""
+Offline benchmarks of the Pulsedive client.
+
+The client is measured against :class:`pulsedive.testing.StubServer` running
+in a separate process, so neither the network nor the server's allocations
+affect the results. For every benchmark the throughput, the p50 and p99
+latency of the API calls and the peak memory allocated by the client are
+reported::
+
+    python benchmarks/bench_client.py
+    python benchmarks/bench_client.py --quick --json results.json
+    python benchmarks/bench_client.py --compare baseline.json --tolerance 0.25
+    python benchmarks/bench_client.py --transport urllib3 --decoder orjson
+
+With ``--compare`` the process exits with status 1 when a benchmark is
+slower or uses more memory than the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pulsedive import Pulsedive  # noqa: E402
+from pulsedive.testing import StubServer  # noqa: E402
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    BENCHMARKS.append(func)
+    return func
+
+
+@benchmark
+def single_lookup(pud, size):
+    for i in range(size):
+        pud.indicator(value='host{}.example'.format(i))
+    return size
+
+
+@benchmark
+def bulk_lookup(pud, size):
+    values = ['host{}.example'.format(i) for i in range(size * 4)]
+    return sum(1 for _ in pud.indicator.get_many(values=values, max_workers=16))
+
+
+@benchmark
+def links(pud, size):
+    return len(pud.feed.links(1)['results'])
+
+
+@benchmark
+def links_stream(pud, size):
+    return sum(1 for _ in pud.feed.iter_links(1))
+
+
+@benchmark
+def csv_export(pud, size):
+    with tempfile.NamedTemporaryFile(suffix='.csv') as f:
+        pud.search.to_csv(filename=f.name, limit=None)
+        return sum(1 for _ in open(f.name)) - 1
+
+
+def serve(conn, options):
+    server = StubServer(**options)
+    conn.send(server.url)
+    server.serve_forever()
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def run(names=None, quick=False, latency=0.0, error_rate=0.0, transport='requests',
+        decoder='auto', compress=False):
+    size = 50 if quick else 500
+    options = {
+        'latency': latency,
+        'error_rate': error_rate,
+        'links_size': 2000 if quick else 50000,
+        'search_size': 2000 if quick else 50000,
+        'seed': 0,
+        'compress': compress,
+    }
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve, args=(child, options))
+    server.daemon = True
+    server.start()
+    url = parent.recv()
+
+    results = {}
+    try:
+        for func in BENCHMARKS:
+            if names and func.__name__ not in names:
+                continue
+            latencies = []
+            decode_times = []
+            with Pulsedive(base_url=url, pool_maxsize=16, retry=3 if error_rate else None,
+                           transport=transport, decoder=decoder) as pud:
+                pud.add_hook('after_response', lambda event: latencies.append(event.elapsed))
+                pud.add_hook('after_response', lambda event: decode_times.append(event.decode_time or 0))
+                # Load the transport and the decoder outside of the measurements
+                pud.transport, pud.decoder
+                tracemalloc.start()
+                start = time.perf_counter()
+                ops = func(pud, size)
+                wall = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            results[func.__name__] = {
+                'ops': ops,
+                'requests': len(latencies),
+                'wall': wall,
+                'throughput': ops / wall,
+                'p50': percentile(latencies, 0.5),
+                'p99': percentile(latencies, 0.99),
+                'peak_kb': peak / 1024.0,
+                'decode': sum(decode_times),
+            }
+    finally:
+        server.terminate()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if res['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append('{}: throughput {:.1f}/s < {:.1f}/s'.format(
+                name, res['throughput'], base['throughput']))
+        if res['p99'] and base['p99'] and res['p99'] > base['p99'] * (1 + tolerance):
+            regressions.append('{}: p99 {:.2f}ms > {:.2f}ms'.format(
+                name, res['p99'] * 1000, base['p99'] * 1000))
+        if res['peak_kb'] > base['peak_kb'] * (1 + tolerance):
+            regressions.append('{}: peak memory {:.0f}KB > {:.0f}KB'.format(
+                name, res['peak_kb'], base['peak_kb']))
+    return regressions
+
+
+def report(results):
+    print('{:<15} {:>8} {:>12} {:>10} {:>10} {:>12} {:>10}'.format(
+        'benchmark', 'ops', 'ops/s', 'p50 ms', 'p99 ms', 'peak KB', 'decode ms'))
+    for name, res in results.items():
+        print('{:<15} {:>8} {:>12.1f} {:>10.2f} {:>10.2f} {:>12.0f} {:>10.2f}'.format(
+            name, res['ops'], res['throughput'], (res['p50'] or 0) * 1000,
+            (res['p99'] or 0) * 1000, res['peak_kb'], res['decode'] * 1000))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('names', nargs='*', help='Benchmarks to run. Default: all')
+    parser.add_argument('--quick', action='store_true', help='Use small workloads')
+    parser.add_argument('--latency', type=float, default=0.0, help='Server latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of 503 responses')
+    parser.add_argument('--transport', default='requests',
+                        help='HTTP transport: requests, urllib3 or httpx. Default: requests')
+    parser.add_argument('--decoder', default='auto',
+                        help='JSON decoder: auto, orjson, msgspec or json. Default: auto')
+    parser.add_argument('--compress', action='store_true',
+                        help='Gzip responses, as the API does over the network')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', help='Baseline results to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative regression. Default: 0.2')
+    args = parser.parse_args(argv)
+
+    results = run(args.names, quick=args.quick, latency=args.latency,
+                  error_rate=args.error_rate, transport=args.transport, decoder=args.decoder,
+                  compress=args.compress)
+    report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print('REGRESSION', line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Import-time benchmark of the Pulsedive package.
+
+Every sample is a fresh interpreter that imports ``pulsedive`` and creates a
+client. The median and best wall times are reported with the heavy modules
+that ended up loaded::
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --max-ms 10
+
+With ``--max-ms`` the process exits with status 1 when the median time of
+``import pulsedive`` is above the limit or a heavy module was loaded.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Modules that should only be loaded when a feature needing them is used
+HEAVY = ('requests', 'urllib3', 'httpx', 'aiohttp', 'sqlite3', 'concurrent.futures',
+         'email.utils', 'http.client', 'ssl', 'orjson', 'msgspec')
+
+SAMPLE = """
+import sys, time
+start = time.perf_counter()
+import pulsedive
+imported = time.perf_counter()
+pulsedive.Pulsedive()
+created = time.perf_counter()
+print(json.dumps({{
+    'import': imported - start,
+    'client': created - imported,
+    'heavy': [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def sample():
+    # json is imported first so that it is not counted as a cost of the package
+    code = 'import json\n' + SAMPLE.format(heavy=HEAVY)
+    out = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT)
+    return json.loads(out.decode('utf-8'))
+
+
+def run(samples=20):
+    results = [sample() for _ in range(samples)]
+    imports = [r['import'] for r in results]
+    clients = [r['client'] for r in results]
+    return {
+        'import_median_ms': statistics.median(imports) * 1000,
+        'import_min_ms': min(imports) * 1000,
+        'client_median_ms': statistics.median(clients) * 1000,
+        'heavy': sorted(set(name for r in results for name in r['heavy'])),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--samples', type=int, default=20, help='Number of interpreters. Default: 20')
+    parser.add_argument('--max-ms', type=float, help='Fail above this median import time')
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args(argv)
+
+    results = run(args.samples)
+    print('import pulsedive  median {:.2f}ms  min {:.2f}ms'.format(
+        results['import_median_ms'], results['import_min_ms']))
+    print('Pulsedive()       median {:.2f}ms'.format(results['client_median_ms']))
+    print('heavy modules     {}'.format(', '.join(results['heavy']) or 'none'))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.max_ms is not None:
+        if results['import_median_ms'] > args.max_ms:
+            print('REGRESSION import took {:.2f}ms > {:.2f}ms'.format(
+                results['import_median_ms'], args.max_ms))
+            return 1
+        if results['heavy']:
+            print('REGRESSION heavy modules imported: {}'.format(', '.join(results['heavy'])))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
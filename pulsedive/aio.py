@@ -0,0 +1,439 @@
+"""
+Asyncio client for the Pulsedive API.
+
+This requires Python 3.6 or later and ``aiohttp`` which can be installed
+with::
+
+    pip install pulsedive[async]
+"""
+import asyncio
+import time
+from collections import deque
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from .client import (IndicatorClient, ThreatClient, FeedClient, SearchClient,
+                     AnalyzeClient, BulkResult, PULSEDIVE_URL, _bulk_queries)
+from .decoders import get_decoder
+from .exceptions import PulsediveException
+from .transport import _encode_params
+
+# Request options of the sync client that AsyncPulsedive does not implement
+SYNC_ONLY_OPTIONS = ('cache', 'priority')
+
+
+async def _pop_done(pending, ordered):
+    """
+    Waits for and removes the next finished task(s) from ``pending``
+    """
+    if ordered:
+        return [await pending.popleft()]
+    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    for task in done:
+        pending.remove(task)
+    return [task.result() for task in done]
+
+
+class AsyncIndicatorClient(IndicatorClient):
+    """
+    :class:`~pulsedive.client.IndicatorClient` with an asynchronous bulk lookup
+    """
+
+    async def get_many(self, values=None, iids=None, schema=False,
+                       ordered=True, **kwargs):
+        """
+        Async generator counterpart of
+        :meth:`pulsedive.client.IndicatorClient.get_many`::
+
+            async for res in pud.indicator.get_many(values=values):
+                ...
+
+        Concurrency is bounded by the client's ``max_concurrency``, and at
+        most ``2 * max_concurrency`` lookups are pending at any time so large
+        inputs are consumed lazily.
+        """
+        async def fetch(iid, value):
+            try:
+                result = await self.get(iid=iid, value=value, schema=schema, **kwargs)
+            except Exception as e:
+                return BulkResult(iid, value, None, e)
+            return BulkResult(iid, value, result, None)
+
+        window = 2 * self.pud.max_concurrency
+        pending = deque()
+        try:
+            for iid, value in _bulk_queries(values, iids):
+                pending.append(asyncio.ensure_future(fetch(iid, value)))
+                if len(pending) >= window:
+                    for res in await _pop_done(pending, ordered):
+                        yield res
+            while pending:
+                for res in await _pop_done(pending, ordered):
+                    yield res
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class AsyncThreatClient(ThreatClient):
+    """
+    :class:`~pulsedive.client.ThreatClient` with an asynchronous iteration
+    over the linked indicators
+    """
+
+    async def iter_links(self, tid, **kwargs):
+        """
+        Async generator counterpart of
+        :meth:`pulsedive.client.ThreatClient.iter_links`. The response is
+        read whole before its links are yielded.
+
+        :arg tid: Threat ID
+        """
+        ret = await self.links(tid, **kwargs)
+        for link in ret.get('results', []):
+            yield link
+
+
+class AsyncFeedClient(FeedClient):
+    """
+    :class:`~pulsedive.client.FeedClient` with an asynchronous iteration
+    over the linked indicators
+    """
+
+    async def iter_links(self, fid, **kwargs):
+        """
+        Async generator counterpart of
+        :meth:`pulsedive.client.FeedClient.iter_links`. The response is
+        read whole before its links are yielded.
+
+        :arg fid: Feed ID
+        """
+        ret = await self.links(fid, **kwargs)
+        for link in ret.get('results', []):
+            yield link
+
+    def diff(self, fid, update=True, **kwargs):
+        """
+        Feed snapshots are kept on disk by the sync client, see
+        :meth:`pulsedive.client.FeedClient.diff`
+        """
+        raise PulsediveException('"diff" is not supported by AsyncPulsedive, use a Pulsedive '
+                                 'client created with "snapshots=<directory>"')
+
+
+class AsyncSearchClient(SearchClient):
+    """
+    :class:`~pulsedive.client.SearchClient` with awaitable exports and
+    asynchronous paging
+    """
+
+    async def iter_indicators(self, value='', prefetch=True, **kwargs):
+        """
+        Async generator counterpart of
+        :meth:`pulsedive.client.SearchClient.iter_indicators`::
+
+            async for ind in pud.search.iter_indicators('zeus'):
+                ...
+
+        With ``prefetch``, the next page is requested while the results of
+        the current one are being consumed.
+        """
+        kwargs['limit'] = None
+        if kwargs.pop('export', False):
+            raise PulsediveException('"export" is not supported when iterating, use "to_csv"')
+
+        def fetch(page):
+            return asyncio.ensure_future(self.indicator(value=value, page=page, **kwargs))
+
+        task = None
+        try:
+            page = await fetch(0)
+            while page is not None:
+                next_page = page.get('page_next')
+                if next_page is not None and next_page == page.get('page_current'):
+                    next_page = None
+                if next_page is not None:
+                    task = fetch(next_page) if prefetch else None
+
+                results = page.get('results', [])
+                page = None
+                for result in results:
+                    yield result
+                results = None
+
+                if task is not None:
+                    page, task = await task, None
+                elif next_page is not None:
+                    page = await fetch(next_page)
+        finally:
+            if task is not None:
+                task.cancel()
+
+    async def _export(self, params, **kwargs):
+        r = await self.pud.get('search.php', params=params, raw=True, **kwargs)
+        return await r.text()
+
+    async def to_csv(self, value='', filename=None, resume=False, parts=1, progress=None,
+                     chunk_size=65536, **kwargs):
+        """
+        Searches for indicators and saves the result to ``filename``.
+
+        All arguments aside from ``filename``, ``resume``, ``parts``,
+        ``progress`` and ``chunk_size`` will be passed to
+        ``pud.search.indicator()`` with ``export=True``.
+
+        Resumed and split downloads are only supported by
+        :meth:`pulsedive.client.SearchClient.to_csv`.
+
+        :arg value: Search value for the indicator
+        :arg filename: Destination filename of the csv
+        :arg progress: Callable receiving a :class:`~pulsedive.download.Progress`,
+            with the bytes downloaded and bytes per second, after every chunk
+        :return: Size of the file in bytes
+        """
+        from .download import _Tracker
+
+        if resume or parts != 1:
+            raise PulsediveException('"resume" and "parts" are not supported by AsyncPulsedive')
+        res = await self(value=value, raw=True, stream=True, export=True, **kwargs)
+        try:
+            res.raise_for_status()
+            tracker = _Tracker(progress, res.content_length)
+            with open(filename, 'wb') as f:
+                async for chunk in res.content.iter_chunked(chunk_size):
+                    f.write(chunk)
+                    tracker.add(len(chunk))
+        finally:
+            res.release()
+        return tracker.bytes
+
+
+class AsyncAnalyzeClient(AnalyzeClient):
+    """
+    :class:`~pulsedive.client.AnalyzeClient` polling the results of bulk
+    submissions in tasks. The polling delays can be changed on the instance.
+    """
+    initial_delay = 2
+    max_delay = 30
+    backoff = 1.5
+    timeout = 600
+
+    def submit_many(self, values, enrich=True, probe=False, **kwargs):
+        """
+        Counterpart of :meth:`pulsedive.client.AnalyzeClient.submit_many`
+        returning a list of ``asyncio`` tasks, one per value, that resolve to
+        the results of the analysis. It has to be called from a running event
+        loop::
+
+            results = await asyncio.gather(*pud.analyze.submit_many(values))
+
+        Every task submits its value and polls its results after
+        ``initial_delay`` seconds, then after delays growing by ``backoff`` up
+        to ``max_delay``. A task that is still not ready after ``timeout``
+        seconds fails with a :class:`~pulsedive.PulsediveException`.
+
+        :param values: Values to be processed
+        :param enrich: Whether to enrich the indicators
+        :param probe: Whether to probe the indicators
+        """
+        return [asyncio.ensure_future(self._analyze(value, enrich=enrich, probe=probe, **kwargs))
+                for value in values]
+
+    async def _analyze(self, value, **kwargs):
+        from .polling import is_pending, poll_options
+
+        res = await self(value, **kwargs)
+        options = poll_options(kwargs)
+        qid = res['qid']
+        submitted = time.monotonic()
+        delay = self.initial_delay
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                result = await self.results(qid, **options)
+                if not is_pending(result):
+                    return result
+            except PulsediveException as e:
+                if not is_pending(e):
+                    raise
+            elapsed = time.monotonic() - submitted
+            if elapsed > self.timeout:
+                raise PulsediveException('Results of qid {} not ready after {:.0f} seconds'.format(
+                    qid, elapsed))
+            delay = min(self.max_delay, delay * self.backoff)
+
+
+class AsyncPulsedive:
+    """
+    Asyncio counterpart of :class:`~pulsedive.Pulsedive`.
+
+    The instance has the same ``indicator``, ``threat``, ``feed``, ``search``,
+    and ``analyze`` attributes and the same methods, but every method returns
+    an awaitable::
+
+        from pulsedive.aio import AsyncPulsedive
+
+        async with AsyncPulsedive(max_concurrency=200) as pud:
+            ind = await pud.indicator(value='pulsedive.com')
+            links = await pud.threat.links(1)
+
+    Raw responses are ``aiohttp.ClientResponse`` objects whose body has
+    already been read. With ``stream=True`` the body is not read, and the
+    response holds its ``max_concurrency`` slot until the body has been read
+    or the response is released.
+
+    :param api_key: This parameter is optional. Pulsedive allows access to
+        the API without a key
+    :param sanitize: Sets the default `sanitize` option for all requests
+    :param pretty: Sets the default `pretty` option for all requests
+    :param raw: If set to True, the raw responses are returned
+    :param max_concurrency: Maximum number of requests in flight at once.
+        Other requests wait for a free slot. Default: 100
+    :param limit_per_host: Maximum number of open connections to the API host.
+        Default: same as ``max_concurrency``
+    :param base_url: Root of the API. Default: ``https://pulsedive.com/api``
+    :param session: An existing ``aiohttp.ClientSession`` to use instead of
+        creating one. The client will not close a session it did not create.
+    :param decoder: JSON decoder of the response bodies, see
+        :mod:`pulsedive.decoders`. Default: ``'auto'``
+    :param kwargs: Other parameters that will be passed on to all calls to
+        ``aiohttp.ClientSession.request()``, such as `proxy` and `ssl`
+    """
+
+    def __init__(self, api_key=None, sanitize=True, pretty=False, raw=False,
+                 max_concurrency=100, limit_per_host=None,
+                 base_url=PULSEDIVE_URL, session=None, decoder='auto', **kwargs):
+        if aiohttp is None:
+            raise ImportError('AsyncPulsedive requires aiohttp. '
+                              'Install it with "pip install pulsedive[async]"')
+
+        self.api_key = api_key
+        self.pretty = pretty
+        self.sanitize = sanitize
+        self.args = kwargs
+        self.raw = raw
+        self.base_url = base_url.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.limit_per_host = limit_per_host or max_concurrency
+
+        self._owns_session = session is None
+        self.session = session
+        self._semaphore = None
+        self.decoder = get_decoder(decoder)
+
+        self.indicator = AsyncIndicatorClient(self)
+        self.threat = AsyncThreatClient(self)
+        self.feed = AsyncFeedClient(self)
+        self.search = AsyncSearchClient(self)
+        self.analyze = AsyncAnalyzeClient(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_session(self):
+        # The session and semaphore have to be created inside the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency,
+                                             limit_per_host=self.limit_per_host)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def close(self):
+        """
+        Closes all pooled connections. This is called automatically when the
+        client is used as an async context manager.
+        """
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __send(self, method, path, params, **kwargs):
+        url = '{}/{}'.format(self.base_url, path)
+        params['pretty'] = int(kwargs.pop('pretty', self.pretty))
+        params['sanitize'] = int(kwargs.pop('sanitize', self.sanitize))
+        if self.api_key is not None:
+            params['key'] = self.api_key
+        if 'page' in kwargs:
+            params['page'] = kwargs.pop('page')
+
+        for name in SYNC_ONLY_OPTIONS:
+            if name in kwargs:
+                raise PulsediveException('"{}" is not supported by AsyncPulsedive'.format(name))
+
+        is_raw = kwargs.pop('raw', self.raw)
+        stream = kwargs.pop('stream', False)
+
+        args = self.args.copy()
+        args.update(kwargs)
+
+        session = self._get_session()
+        await self._semaphore.acquire()
+        held = False
+        try:
+            if method == 'GET':
+                r = await session.get(url, params=_encode_params(params), **args)
+            else:
+                r = await session.post(url, data=_encode_params(params), **args)
+
+            if is_raw:
+                if stream:
+                    self._hold_slot(r)
+                    held = True
+                else:
+                    await r.read()
+                return r
+
+            try:
+                r.raise_for_status()
+                ret = self.decoder(await r.read())
+            finally:
+                r.release()
+        finally:
+            if not held:
+                self._semaphore.release()
+
+        if 'error' in ret:
+            raise PulsediveException('Error encountered with the API with error "{}'.format(ret['error']))
+        return ret
+
+    def _hold_slot(self, r):
+        # The slot of a streamed response is freed once its body has been read
+        # or the response is released or closed
+        freed = []
+
+        def free():
+            if not freed:
+                freed.append(True)
+                self._semaphore.release()
+
+        def release():
+            free()
+            return release_response()
+
+        def close():
+            free()
+            close_response()
+
+        release_response, close_response = r.release, r.close
+        r.release, r.close = release, close
+        r.content.on_eof(free)
+
+    @staticmethod
+    def _use_models(kwargs):
+        if kwargs.pop('models', False):
+            raise PulsediveException('"models" is not supported by AsyncPulsedive')
+        return False
+
+    def get(self, path, params, **kwargs):
+        return self.__send('GET', path, params, **kwargs)
+
+    def post(self, path, data, **kwargs):
+        return self.__send('POST', path, data, **kwargs)
@@ -0,0 +1,167 @@
+"""
+Bloom filter for prefiltering indicator values before calling the API.
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+
+MAGIC = b'PDBF'
+VERSION = 1
+# magic, version, number of hashes, number of bits, number of values
+HEADER = struct.Struct('<4sBB2xQQ')
+
+
+def _hashes(value):
+    if not isinstance(value, bytes):
+        value = value.encode('utf-8')
+    digest = hashlib.sha256(value).digest()
+    return struct.unpack_from('<QQ', digest)
+
+
+class BloomFilter:
+    """
+    Compact set of indicator values that can answer "definitely not an
+    indicator" without false negatives, and "maybe an indicator" with a
+    false-positive rate of about ``error_rate``::
+
+        bf = BloomFilter.from_values(index_values, error_rate=0.0001)
+        bf.save('iocs.bloom')
+
+        # In every worker process
+        bf = BloomFilter.load('iocs.bloom')
+        candidates = [v for v in log_values if v in bf]
+        results = pud.indicator.get_many(values=candidates)
+
+    A filter loaded with :meth:`load` is a read-only memory map of the file,
+    so processes that load the same file share one copy in memory.
+
+    Values are matched exactly. Normalize them, e.g. by lowercasing domains,
+    both when building the filter and when querying it.
+
+    :param capacity: Expected number of values
+    :param error_rate: Target false-positive rate. Default: 0.001
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(1, capacity)
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._offset = 0
+        self._mmap = None
+
+    @classmethod
+    def from_values(cls, values, error_rate=0.001, capacity=None):
+        """
+        Builds a filter containing ``values``. If ``capacity`` is not given,
+        the values are deduplicated first to size the filter.
+        """
+        if capacity is None:
+            values = set(values)
+            capacity = len(values)
+        bf = cls(capacity, error_rate)
+        bf.update(values)
+        return bf
+
+    @classmethod
+    def load(cls, path):
+        """
+        Opens a filter saved with :meth:`save` as a read-only memory map
+        """
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, num_hashes, num_bits, count = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            mm.close()
+            raise ValueError('{} is not a Bloom filter file'.format(path))
+        bf = cls.__new__(cls)
+        bf.num_bits = num_bits
+        bf.num_hashes = num_hashes
+        bf.count = count
+        bf._bits = mm
+        bf._offset = HEADER.size
+        bf._mmap = mm
+        return bf
+
+    def save(self, path):
+        """
+        Writes the filter to ``path``. The file is replaced atomically so
+        processes that have the previous version loaded are not affected.
+        """
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.num_hashes, self.num_bits, self.count))
+            f.write(self._bits[self._offset:])
+        os.replace(tmp, path)
+
+    def close(self):
+        """
+        Releases the memory map of a filter opened with :meth:`load`
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _positions(self, value):
+        h1, h2 = _hashes(value)
+        m = self.num_bits
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % m
+
+    def add(self, value):
+        if self._mmap is not None:
+            raise TypeError('A loaded Bloom filter is read-only')
+        bits = self._bits
+        for pos in self._positions(value):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def __contains__(self, value):
+        bits = self._bits
+        offset = self._offset
+        for pos in self._positions(value):
+            if not bits[offset + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+
+def build_filter(pud, feeds=(), threats=(), searches=(), error_rate=0.001, capacity=None):
+    """
+    Builds a :class:`BloomFilter` of the indicator values linked to
+    ``feeds`` and ``threats`` and returned by ``searches``::
+
+        bf = build_filter(pud, feeds=[1, 2], threats=[1],
+                          searches=[{'risk': ['high', 'critical']}])
+
+    :param pud: :class:`~pulsedive.Pulsedive` client
+    :param feeds: Feed IDs whose links are added
+    :param threats: Threat IDs whose links are added
+    :param searches: Keyword arguments for
+        :meth:`~pulsedive.client.SearchClient.iter_indicators`, one ``dict``
+        per search
+    :param error_rate: Target false-positive rate. Default: 0.001
+    :param capacity: Expected number of values. If not given, the values are
+        collected and deduplicated first to size the filter.
+    """
+    def values():
+        for fid in feeds:
+            for link in pud.feed.iter_links(fid):
+                yield link['indicator']
+        for tid in threats:
+            for link in pud.threat.iter_links(tid):
+                yield link['indicator']
+        for search in searches:
+            for result in pud.search.iter_indicators(**search):
+                yield result['indicator']
+
+    return BloomFilter.from_values(values(), error_rate=error_rate, capacity=capacity)
@@ -0,0 +1,405 @@
+"""
+Response caches for :class:`~pulsedive.Pulsedive`.
+
+A cache is passed to the client with the ``cache`` parameter::
+
+    from pulsedive import Pulsedive
+    from pulsedive.cache import MemoryCache
+
+    pud = Pulsedive(cache=MemoryCache(maxsize=10000, ttls={'search.php': 60}))
+
+Only successful ``GET`` requests that are not ``raw`` are cached, along with
+"not found" errors which are kept for ``negative_ttl`` seconds so repeated
+misses do not reach the API. Caching can be skipped for a single call with
+``cache=False``.
+
+Cached responses are shared between callers and should not be modified.
+
+:class:`SQLiteCache` stores responses on disk so they survive restarts and
+are shared by every process that opens the same file.
+
+:class:`ValidatorStore` keeps the ``ETag`` and ``Last-Modified`` of
+responses so that refreshes are sent as conditional requests, see the
+``conditional`` option of the client.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+DEFAULT_TTL = 300
+DEFAULT_NEGATIVE_TTL = 60
+# Results of the analyze queue change while a job is processing
+DEFAULT_TTLS = {'analyze.php': 0}
+
+
+def make_key(method, path, params):
+    """
+    Builds the cache key of a request from its method, path and parameters.
+
+    The API key is left out and parameter values are normalized so that
+    ``iid=1`` and ``iid='1'`` or differently ordered lists share an entry.
+    """
+    normalized = []
+    for name, value in sorted(params.items()):
+        if name == 'key':
+            continue
+        if isinstance(value, (list, tuple)):
+            value = sorted(str(v) for v in value)
+        else:
+            value = str(value)
+        normalized.append([name, value])
+    return json.dumps([method, path, normalized], separators=(',', ':'))
+
+
+def is_not_found(response):
+    """
+    Whether ``response`` is an API error for an unknown indicator, threat or feed
+    """
+    error = response.get('error') if isinstance(response, dict) else None
+    return error is not None and 'not found' in str(error).lower()
+
+
+class BaseCache:
+    """
+    Base class of the response caches. Subclasses implement :meth:`get`,
+    :meth:`set` and :meth:`clear`.
+
+    :param ttl: Seconds a response is kept. Default: 300
+    :param ttls: Optional mapping of endpoint, such as ``'info.php'``, to the
+        number of seconds its responses are kept. A value of 0 disables caching
+        for that endpoint. By default ``analyze.php`` is not cached.
+    :param negative_ttl: Seconds a "not found" error is kept. 0 disables
+        negative caching. Default: 60
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, ttls=None, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def ttl_for(self, path, response):
+        """
+        Returns the number of seconds ``response`` from ``path`` should be
+        cached, or 0 if it should not be cached
+        """
+        if isinstance(response, dict) and 'error' in response:
+            return self.negative_ttl if is_not_found(response) else 0
+        return self.ttls.get(path, self.ttl)
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def stats(self):
+        """
+        Returns a snapshot of the ``hits``, ``misses``, ``evictions`` and
+        ``expirations`` counters
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def get(self, key):
+        """
+        Returns the cached response for ``key`` or None
+        """
+        raise NotImplementedError
+
+    def set(self, key, response, ttl):
+        """
+        Stores ``response`` under ``key`` for ``ttl`` seconds
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """
+        Removes all entries
+        """
+        raise NotImplementedError
+
+
+class MemoryCache(BaseCache):
+    """
+    Thread-safe in-process cache with TTL expiry and LRU eviction.
+
+    :param maxsize: Maximum number of responses kept. When full, the least
+        recently used response is evicted. Default: 1024
+
+    The other parameters are described in :class:`BaseCache`.
+    """
+
+    def __init__(self, maxsize=1024, ttl=DEFAULT_TTL, ttls=None,
+                 negative_ttl=DEFAULT_NEGATIVE_TTL):
+        super(MemoryCache, self).__init__(ttl=ttl, ttls=ttls, negative_ttl=negative_ttl)
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self._stats['expirations'] += 1
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def set(self, key, response, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        stats = super(MemoryCache, self).stats()
+        stats['size'] = len(self._entries)
+        return stats
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache stored in a SQLite database in WAL mode.
+
+    Any number of threads and processes can open the same file. Readers do
+    not block each other or the writer, and entries written by one process
+    are visible to all others, so a restarted worker starts warm.
+
+    Expired entries are removed and the database is trimmed to
+    ``max_entries`` by :meth:`compact`, which runs automatically every
+    ``compact_every`` writes. When trimming, the entries closest to expiry
+    are removed first.
+
+    :param path: Location of the database file
+    :param max_entries: Maximum number of responses kept. Default: 100000
+    :param compact_every: Number of writes between automatic compactions.
+        0 disables automatic compaction. Default: 1000
+    :param timeout: Seconds to wait for a lock held by another process.
+        Default: 30
+    :param pool_size: Number of idle connections kept open for reuse. Every
+        operation takes a connection from the pool or opens one, and
+        connections above ``pool_size`` are closed when returned. Default: 8
+
+    The other parameters are described in :class:`BaseCache`.
+    """
+
+    def __init__(self, path, max_entries=100000, compact_every=1000, timeout=30,
+                 pool_size=8, ttl=DEFAULT_TTL, ttls=None, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        super(SQLiteCache, self).__init__(ttl=ttl, ttls=ttls, negative_ttl=negative_ttl)
+        self.path = path
+        self.max_entries = max_entries
+        self.compact_every = compact_every
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._idle = []
+        self._pid = os.getpid()
+        self._writes = 0
+
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS responses ('
+                         'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires)')
+
+    def _open(self):
+        import sqlite3
+
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextlib.contextmanager
+    def _connection(self):
+        conn = None
+        with self._lock:
+            # Connections inherited through a fork must not be reused
+            if self._pid != os.getpid():
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                conn = self._idle.pop()
+        if conn is None:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                if self._pid == os.getpid() and len(self._idle) < self.pool_size:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def __len__(self):
+        with self._connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def get(self, key):
+        with self._connection() as conn:
+            row = conn.execute(
+                'SELECT value, expires FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is not None and row[1] <= time.time():
+            self._count('expirations')
+            row = None
+        if row is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return json.loads(row[0])
+
+    def set(self, key, response, ttl):
+        value = json.dumps(response, separators=(',', ':'))
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)',
+                (key, value, time.time() + ttl))
+        with self._lock:
+            self._writes += 1
+            due = self.compact_every and self._writes % self.compact_every == 0
+        if due:
+            self.compact()
+
+    def compact(self, vacuum=False):
+        """
+        Removes expired entries and the entries closest to expiry above
+        ``max_entries``.
+
+        :param vacuum: Whether to also return the freed space to the
+            file system. This locks the database while it runs.
+        """
+        with self._connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM responses WHERE expires <= ?', (time.time(),))
+                excess = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute('DELETE FROM responses WHERE key IN '
+                                 '(SELECT key FROM responses ORDER BY expires LIMIT ?)', (excess,))
+                    self._count('evictions', excess)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            if vacuum:
+                conn.execute('VACUUM')
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM responses')
+
+    def close(self):
+        """
+        Closes the idle database connections of this instance. Connections
+        are opened again if the cache is used afterwards.
+        """
+        with self._lock:
+            connections, self._idle = self._idle, []
+        for conn in connections:
+            conn.close()
+
+    def stats(self):
+        stats = super(SQLiteCache, self).stats()
+        stats['size'] = len(self)
+        return stats
+
+
+class Validated(namedtuple('Validated', ['etag', 'last_modified', 'response', 'size'])):
+    """
+    Validators of a response kept by :class:`ValidatorStore`, with the decoded
+    response and the size of its body
+    """
+    __slots__ = ()
+
+
+class ValidatorStore:
+    """
+    Thread-safe store of the ``ETag`` and ``Last-Modified`` validators of
+    responses along with the responses themselves. The client sends them back
+    as ``If-None-Match`` and ``If-Modified-Since`` and reuses the stored
+    response when the API answers ``304 Not Modified``.
+
+    Entries do not expire, they are replaced when the API returns a new
+    version of the resource. The decoded responses are kept in memory and
+    usually take several times the size of their bodies, so ``maxbytes``
+    should be set well below the memory available to the process.
+
+    :param maxsize: Maximum number of responses kept. When full, the least
+        recently used response is evicted. Default: 1024
+    :param maxbytes: Maximum total size of the bodies of the responses kept.
+        Least recently used responses are evicted above it, and a response
+        larger than it is not kept. None disables the limit.
+        Default: 32 MiB
+    :param paths: Endpoints whose responses are revalidated.
+        Default: ``info.php`` and ``search.php``
+    """
+
+    def __init__(self, maxsize=1024, maxbytes=32 * 1024 * 1024, paths=('info.php', 'search.php')):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.paths = frozenset(paths)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns the :class:`Validated` entry for ``key`` or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def nbytes(self):
+        """
+        Returns the total size of the bodies of the responses kept
+        """
+        with self._lock:
+            return self._bytes
+
+    def set(self, key, etag, last_modified, response, size):
+        with self._lock:
+            self._discard(key)
+            if self.maxbytes is not None and size > self.maxbytes:
+                return
+            self._entries[key] = Validated(etag, last_modified, response, size)
+            self._bytes += size
+            while (len(self._entries) > self.maxsize or
+                   (self.maxbytes is not None and self._bytes > self.maxbytes)):
+                self._bytes -= self._entries.popitem(last=False)[1].size
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def discard(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,394 @@
+"""
+Command line interface, installed as ``pulsedive`` and also available as
+``python -m pulsedive``::
+
+    pulsedive enrich iocs.txt -o results.jsonl --workers 16 --checkpoint iocs.ckpt
+    cat iocs.txt | pulsedive enrich --format csv > results.csv
+
+``enrich`` reads one indicator per line, skipping blank lines and lines
+starting with ``#``, and looks them up concurrently with
+:meth:`~pulsedive.client.IndicatorClient.get`. Results are written as they
+complete, so their order is not the input order.
+
+With ``--checkpoint``, the position in the input of every indicator whose
+lookup finished is appended to the checkpoint file after its result is
+written. Running the
+same command again skips those lines and appends to the output, so a run
+that was killed only repeats the lookups that were in flight. The command
+refuses to resume into an output file that is missing or empty, as the
+results of the skipped lines would be lost. Only unknown
+indicators are written as errors and checkpointed. Lookups that failed for
+any other reason, such as an invalid API key, the quota, the network, rate
+limiting or server errors, are reported on stderr, make the command exit
+with status 1, and are retried by the next run.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from .exceptions import PulsediveException
+
+FORMATS = ('jsonl', 'csv')
+
+# Number of entries appended to a checkpoint before it is compacted
+_COMPACT_EVERY = 100000
+
+# API key in the URLs quoted by HTTP and connection errors
+_KEY_RE = re.compile(r'([?&]key=)[^&\s\'"]+')
+
+
+class Checkpoint:
+    """
+    Append-only record of the positions of the finished indicators.
+
+    Every line of the file is either the position of a finished indicator,
+    or ``<N`` when all positions below ``N`` are finished. The file is compacted
+    when it is opened and every 100000 entries.
+
+    :param path: Path of the checkpoint file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.below = 0
+        self.done = set()
+        self._entries = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith('<'):
+                        self.below = max(self.below, int(line[1:]))
+                    elif line:
+                        self.done.add(int(line))
+            self.done.difference_update([n for n in self.done if n < self.below])
+            self._advance()
+        self._compact()
+
+    def __contains__(self, position):
+        return position < self.below or position in self.done
+
+    def __len__(self):
+        return self.below + len(self.done)
+
+    def _advance(self):
+        done = self.done
+        while self.below in done:
+            done.remove(self.below)
+            self.below += 1
+
+    def _compact(self):
+        tmp = '{}.{}.tmp'.format(self.path, os.getpid())
+        with open(tmp, 'w') as f:
+            f.write('<{}\n'.format(self.below))
+            for n in sorted(self.done):
+                f.write('{}\n'.format(n))
+        os.replace(tmp, self.path)
+        self._file = open(self.path, 'a')
+        self._entries = 0
+
+    def add(self, position):
+        """
+        Records the indicator at ``position`` as finished
+        """
+        self.done.add(position)
+        self._advance()
+        self._file.write('{}\n'.format(position))
+        self._file.flush()
+        self._entries += 1
+        if self._entries >= _COMPACT_EVERY:
+            self._file.close()
+            self._compact()
+
+    def close(self):
+        self._file.close()
+
+
+class JSONLWriter:
+    """
+    Writes every result as a line of JSON
+    """
+
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, result):
+        self.f.write(json.dumps(result, separators=(',', ':')))
+        self.f.write('\n')
+
+
+class CSVWriter:
+    """
+    Writes the ``columns`` of every result as a CSV row, see
+    :mod:`pulsedive.export` for the column names
+    """
+
+    def __init__(self, f, columns=None, append=False):
+        import csv
+        from .export import INDICATOR_COLUMNS, _converter, _getter
+
+        self.columns = tuple(columns or INDICATOR_COLUMNS + ('error',))
+        self.getters = [_getter(column) for column in self.columns]
+        self.converters = [_converter(column) for column in self.columns]
+        self.writer = csv.writer(f)
+        if not append:
+            self.writer.writerow(self.columns)
+
+    def write(self, result):
+        self.writer.writerow([convert(get(result))
+                              for get, convert in zip(self.getters, self.converters)])
+
+
+def read_values(f):
+    """
+    Yields ``(position, value)`` of every indicator in ``f``
+    """
+    position = 0
+    for line in f:
+        value = line.strip()
+        if value and not value.startswith('#'):
+            yield position, value
+            position += 1
+
+
+def _error_body(error):
+    # Decoded body of the HTTP error response of a failed lookup, if any
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def describe_error(error):
+    """
+    Describes a failed lookup by the status code and the API error message,
+    leaving out the API key of the request URL
+    """
+    response = getattr(error, 'response', None)
+    if response is not None:
+        body = _error_body(error)
+        if isinstance(body, dict) and body.get('error'):
+            return 'HTTP {}: {}'.format(response.status_code, body['error'])
+        return 'HTTP {}'.format(response.status_code)
+    return _KEY_RE.sub(r'\1<hidden>', str(error))
+
+
+def is_final(error):
+    """
+    Whether a failed lookup got a final answer from the API, an unknown
+    indicator. Other failures, such as an invalid API key, the quota, rate
+    limiting, server or network errors, are not final.
+    """
+    from .cache import is_not_found
+
+    if getattr(error, 'response', None) is not None:
+        return is_not_found(_error_body(error))
+    if isinstance(error, PulsediveException):
+        return is_not_found({'error': str(error)})
+    return False
+
+
+def enrich(pud, values, writer, checkpoint=None, workers=8, flush=None, progress=None,
+           on_failure=None, **kwargs):
+    """
+    Looks up ``values``, an iterable of ``(position, value)``, with
+    ``workers`` concurrent lookups and writes the results with ``writer`` as
+    they complete. Results are written and checkpointed in the calling
+    thread. Returns a ``dict`` of counts.
+
+    :param flush: Called after every result is written, before it is
+        checkpointed
+    :param progress: Called with the counts after every result
+    :param on_failure: Called with the value and the exception of every
+        lookup that is not checkpointed
+    :param kwargs: Other parameters passed on to
+        :meth:`~pulsedive.client.IndicatorClient.get`
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    counts = {'done': 0, 'errors': 0, 'failed': 0, 'skipped': 0}
+
+    def lookup(value):
+        try:
+            return pud.indicator.get(value=value, **kwargs), None
+        except Exception as e:
+            return None, e
+
+    def finish(futures):
+        for future in futures:
+            position, value = pending.pop(future)
+            result, error = future.result()
+            if error is not None and not is_final(error):
+                counts['failed'] += 1
+                if on_failure is not None:
+                    on_failure(value, error)
+                continue
+            if error is not None:
+                counts['errors'] += 1
+                result = {'indicator': value, 'error': describe_error(error)}
+            writer.write(result)
+            if flush is not None:
+                flush()
+            if checkpoint is not None:
+                checkpoint.add(position)
+            counts['done'] += 1
+            if progress is not None:
+                progress(counts)
+
+    pending = {}
+    window = 2 * workers
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for position, value in values:
+            if checkpoint is not None and position in checkpoint:
+                counts['skipped'] += 1
+                continue
+            pending[executor.submit(lookup, value)] = (position, value)
+            if len(pending) >= window:
+                finish(wait(pending, return_when=FIRST_COMPLETED)[0])
+        while pending:
+            finish(wait(pending, return_when=FIRST_COMPLETED)[0])
+    except BaseException:
+        # Lookups that did not start are dropped, those in flight are
+        # written so they are not repeated
+        for future in list(pending):
+            if future.cancel():
+                del pending[future]
+        finish(wait(pending)[0])
+        raise
+    finally:
+        executor.shutdown(wait=True)
+    return counts
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='pulsedive', description='Pulsedive API client')
+    parser.add_argument('--key', default=os.environ.get('PULSEDIVE_API_KEY'),
+                        help='API key, defaults to $PULSEDIVE_API_KEY')
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    enrich_parser = commands.add_parser(
+        'enrich', help='Look up indicators read from a file or stdin',
+        description='Looks up one indicator per line and writes the results as they complete.')
+    enrich_parser.add_argument('input', nargs='?', default='-',
+                               help='File of indicators, one per line. Default: stdin')
+    enrich_parser.add_argument('-o', '--output', default='-', help='Output file. Default: stdout')
+    enrich_parser.add_argument('-f', '--format', choices=FORMATS,
+                               help='Output format. Default: from the output extension, or jsonl')
+    enrich_parser.add_argument('--columns', help='Comma-separated CSV columns, dotted for nested '
+                                                 'fields, e.g. iid,indicator,risk')
+    enrich_parser.add_argument('-w', '--workers', type=int, default=8,
+                               help='Concurrent lookups. Default: 8')
+    enrich_parser.add_argument('--checkpoint',
+                               help='Checkpoint file, to resume a run without repeating lookups')
+    enrich_parser.add_argument('--rate-limit', type=float, help='Maximum requests per second')
+    enrich_parser.add_argument('--retries', type=int, default=3,
+                               help='Retries of rate limited and failed requests. Default: 3')
+    enrich_parser.add_argument('--transport', help='Transport, e.g. urllib3')
+    enrich_parser.add_argument('--schema', action='store_true',
+                               help='Include the attributes of the indicators')
+    enrich_parser.add_argument('-q', '--quiet', action='store_true',
+                               help='Do not report progress on stderr')
+    return parser
+
+
+def _run_enrich(args, stdin, stdout, stderr):
+    from . import Pulsedive
+
+    fmt = args.format
+    if fmt is None:
+        fmt = 'csv' if args.output.endswith('.csv') else 'jsonl'
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    resuming = checkpoint is not None and len(checkpoint) > 0
+    # Only an existing output is appended to, so a new one gets its CSV header
+    exists = args.output != '-' and os.path.exists(args.output) and os.path.getsize(args.output) > 0
+    append = resuming and exists
+    if resuming and not exists:
+        if args.output != '-':
+            stderr.write('{} records {} finished lookups but {} is missing or empty, remove the '
+                         'checkpoint to start over\n'.format(args.checkpoint, len(checkpoint),
+                                                             args.output))
+            checkpoint.close()
+            return 2
+        stderr.write('Resuming from {}, the results of its {} finished lookups are not written '
+                     'again\n'.format(args.checkpoint, len(checkpoint)))
+
+    options = {}
+    if args.base_url:
+        options['base_url'] = args.base_url
+    if args.transport:
+        options['transport'] = args.transport
+    pud = Pulsedive(args.key, rate_limit=args.rate_limit, retry=args.retries or None,
+                    pool_maxsize=max(10, args.workers), **options)
+
+    infile = stdin if args.input == '-' else open(args.input)
+    if args.output == '-':
+        outfile = stdout
+    else:
+        outfile = open(args.output, 'a' if append else 'w', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        columns = args.columns.split(',') if args.columns else None
+        writer = CSVWriter(outfile, columns, append=append)
+    else:
+        writer = JSONLWriter(outfile)
+
+    started = time.monotonic()
+    reported = [started]
+
+    def progress(counts):
+        now = time.monotonic()
+        if now - reported[0] >= 5:
+            reported[0] = now
+            stderr.write('{done} done, {errors} errors, {failed} failed, {rate:.1f}/s\n'.format(
+                rate=counts['done'] / (now - started), **counts))
+
+    def on_failure(value, error):
+        stderr.write('Failed to look up {}: {}\n'.format(value, describe_error(error)))
+
+    try:
+        counts = enrich(pud, read_values(infile), writer, checkpoint, workers=args.workers,
+                        flush=outfile.flush, progress=None if args.quiet else progress,
+                        on_failure=on_failure, schema=args.schema)
+    except KeyboardInterrupt:
+        if checkpoint is not None:
+            stderr.write('Interrupted, run the same command again to resume\n')
+        else:
+            stderr.write('Interrupted\n')
+        return 130
+    finally:
+        if infile is not stdin:
+            infile.close()
+        if outfile is not stdout:
+            outfile.close()
+        else:
+            outfile.flush()
+        if checkpoint is not None:
+            checkpoint.close()
+        pud.close()
+
+    if not args.quiet:
+        elapsed = time.monotonic() - started
+        stderr.write('{done} done, {errors} errors, {failed} failed, {skipped} skipped '
+                     'in {elapsed:.1f}s\n'.format(elapsed=elapsed, **counts))
+    return 1 if counts['failed'] else 0
+
+
+def main(argv=None, stdin=None, stdout=None, stderr=None):
+    """
+    Entry point of the ``pulsedive`` command. Returns the exit status.
+    """
+    args = _parser().parse_args(argv)
+    stdin = stdin if stdin is not None else sys.stdin
+    stdout = stdout if stdout is not None else sys.stdout
+    stderr = stderr if stderr is not None else sys.stderr
+    if args.command == 'enrich':
+        return _run_enrich(args, stdin, stdout, stderr)
+    return 2
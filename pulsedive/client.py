@@ -1,8 +1,17 @@
-import base64
-import shutil
-import requests
+import functools
+import threading
+import time
+from collections import deque, namedtuple
 
+from .cache import make_key
+from .decoders import DECODERS, get_decoder
 from .exceptions import PulsediveException
+from .metrics import HOOKS, RequestEvent
+from .models import Feed, Indicator, Link, SearchHit, Threat, _grouped, _results
+from .ratelimit import Retry, TokenBucket, get_bucket
+from .singleflight import SingleFlight
+from .stream import iter_json_array
+from .transport import TRANSPORTS, RequestsTransport, get_transport
 
 PULSEDIVE_URL = 'https://pulsedive.com/api'
 
@@ -13,11 +22,74 @@ INDICATOR_TYPES = ['ip', 'ipv6', 'url', 'domain', 'artifact']
 RISKS = ['unknown', 'none', 'low', 'medium', 'high', 'critical', 'retired']
 
 
+class BulkResult(namedtuple('BulkResult', ['iid', 'value', 'result', 'error'])):
+    """
+    Outcome of a single lookup in :meth:`IndicatorClient.get_many`. Exactly one
+    of ``iid`` and ``value`` is set. ``error`` holds the exception raised by the
+    lookup, in which case ``result`` is None.
+    """
+    __slots__ = ()
+
+
+def _bulk_queries(values, iids):
+    """
+    Yields deduplicated ``(iid, value)`` pairs in input order
+    """
+    seen = set()
+    for value in values or ():
+        if ('value', value) not in seen:
+            seen.add(('value', value))
+            yield None, value
+    for iid in iids or ():
+        if ('iid', str(iid)) not in seen:
+            seen.add(('iid', str(iid)))
+            yield iid, None
+
+
+def _pop_done(pending, ordered):
+    """
+    Waits for and removes the next finished future(s) from ``pending``
+    """
+    if ordered:
+        return [pending.popleft().result()]
+    from concurrent.futures import wait, FIRST_COMPLETED
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+    return [future.result() for future in done]
+
+
+# Sub-client method making the requests of the current thread
+_operation = threading.local()
+
+
+def _traced(func):
+    """
+    Records the sub-client method making a request, e.g. ``indicator.get``,
+    in its :class:`~pulsedive.metrics.RequestEvent`. Only the outermost
+    method is recorded.
+    """
+    suffix = '' if func.__name__ == '__call__' else '.' + func.__name__
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if getattr(_operation, 'name', None) is not None:
+            return func(self, *args, **kwargs)
+        _operation.name = self._name + suffix
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            _operation.name = None
+    return wrapper
+
+
 class IndicatorClient:
     """
     This exposes the Pulsedive `Indicator API
     <https://pulsedive.com/api/?q=indicators>`_
     """
+    _name = 'indicator'
+
     def __init__(self, pulsedive_client):
         self.pud = pulsedive_client
 
@@ -28,6 +100,7 @@ class IndicatorClient:
         """
         return self.get(iid=iid, value=value, schema=schema, **kwargs)
 
+    @_traced
     def get(self, iid=None, value=None, schema=False, **kwargs):
         """
         Queries for an indicator by either indicator id or by value.
@@ -47,8 +120,61 @@ class IndicatorClient:
         else:
             raise PulsediveException('"iid" or "value" has to be set')
 
-        return self.pud.get('info.php', params, **kwargs)
+        models = self.pud._use_models(kwargs)
+        ret = self.pud.get('info.php', params, **kwargs)
+        return Indicator.from_dict(ret) if models else ret
 
+    def get_many(self, values=None, iids=None, schema=False, max_workers=8,
+                 ordered=True, **kwargs):
+        """
+        Queries many indicators concurrently and yields a
+        :class:`~pulsedive.client.BulkResult` per unique indicator::
+
+            for res in pud.indicator.get_many(values=['pulsedive.com', 'afobal.cl']):
+                if res.error is None:
+                    print(res.value, res.result['risk'])
+
+        Duplicate values and iids are only looked up once. Failures, such as
+        the :class:`~pulsedive.PulsediveException` raised for unknown
+        indicators, are stored in ``error`` instead of stopping the batch.
+        At most ``2 * max_workers`` lookups are pending at any time so large
+        inputs are consumed lazily.
+
+        :arg values: Iterable of indicator values
+        :arg iids: Iterable of indicator IDs
+        :arg schema: Passed on to :meth:`get`
+        :arg max_workers: Number of concurrent lookups. Keep this at or below
+            the client's ``pool_maxsize``. Default: 8
+        :arg ordered: If True, results are yielded in input order, values
+            first and then iids. Otherwise they are yielded as they complete.
+            Default: True
+        """
+        def fetch(iid, value):
+            try:
+                result = self.get(iid=iid, value=value, schema=schema, **kwargs)
+            except Exception as e:
+                return BulkResult(iid, value, None, e)
+            return BulkResult(iid, value, result, None)
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        window = 2 * max_workers
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            try:
+                for iid, value in _bulk_queries(values, iids):
+                    pending.append(executor.submit(fetch, iid, value))
+                    if len(pending) >= window:
+                        for res in _pop_done(pending, ordered):
+                            yield res
+                while pending:
+                    for res in _pop_done(pending, ordered):
+                        yield res
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    @_traced
     def properties(self, iid, **kwargs):
         """
         Returns historical properties of indicator
@@ -61,6 +187,7 @@ class IndicatorClient:
         }
         return self.pud.get('info.php', params, **kwargs)
 
+    @_traced
     def links(self, iid, **kwargs):
         """
         Returns historical links of indicator
@@ -71,7 +198,9 @@ class IndicatorClient:
             'iid': iid,
             'get': 'links'
         }
-        return self.pud.get('info.php', params, **kwargs)
+        models = self.pud._use_models(kwargs)
+        ret = self.pud.get('info.php', params, **kwargs)
+        return _grouped(ret, Link) if models else ret
 
 
 class ThreatClient:
@@ -79,6 +208,8 @@ class ThreatClient:
     This exposes the Pulsedive `Threat API
     <https://pulsedive.com/api/?q=threats>`_
     """
+    _name = 'threat'
+
     def __init__(self, pulsedive_client):
         self.pud = pulsedive_client
 
@@ -89,6 +220,7 @@ class ThreatClient:
         """
         return self.get(tid=tid, name=name, **kwargs)
 
+    @_traced
     def get(self, tid=None, name=None, **kwargs):
         """
         Queries threats by either threat id or by name.
@@ -105,8 +237,11 @@ class ThreatClient:
         else:
             raise PulsediveException('"tid" or "name" has to be set')
 
-        return self.pud.get('info.php', params, **kwargs)
+        models = self.pud._use_models(kwargs)
+        ret = self.pud.get('info.php', params, **kwargs)
+        return Threat.from_dict(ret) if models else ret
 
+    @_traced
     def summary(self, tid, splitrisk=False, **kwargs):
         """
         Gives a summary of a threat that gives counts of
@@ -124,6 +259,7 @@ class ThreatClient:
         }
         return self.pud.get('info.php', params, **kwargs)
 
+    @_traced
     def links(self, tid, **kwargs):
         """
         Returns the linked indicators for the threat
@@ -134,7 +270,27 @@ class ThreatClient:
             'tid': tid,
             'get': 'links',
         }
-        return self.pud.get('info.php', params, **kwargs)
+        models = self.pud._use_models(kwargs)
+        ret = self.pud.get('info.php', params, **kwargs)
+        return _results(ret, Link) if models else ret
+
+    @_traced
+    def iter_links(self, tid, **kwargs):
+        """
+        Yields the linked indicators for the threat one at a time.
+
+        Unlike :meth:`links`, the response is parsed as it is received so
+        memory use does not grow with the number of linked indicators.
+
+        :arg tid: Threat ID
+        """
+        params = {
+            'tid': tid,
+            'get': 'links',
+        }
+        models = self.pud._use_models(kwargs)
+        items = self.pud.stream('info.php', params, **kwargs)
+        return map(Link.from_dict, items) if models else items
 
 
 class FeedClient:
@@ -142,6 +298,8 @@ class FeedClient:
     This exposes the Pulsedive `Feed API
     <https://pulsedive.com/api/?q=feeds>`_
     """
+    _name = 'feed'
+
     def __init__(self, pulsedive_client):
         self.pud = pulsedive_client
 
@@ -157,6 +315,7 @@ class FeedClient:
        """
         return self.get(fid=fid, feed=feed, organization=organization **kwargs)
 
+    @_traced
     def get(self, fid=None, feed=None, organization=None, **kwargs):
         """
         Gets data of a feed through its feed ID.
@@ -189,8 +348,11 @@ class FeedClient:
         if organization is not None:
             params['organization'] = organization
 
-        return self.pud.get('info.php', params, **kwargs)
+        models = self.pud._use_models(kwargs)
+        ret = self.pud.get('info.php', params, **kwargs)
+        return Feed.from_dict(ret) if models else ret
 
+    @_traced
     def links(self, fid, **kwargs):
         """
         Returns the linked indicators for the feed
@@ -201,7 +363,49 @@ class FeedClient:
             'fid': fid,
             'get': 'links',
         }
-        return self.pud.get('info.php', params, **kwargs)
+        models = self.pud._use_models(kwargs)
+        ret = self.pud.get('info.php', params, **kwargs)
+        return _results(ret, Link) if models else ret
+
+    @_traced
+    def iter_links(self, fid, **kwargs):
+        """
+        Yields the linked indicators for the feed one at a time.
+
+        Unlike :meth:`links`, the response is parsed as it is received so
+        memory use does not grow with the size of the feed.
+
+        :arg fid: Feed ID
+        """
+        params = {
+            'fid': fid,
+            'get': 'links',
+        }
+        models = self.pud._use_models(kwargs)
+        items = self.pud.stream('info.php', params, **kwargs)
+        return map(Link.from_dict, items) if models else items
+
+    @_traced
+    def diff(self, fid, update=True, **kwargs):
+        """
+        Returns the indicators added to and removed from the feed since the
+        previous call, as a :class:`~pulsedive.snapshots.FeedDiff`. The links
+        are streamed and compared with the snapshot kept by the client's
+        :class:`~pulsedive.snapshots.SnapshotStore`, so memory use grows
+        with the number of changes rather than the size of the feed.
+
+        The first call for a feed returns all its links as added.
+
+        :arg fid: Feed ID
+        :arg update: Whether to replace the snapshot with the current links.
+            Default: True
+        """
+        store = self.pud.snapshots
+        if store is None:
+            raise PulsediveException('A snapshot store is required, create the client with '
+                                     '"snapshots=<directory>"')
+        kwargs.pop('models', None)
+        return store.diff(fid, self.iter_links(fid, **kwargs), update=update)
 
 
 class SearchClient:
@@ -213,6 +417,8 @@ class SearchClient:
         The use of ``properties`` is not yet stable, and untested.
 
     """
+    _name = 'search'
+
     def __init__(self, pulsedive_client):
         self.pud = pulsedive_client
 
@@ -232,6 +438,7 @@ class SearchClient:
                               attribute=attribute, feed=feed,
                               threat=threat, **kwargs)
 
+    @_traced
     def indicator(self, value='', risk=RISKS, indicator_type=INDICATOR_TYPES,
                   lastseen=None, latest=None, limit='hundred', export=False,
                   properties=None, attribute=None, feed=None, threat=None, **kwargs):
@@ -287,9 +494,71 @@ class SearchClient:
             params['latest'] = latest
 
         if export and not kwargs.get('raw', False):
-            return self.pud.get('search.php', params=params, raw=True, **kwargs).text
-        return self.pud.get('search.php', params=params, **kwargs)
+            kwargs.pop('models', None)
+            return self._export(params, **kwargs)
+        models = self.pud._use_models(kwargs)
+        ret = self.pud.get('search.php', params=params, **kwargs)
+        return _results(ret, SearchHit) if models else ret
+
+    def iter_indicators(self, value='', prefetch=True, **kwargs):
+        """
+        Searches for indicators and yields every result, walking through all
+        the pages of the search::
+
+            for ind in pud.search.iter_indicators('zeus', risk=['high', 'critical']):
+                print(ind['indicator'])
 
+        While the results of a page are being consumed, the next page is
+        fetched in the background. At most two pages are held in memory.
+
+        All arguments aside from ``prefetch`` will be passed to
+        ``pud.search.indicator()`` with ``limit=None``.
+
+        :arg value: Search value for the indicator
+        :arg prefetch: Whether to fetch the next page in the background.
+            Default: True
+        """
+        kwargs['limit'] = None
+        if kwargs.pop('export', False):
+            raise PulsediveException('"export" is not supported when iterating, use "to_csv"')
+
+        def fetch(page):
+            return self.indicator(value=value, page=page, **kwargs)
+
+        executor = None
+        if prefetch:
+            from concurrent.futures import ThreadPoolExecutor
+            executor = ThreadPoolExecutor(max_workers=1)
+        future = None
+        try:
+            page = fetch(0)
+            while page is not None:
+                next_page = page.get('page_next')
+                if next_page is not None and next_page == page.get('page_current'):
+                    next_page = None
+                if executor is not None and next_page is not None:
+                    future = executor.submit(fetch, next_page)
+
+                results = page.get('results', [])
+                page = None
+                for result in results:
+                    yield result
+                results = None
+
+                if future is not None:
+                    page, future = future.result(), None
+                elif next_page is not None:
+                    page = fetch(next_page)
+        finally:
+            if executor is not None:
+                if future is not None:
+                    future.cancel()
+                executor.shutdown(wait=False)
+
+    def _export(self, params, **kwargs):
+        return self.pud.get('search.php', params=params, raw=True, **kwargs).text
+
+    @_traced
     def threat(self, value='', risk=RISKS, category=CATEGORIES, properties=None,
                attribute=None, splitrisk=False, **kwargs):
         """
@@ -314,8 +583,11 @@ class SearchClient:
             'attribute[]': attribute or [],
             'splitrisk': int(splitrisk)
         }
-        return self.pud.get('search.php', params=params, **kwargs)
+        models = self.pud._use_models(kwargs)
+        ret = self.pud.get('search.php', params=params, **kwargs)
+        return _results(ret, Threat) if models else ret
 
+    @_traced
     def feed(self, value='', category=CATEGORIES, splitrisk=False, **kwargs):
         """
         Searches for feeds, similar to how searches are done in the Pulsedive Site.
@@ -332,21 +604,44 @@ class SearchClient:
             'category[]': category,
             'splitrisk': int(splitrisk)
         }
-        return self.pud.get('search.php', params=params, **kwargs)
+        models = self.pud._use_models(kwargs)
+        ret = self.pud.get('search.php', params=params, **kwargs)
+        return _results(ret, Feed) if models else ret
 
-    def to_csv(self, value='', filename=None, **kwargs):
+    @_traced
+    def to_csv(self, value='', filename=None, resume=False, parts=1, progress=None, **kwargs):
         """
         Searches for indicators and saves the result to ``filename``.
 
-        All arguments aside from ``filename`` will be passed to ``pud.search.indicator()`` with ``export=True``.
+        All arguments aside from ``filename``, ``resume``, ``parts`` and
+        ``progress`` will be passed to ``pud.search.indicator()`` with ``export=True``.
+
+        The export is written to ``<filename>.part`` and moved to ``filename``
+        once complete. If the download fails, call ``to_csv`` again with
+        ``resume=True`` to only request the rest of the file with an HTTP
+        range. With ``parts`` greater than 1, the export is split into as
+        many ranges downloaded over concurrent connections, which are
+        stitched in order into ``filename``. Both fall back to downloading the
+        whole export when the server does not support ranges. See
+        :mod:`pulsedive.download`.
 
         :arg value: Search value for the indicator
         :arg filename: Destination filename of the csv
+        :arg resume: Continue a failed download of ``filename``. Default: False
+        :arg parts: Number of concurrent connections. Default: 1
+        :arg progress: Callable receiving a :class:`~pulsedive.download.Progress`,
+            with the bytes downloaded and bytes per second, after every chunk
+        :return: Size of the file in bytes
         """
-        res = self(value=value, raw=True, stream=True, export=True, **kwargs)
-        res.raw.decode_content = True
-        with open(filename, 'wb') as f:
-            shutil.copyfileobj(res.raw, f)
+        from .download import Download
+
+        extra_headers = kwargs.pop('headers', None) or {}
+
+        def fetch(headers):
+            headers = dict(extra_headers, **headers)
+            return self(value=value, raw=True, stream=True, export=True, headers=headers, **kwargs)
+
+        return Download(fetch, filename, parts=parts, resume=resume, progress=progress).run()
 
 
 class AnalyzeClient:
@@ -354,9 +649,14 @@ class AnalyzeClient:
     This exposes the Pulsedive `Analyze API
     <https://pulsedive.com/api/?q=analyze>`_
     """
+    _name = 'analyze'
+
     def __init__(self, pulsedive_client):
         self.pud = pulsedive_client
+        self.poller = None
+        self._poller_lock = threading.Lock()
 
+    @_traced
     def __call__(self, value, enrich=True, probe=False, **kwargs):
         """
         Encodes ``value`` in base64 and submits this encoded value
@@ -370,9 +670,12 @@ class AnalyzeClient:
         :param enrich: Whether to enrich the indicator
         :param probe: Whether to probe the indicator
         """
+        import base64
+
         encoded = base64.b64encode(value.encode('utf-8'))
-        return self.encoded(encoded)
+        return self.encoded(encoded, enrich=enrich, probe=probe, **kwargs)
 
+    @_traced
     def encoded(self, value, enrich=True, probe=False, **kwargs):
         """
         Submits ``value``, a base64 encoding of the indicator,
@@ -393,6 +696,7 @@ class AnalyzeClient:
 
         return self.pud.post('analyze.php', data=data, **kwargs)
 
+    @_traced
     def results(self, qid, **kwargs):
         """
         Returns the result of the analysis when the indicator has been
@@ -407,6 +711,70 @@ class AnalyzeClient:
         params = {'qid': qid}
         return self.pud.get('analyze.php', params=params, **kwargs)
 
+    def submit_many(self, values, enrich=True, probe=False, **kwargs):
+        """
+        Submits every value in ``values`` to the analyze queue and returns a
+        list of :class:`concurrent.futures.Future`, one per value, that resolve
+        to the results of the analysis::
+
+            futures = pud.analyze.submit_many(['pulsedive.com', 'google.com'])
+            for future in concurrent.futures.as_completed(futures):
+                print(future.result()['data']['indicator'])
+
+        Submissions and polls are made in the background by the client's
+        :class:`~pulsedive.polling.ResultsPoller`, which can be replaced
+        to change its settings::
+
+            pud.analyze.poller = ResultsPoller(pud.analyze, max_polls=8)
+
+        :param values: Values to be processed
+        :param enrich: Whether to enrich the indicators
+        :param probe: Whether to probe the indicators
+        """
+        with self._poller_lock:
+            if self.poller is None:
+                from .polling import ResultsPoller
+                self.poller = ResultsPoller(self)
+        return [self.poller.submit(value, enrich=enrich, probe=probe, **kwargs)
+                for value in values]
+
+    def close(self):
+        """
+        Stops the background poller used by :meth:`submit_many`
+        """
+        if self.poller is not None:
+            self.poller.close()
+
+
+def _compression_savings(r, size):
+    """
+    Returns the difference between the decoded and the transferred size of
+    a compressed response body, when the transferred size is known
+    """
+    if not r.headers.get('Content-Encoding'):
+        return 0
+    try:
+        return max(0, size - int(r.headers.get('Content-Length')))
+    except (TypeError, ValueError):
+        return 0
+
+
+class _SubClient:
+    """
+    Creates a sub-client of :class:`Pulsedive` on first access and stores it
+    on the instance
+    """
+
+    def __init__(self, name, cls):
+        self.name = name
+        self.cls = cls
+        self.__doc__ = cls.__doc__
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        return obj.__dict__.setdefault(self.name, self.cls(obj))
+
 
 class Pulsedive:
     """
@@ -432,26 +800,189 @@ class Pulsedive:
     :param sanitize: Sets the default `sanitize` option for all requests
     :param pretty: Sets the default `pretty` option for all requests
     :param raw: If set to True, the raw requests
+    :param pool_connections: Number of connection pools to cache. Default: 10
+    :param pool_maxsize: Maximum number of connections kept alive per host.
+        Set this to at least the number of threads sharing the client.
+        Default: 10
+    :param pool_block: Whether to block when no free connection is available
+        in the pool instead of opening a throwaway one. Default: False
+    :param keep_alive: Whether to reuse connections between requests.
+        Default: True
+    :param base_url: Root of the API. Default: ``https://pulsedive.com/api``
+    :param session: An existing ``requests.Session`` to use instead of creating
+        one. The client will not close a session it did not create.
+    :param transport: The HTTP stack used to send requests, an instance of one
+        of the classes in :mod:`pulsedive.transport` or the name of one of
+        ``'requests'``, ``'urllib3'`` and ``'httpx'``. The pool options apply
+        to transports created by name. The client will not close a transport
+        it did not create. Default: ``'requests'``
+    :param decoder: JSON decoder of the response bodies, the name of one of
+        ``'orjson'``, ``'msgspec'`` and ``'json'``, or a callable taking
+        ``bytes``. Default: ``'auto'``, the fastest one installed, see
+        :mod:`pulsedive.decoders`
+    :param conditional: If set to True, the ``ETag`` and ``Last-Modified``
+        validators of responses are kept and refreshes of the same resource
+        are sent as conditional requests. A ``304 Not Modified`` response is
+        answered with the stored response and counted as a cache hit. A
+        :class:`~pulsedive.cache.ValidatorStore` can be given instead.
+        Default: False
+    :param models: If set to True, indicators, threats, feeds, links and
+        search results are returned as the compact objects of
+        :mod:`pulsedive.models` instead of dicts. Can also be set per call.
+        Default: False
+    :param cache: Optional response cache, an instance of one of the classes in
+        :mod:`pulsedive.cache`. If set to True, a
+        :class:`~pulsedive.cache.MemoryCache` with default settings is used.
+    :param rate_limit: Optional maximum number of requests per second. The
+        limit is shared by all clients in the process using the same API key.
+        A :class:`~pulsedive.ratelimit.TokenBucket` can be given instead.
+    :param retry: Optional :class:`~pulsedive.ratelimit.Retry` policy for
+        rate limited (429) and server error (5xx) responses, or the number of
+        retries to make with the default policy
+    :param coalesce: If set to True, concurrent identical ``GET`` requests
+        share one HTTP request and all receive its result or exception.
+        Default: False
+    :param scheduler: Optional :class:`~pulsedive.scheduler.PriorityScheduler`
+        ordering the requests by the ``priority`` given to each call, e.g.
+        ``priority='interactive'`` or ``priority='bulk'``, or the number of
+        requests allowed in flight with the default priorities
+    :param snapshots: Optional directory, or
+        :class:`~pulsedive.snapshots.SnapshotStore`, keeping the snapshots of
+        feeds used by :meth:`~pulsedive.client.FeedClient.diff`
     :param kwargs: Other parameters that will be passed on to all calls to ``Request.get()``
-        and ``Request.post()``. Some Request keyword examples are `proxies` and `cert`
+        and ``Request.post()``. Some Request keyword examples are `proxies` and `cert`.
+        The other transports accept ``timeout`` and ``headers``.
     """
 
-    def __init__(self, api_key=None, sanitize=True, pretty=False, raw=False, **kwargs):
+    def __init__(self, api_key=None, sanitize=True, pretty=False, raw=False,
+                 pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True, base_url=PULSEDIVE_URL, session=None,
+                 cache=None, rate_limit=None, retry=None, coalesce=False,
+                 transport=None, decoder='auto', models=False, conditional=False,
+                 scheduler=None, snapshots=None, **kwargs):
 
         self.api_key = api_key
         self.pretty = pretty
         self.sanitize = sanitize
         self.args = kwargs
         self.raw = raw
+        self.models = models
+        self.base_url = base_url.rstrip('/')
+
+        # Transports created by the client are only built, and their HTTP
+        # library imported, when the first request is sent
+        pool = {
+            'pool_connections': pool_connections,
+            'pool_maxsize': pool_maxsize,
+            'pool_block': pool_block,
+            'keep_alive': keep_alive,
+        }
+        self._transport_factory = None
+        if transport is None:
+            self._transport_factory = functools.partial(RequestsTransport, session=session, **pool)
+        elif isinstance(transport, str):
+            if transport not in TRANSPORTS:
+                get_transport(transport)
+            self._transport_factory = functools.partial(get_transport, transport, **pool)
+            transport = None
+        self._owns_transport = self._transport_factory is not None
+        self._transport = transport
+        self._transport_lock = threading.Lock()
+
+        if isinstance(decoder, str) and decoder != 'auto' and decoder not in DECODERS:
+            get_decoder(decoder)
+        self._decoder_spec = decoder
+        self._decoder = None
+
+        if cache is True:
+            from .cache import MemoryCache
+            cache = MemoryCache()
+        self.cache = cache
+        if conditional is True:
+            from .cache import ValidatorStore
+            conditional = ValidatorStore()
+        self.validators = conditional if conditional is not False else None
+
+        if rate_limit is not None and not isinstance(rate_limit, TokenBucket):
+            rate_limit = get_bucket(api_key, rate_limit)
+        self.rate_limit = rate_limit
+        if retry is True:
+            retry = Retry()
+        elif isinstance(retry, int) and not isinstance(retry, bool):
+            retry = Retry(total=retry)
+        self.retry = retry or None
+        self._flight = SingleFlight() if coalesce else None
+        if scheduler is True or (isinstance(scheduler, int) and not isinstance(scheduler, bool)):
+            from .scheduler import PriorityScheduler
+            scheduler = PriorityScheduler() if scheduler is True else PriorityScheduler(scheduler)
+        self.scheduler = scheduler or None
+        if isinstance(snapshots, str):
+            from .snapshots import SnapshotStore
+            snapshots = SnapshotStore(snapshots)
+        self.snapshots = snapshots
+        self.hooks = dict((name, []) for name in HOOKS)
+
+        self._stats_lock = threading.Lock()
+        self._stats = {'requests': 0, 'retries': 0, 'throttled_time': 0.0, 'retry_time': 0.0,
+                       'decode_time': 0.0, 'not_modified': 0, 'bytes_received': 0,
+                       'bytes_saved': 0}
+
+    indicator = _SubClient('indicator', IndicatorClient)
+    threat = _SubClient('threat', ThreatClient)
+    feed = _SubClient('feed', FeedClient)
+    search = _SubClient('search', SearchClient)
+    analyze = _SubClient('analyze', AnalyzeClient)
+
+    @property
+    def transport(self):
+        """
+        The transport sending the requests, see :mod:`pulsedive.transport`
+        """
+        if self._transport is None:
+            with self._transport_lock:
+                if self._transport is None:
+                    self._transport = self._transport_factory()
+        return self._transport
+
+    @property
+    def decoder(self):
+        """
+        The callable decoding the JSON response bodies
+        """
+        if self._decoder is None:
+            self._decoder = get_decoder(self._decoder_spec)
+        return self._decoder
+
+    @property
+    def session(self):
+        """
+        The ``requests.Session`` of the default transport, otherwise None
+        """
+        return getattr(self.transport, 'session', None)
 
-        self.indicator = IndicatorClient(self)
-        self.threat = ThreatClient(self)
-        self.feed = FeedClient(self)
-        self.search = SearchClient(self)
-        self.analyze = AnalyzeClient(self)
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Closes all pooled connections. The client should not be used after
+        this is called. This is called automatically when the client is
+        used as a context manager::
+
+            with Pulsedive() as pud:
+                pud.indicator(value='pulsedive.com')
+        """
+        analyze = self.__dict__.get('analyze')
+        if analyze is not None:
+            analyze.close()
+        if self._owns_transport and self._transport is not None:
+            self._transport.close()
 
     def __send(self, method, path, params, **kwargs):
-        url = '{}/{}'.format(PULSEDIVE_URL, path)
+        url = '{}/{}'.format(self.base_url, path)
         params['pretty'] = int(kwargs.pop('pretty', self.pretty))
         params['sanitize'] = int(kwargs.pop('sanitize', self.sanitize))
         if self.api_key is not None:
@@ -460,20 +991,199 @@ class Pulsedive:
             params['page'] = kwargs.pop('page')
 
         is_raw = kwargs.pop('raw', self.raw)
+        use_cache = kwargs.pop('cache', True)
+        priority = kwargs.pop('priority', None)
 
         args = self.args.copy()
         args.update(kwargs)
 
-        if method == 'GET':
-            r = requests.get(url, params=params, **args)
-        else:
-            r = requests.post(url, data=params, **args)
+        event = RequestEvent(path, method, getattr(_operation, 'name', None))
+        if self.scheduler is not None:
+            event.priority = self.scheduler.resolve(priority)
+        self._fire('before_send', event)
+        start = time.perf_counter()
+        try:
+            if is_raw:
+                ret = self._request(method, url, params, args, event)
+            else:
+                ret = self._fetch(method, url, path, params, args, use_cache, event)
+            event.elapsed = time.perf_counter() - start
+            self._fire('after_response', event)
+            return ret if is_raw else self._check(ret)
+        except Exception as e:
+            if event.elapsed is None:
+                event.elapsed = time.perf_counter() - start
+            event.error = e
+            self._fire('error', event)
+            raise
+
+    def _fetch(self, method, url, path, params, args, use_cache, event):
+        cache = self.cache if use_cache and method == 'GET' else None
+        validators = self.validators
+        if validators is None or method != 'GET' or path not in validators.paths:
+            validators = None
+        key = None
+        if (cache is not None or validators is not None or
+                (self._flight is not None and method == 'GET')):
+            key = make_key(method, path, params)
+        if cache is not None:
+            ret = cache.get(key)
+            if ret is not None:
+                event.cache = 'hit'
+                return ret
+            event.cache = 'miss'
+
+        def fetch():
+            entry = validators.get(key) if validators is not None else None
+            request_args = args
+            if entry is not None:
+                request_args = dict(args)
+                request_args['headers'] = headers = dict(args.get('headers') or {})
+                if entry.etag is not None:
+                    headers['If-None-Match'] = entry.etag
+                if entry.last_modified is not None:
+                    headers['If-Modified-Since'] = entry.last_modified
+
+            r = self._request(method, url, params, request_args, event)
+            if r.status_code == 304 and entry is None:
+                # Only possible with conditional headers passed by the caller
+                r.close()
+                raise PulsediveException(
+                    'Received "304 Not Modified" from {} without a stored response to reuse, remove '
+                    'the If-None-Match and If-Modified-Since headers'.format(path))
+            if r.status_code == 304:
+                r.close()
+                ret = entry.response
+                event.cache = 'hit'
+                event.bytes_saved = entry.size
+                self._count('not_modified')
+                self._count('bytes_saved', entry.size)
+            else:
+                r.raise_for_status()
+                content = r.content
+                start = time.perf_counter()
+                ret = self.decoder(content)
+                event.decode_time = time.perf_counter() - start
+                event.bytes = len(content)
+                event.bytes_saved = _compression_savings(r, len(content))
+                self._count('decode_time', event.decode_time)
+                self._count('bytes_received', event.bytes)
+                self._count('bytes_saved', event.bytes_saved)
+                if validators is not None:
+                    etag = r.headers.get('ETag')
+                    last_modified = r.headers.get('Last-Modified')
+                    if (etag or last_modified) and 'error' not in ret:
+                        validators.set(key, etag, last_modified, ret, len(content))
+                    elif entry is not None:
+                        validators.discard(key)
+            if cache is not None:
+                ttl = cache.ttl_for(path, ret)
+                if ttl:
+                    cache.set(key, ret, ttl)
+            return ret
+
+        if self._flight is not None and key is not None:
+            ret, event.coalesced = self._flight.do(key, fetch)
+            return ret
+        return fetch()
+
+    def _request(self, method, url, params, args, event):
+        attempt = 0
+        while True:
+            # Requests wait for a slot of the scheduler, in priority order,
+            # before taking a token of the rate limit
+            if self.scheduler is not None:
+                event.queue_time = (event.queue_time or 0.0) + self.scheduler.acquire(event.priority)
+            try:
+                if self.rate_limit is not None:
+                    waited = self.rate_limit.acquire()
+                    if waited:
+                        self._count('throttled_time', waited)
+                self._count('requests')
+
+                r = self.transport.request(method, url, params, **args)
+            finally:
+                if self.scheduler is not None:
+                    self.scheduler.release()
+            event.status = r.status_code
+
+            delay = self.retry.delay(attempt, r, method) if self.retry is not None else None
+            if delay is None:
+                return r
+
+            if r.status_code == 429 and self.rate_limit is not None:
+                self.rate_limit.pause(delay)
+            r.close()
+            time.sleep(delay)
+            self._count('retries')
+            self._count('retry_time', delay)
+            attempt += 1
+            event.retries = attempt
+
+    def add_hook(self, name, hook):
+        """
+        Registers ``hook`` to be called with a
+        :class:`~pulsedive.metrics.RequestEvent` at a point of every request:
+
+        * ``before_send``: Before the cache is checked and the request is sent
+        * ``after_response``: After a response is received or read from the cache
+        * ``error``: When the call raises an exception, including API errors
+
+        Hooks are called in the thread making the request and should be fast.
+        """
+        if name not in self.hooks:
+            raise ValueError('Unknown hook "{}", expected one of {}'.format(name, ', '.join(HOOKS)))
+        self.hooks[name].append(hook)
+
+    def remove_hook(self, name, hook):
+        """
+        Removes a hook registered with :meth:`add_hook`
+        """
+        self.hooks[name].remove(hook)
+
+    def _fire(self, name, event):
+        for hook in self.hooks[name]:
+            hook(event)
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self._stats[name] += n
 
-        if is_raw:
-            return r
+    def stats(self):
+        """
+        Returns a snapshot of the client's counters:
+
+        * ``requests``: HTTP requests sent, including retries
+        * ``retries``: Requests that were retried
+        * ``throttled_time``: Seconds spent waiting on the rate limit
+        * ``retry_time``: Seconds spent waiting before retries
+        * ``decode_time``: Seconds spent decoding JSON responses
+        * ``not_modified``: Conditional requests answered with ``304 Not Modified``
+        * ``bytes_received``: Size of the decoded response bodies
+        * ``bytes_saved``: Bytes not transferred thanks to compression and
+          ``304 Not Modified`` responses
+        * ``coalesced``: Calls that shared the request of an identical call
+          in flight, when ``coalesce`` is enabled
+        * ``scheduler``: Queue depths and wait times per priority, see
+          :meth:`~pulsedive.scheduler.PriorityScheduler.stats`, when a
+          scheduler is used
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['coalesced'] = self._flight.stats()['coalesced'] if self._flight is not None else 0
+        if self.scheduler is not None:
+            stats['scheduler'] = self.scheduler.stats()
+        return stats
+
+    def _use_models(self, kwargs):
+        """
+        Pops the ``models`` option of a call. Raw responses are never converted.
+        """
+        models = kwargs.pop('models', self.models)
+        return models and not kwargs.get('raw', self.raw)
 
-        r.raise_for_status()
-        ret = r.json()
+    @staticmethod
+    def _check(ret):
         if 'error' in ret:
             raise PulsediveException('Error encountered with the API with error "{}'.format(ret['error']))
         return ret
@@ -483,3 +1193,54 @@ class Pulsedive:
 
     def post(self, path, data, **kwargs):
         return self.__send('POST', path, data, **kwargs)
+
+    def pivot(self, seed, depth=2, max_nodes=1000, fanout=100, indicator_links=False,
+              max_workers=8, **kwargs):
+        """
+        Crawls the indicators, threats and feeds linked to ``seed`` and
+        returns a :class:`~pulsedive.pivot.PivotGraph`::
+
+            graph = pud.pivot('pulsedive.com', depth=3, max_nodes=500)
+            json.dump(graph.to_dict(), f)
+
+        The graph is expanded breadth-first with ``max_workers`` concurrent
+        fetches. Every node is fetched once and every edge is kept once. See
+        :mod:`pulsedive.pivot`.
+
+        :arg seed: Indicator value, indicator ID, or ``(kind, id)`` tuple
+            such as ``('threat', 3)``
+        :arg depth: Number of hops from the seed. Default: 2
+        :arg max_nodes: Maximum number of nodes in the graph. Default: 1000
+        :arg fanout: Maximum number of links followed per node. Default: 100
+        :arg indicator_links: Whether to follow the related indicators of
+            indicators. Default: False
+        :arg max_workers: Number of concurrent fetches. Default: 8
+        :arg kwargs: Other parameters passed on to every call, e.g. ``priority``
+        """
+        from .pivot import Pivot
+
+        return Pivot(self, depth=depth, max_nodes=max_nodes, fanout=fanout,
+                     indicator_links=indicator_links, max_workers=max_workers,
+                     **kwargs).run(seed)
+
+    def stream(self, path, params, key='results', chunk_size=65536, **kwargs):
+        """
+        Sends a GET request and returns an iterator over the elements of the
+        ``key`` array of the response which are parsed as they are received,
+        see :func:`~pulsedive.stream.iter_json_array`
+        """
+        r = self.get(path, params, raw=True, stream=True, **kwargs)
+        try:
+            r.raise_for_status()
+        except Exception:
+            r.close()
+            raise
+        return self._iter_stream(r, key, chunk_size)
+
+    @staticmethod
+    def _iter_stream(r, key, chunk_size):
+        try:
+            for item in iter_json_array(r.iter_content(chunk_size), key=key):
+                yield item
+        finally:
+            r.close()
@@ -0,0 +1,63 @@
+"""
+JSON decoders for API responses.
+
+A decoder is a callable taking the response body as ``bytes`` and returning
+the decoded value. The client uses the fastest one installed by default::
+
+    pud = Pulsedive(decoder='orjson')
+    pud = Pulsedive(decoder=my_loads)
+
+Install ``orjson`` or ``msgspec`` to speed up large links and search
+responses, e.g. with::
+
+    pip install pulsedive[fast]
+"""
+from collections import OrderedDict
+
+
+def _orjson():
+    import orjson
+    return orjson.loads
+
+
+def _msgspec():
+    import msgspec
+    return msgspec.json.Decoder().decode
+
+
+def _json():
+    import json
+
+    def loads(content):
+        # json.loads only accepts bytes from Python 3.6
+        return json.loads(content.decode('utf-8'))
+    return loads
+
+
+#: Decoder factories by name, in order of preference
+DECODERS = OrderedDict([
+    ('orjson', _orjson),
+    ('msgspec', _msgspec),
+    ('json', _json),
+])
+
+
+def get_decoder(name='auto'):
+    """
+    Returns the decoder registered as ``name`` in :data:`DECODERS`. ``'auto'``
+    returns the first one that is installed. A callable is returned as is.
+    """
+    if callable(name):
+        return name
+    if name == 'auto':
+        for factory in DECODERS.values():
+            try:
+                return factory()
+            except ImportError:
+                pass
+    try:
+        factory = DECODERS[name]
+    except KeyError:
+        raise ValueError('Unknown decoder "{}", expected auto or one of {}'.format(
+            name, ', '.join(DECODERS)))
+    return factory()
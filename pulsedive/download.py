@@ -0,0 +1,251 @@
+"""
+Resumable and parallel downloads of large responses with HTTP ranges, used
+by :meth:`~pulsedive.client.SearchClient.to_csv`.
+
+The download is written to ``<filename>.part`` files, one per part, which are
+moved or stitched into ``filename`` once complete. If the download fails, the
+part files are kept along with ``<filename>.part.json`` so that a later call
+with ``resume=True`` only requests the missing bytes.
+
+Ranges are requested with ``Accept-Encoding: identity`` so offsets refer to
+the bytes written, and with ``If-Range`` so that the parts of an export that
+changed in the meantime are not mixed. If-Range needs the ``ETag`` or
+``Last-Modified`` of the response, so without either the download is not
+split and a resumed download starts over. If the server does not support
+ranges, the download falls back to a single request from the start.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+from .exceptions import PulsediveException
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+class Progress(namedtuple('Progress', ['bytes', 'total', 'elapsed', 'rate'])):
+    """
+    Passed to the ``progress`` callback of a download after every chunk.
+    ``bytes`` is the size downloaded so far, including bytes resumed from a
+    previous attempt, ``total`` the expected size or None if it is not known,
+    and ``rate`` the bytes per second transferred by this attempt.
+    """
+    __slots__ = ()
+
+
+def parse_content_range(value):
+    """
+    Returns ``(start, end, total)`` of a ``Content-Range`` header, ``total``
+    being None if it is not known, or None if the header is invalid
+    """
+    match = CONTENT_RANGE_RE.match(value or '')
+    if match is None:
+        return None
+    total = match.group(3)
+    return int(match.group(1)), int(match.group(2)), None if total == '*' else int(total)
+
+
+def split_ranges(total, parts):
+    """
+    Splits ``total`` bytes into at most ``parts`` inclusive ``(start, end)``
+    ranges of about the same size
+    """
+    parts = max(1, min(parts, total))
+    size, extra = divmod(total, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0) - 1
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+class _Tracker:
+    def __init__(self, callback, total):
+        self.callback = callback
+        self.total = total
+        self.bytes = 0
+        self.transferred = 0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, n, resumed=False):
+        if not n:
+            return
+        with self.lock:
+            self.bytes += n
+            if not resumed:
+                self.transferred += n
+            if self.callback is not None:
+                elapsed = time.monotonic() - self.started
+                self.callback(Progress(self.bytes, self.total, elapsed,
+                                       self.transferred / elapsed if elapsed > 0 else 0.0))
+
+
+class Download:
+    """
+    Downloads a response into ``filename``.
+
+    :param fetch: Callable taking a ``dict`` of request headers and returning
+        a streamed raw response
+    :param filename: Destination file
+    :param parts: Number of ranges downloaded concurrently. Default: 1
+    :param resume: Whether to continue from the part files left by a failed
+        download, keeping its split into parts. Default: False
+    :param progress: Optional callable receiving a :class:`Progress`
+    :param chunk_size: Size of the chunks written. Default: 65536
+    """
+
+    def __init__(self, fetch, filename, parts=1, resume=False, progress=None, chunk_size=65536):
+        self.fetch = fetch
+        self.filename = filename
+        self.parts = parts
+        self.resume = resume
+        self.progress = progress
+        self.chunk_size = chunk_size
+        self.meta_path = '{}.part.json'.format(filename)
+        self.meta = None
+
+    def _part_path(self, index):
+        if index is None:
+            return '{}.part'.format(self.filename)
+        return '{}.part{}'.format(self.filename, index)
+
+    def _save_meta(self):
+        with open(self.meta_path, 'w') as f:
+            json.dump(self.meta, f)
+
+    def _load_meta(self):
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def _probe(self):
+        r = self.fetch({'Range': 'bytes=0-0', 'Accept-Encoding': 'identity'})
+        try:
+            r.raise_for_status()
+            content_range = parse_content_range(r.headers.get('Content-Range'))
+            if r.status_code != 206 or content_range is None or content_range[2] is None:
+                return None, None, None
+            return content_range[2], r.headers.get('ETag'), r.headers.get('Last-Modified')
+        finally:
+            r.close()
+
+    def _plan(self):
+        meta = self._load_meta() if self.resume else None
+        if meta is None:
+            self._clean()
+            total, etag, last_modified = self._probe() if self.parts > 1 else (None, None, None)
+            # Parts can only be checked to belong together with a validator
+            if total is not None and total > 0 and (etag or last_modified):
+                ranges = split_ranges(total, self.parts)
+            else:
+                total = None
+                ranges = [(0, None)]
+            meta = {'total': total, 'etag': etag, 'last_modified': last_modified, 'ranges': ranges}
+        self.meta = meta
+        self._save_meta()
+
+    def _validator(self):
+        return self.meta.get('etag') or self.meta.get('last_modified')
+
+    def _clean(self):
+        paths = [self._part_path(None)] + [self._part_path(i) for i in range(max(1, self.parts))]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _download_part(self, index, start, end, tracker):
+        path = self._part_path(index)
+        done = os.path.getsize(path) if os.path.exists(path) else 0
+        if end is not None and start + done > end:
+            tracker.add(done, resumed=True)
+            return
+
+        if done and self._validator() is None:
+            # Without a validator the bytes already written cannot be checked
+            # to belong to the same export, start over
+            done = 0
+
+        headers = {}
+        if start + done > 0 or end is not None:
+            headers['Accept-Encoding'] = 'identity'
+            headers['Range'] = 'bytes={}-{}'.format(start + done, '' if end is None else end)
+            if self._validator() is not None:
+                headers['If-Range'] = self._validator()
+        r = self.fetch(headers)
+        try:
+            r.raise_for_status()
+            if 'Range' in headers:
+                total = self.meta['total']
+                if r.status_code == 206:
+                    # A part of an export of another size is not part of this one
+                    content_range = parse_content_range(r.headers.get('Content-Range'))
+                    changed = total is not None and (content_range is None or content_range[2] != total)
+                else:
+                    changed = start > 0 or end is not None
+                if changed:
+                    raise PulsediveException('The export changed during the download, '
+                                             'download it again without resume')
+                if r.status_code != 206:
+                    # The server ignored the range, start over
+                    done = 0
+            if not done and self._validator() is None:
+                self.meta['etag'] = r.headers.get('ETag')
+                self.meta['last_modified'] = r.headers.get('Last-Modified')
+                self._save_meta()
+            tracker.add(done, resumed=True)
+            with open(path, 'ab' if done else 'wb') as f:
+                for chunk in r.iter_content(self.chunk_size):
+                    f.write(chunk)
+                    tracker.add(len(chunk))
+        finally:
+            r.close()
+
+    def run(self):
+        """
+        Downloads the response and returns the size of the file
+        """
+        self._plan()
+        ranges = self.meta['ranges']
+        tracker = _Tracker(self.progress, self.meta['total'])
+
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            self._download_part(None if end is None else 0, start, end, tracker)
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [executor.submit(self._download_part, i, start, end, tracker)
+                           for i, (start, end) in enumerate(ranges)]
+                for future in futures:
+                    future.result()
+
+        paths = [self._part_path(None if end is None else i) for i, (_, end) in enumerate(ranges)]
+        size = sum(os.path.getsize(path) for path in paths)
+        if self.meta['total'] is not None and size != self.meta['total']:
+            raise PulsediveException('Downloaded {} bytes instead of {}'.format(size, self.meta['total']))
+
+        if len(paths) == 1:
+            os.replace(paths[0], self.filename)
+        else:
+            import shutil
+
+            tmp = '{}.part'.format(self.filename)
+            with open(tmp, 'wb') as out:
+                for path in paths:
+                    with open(path, 'rb') as f:
+                        shutil.copyfileobj(f, out, 1024 * 1024)
+            os.replace(tmp, self.filename)
+            for path in paths:
+                os.remove(path)
+        os.remove(self.meta_path)
+        return size
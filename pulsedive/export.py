@@ -0,0 +1,173 @@
+"""
+Columnar export of indicator results, from
+:meth:`~pulsedive.client.SearchClient.indicator`,
+:meth:`~pulsedive.client.ThreatClient.links`,
+:meth:`~pulsedive.client.FeedClient.links` and their ``iter_*`` counterparts::
+
+    from pulsedive.export import to_dataframe, to_parquet
+
+    df = to_dataframe(pud.search.indicator('zeus', limit='thousand'))
+    to_parquet(pud.feed.iter_links(1), 'feed-1.parquet')
+
+The results are converted in a single pass into one list per column. Every
+table has the same columns, in the same order and with the same types,
+whatever the source or the fields present in the results: ``iid`` is an
+integer and the other columns are strings, missing values being null.
+Nested fields are selected with dotted paths, e.g.
+``'summary.properties.geo.country'``, and lists or dicts are stored as JSON.
+
+This requires ``pandas`` for DataFrames and ``pyarrow`` for Arrow and
+Parquet, which can be installed with::
+
+    pip install pulsedive[export]
+"""
+import json
+
+#: Default columns of every table
+INDICATOR_COLUMNS = ('iid', 'indicator', 'type', 'risk', 'stamp_added',
+                     'stamp_updated', 'stamp_seen', 'stamp_linked')
+
+# Columns that are not strings
+INTEGER_COLUMNS = frozenset(['iid', 'tid', 'fid'])
+
+
+def _results(results):
+    # Accepts a whole response as well as a list or iterator of results
+    if isinstance(results, dict):
+        return results.get('results', [])
+    return results
+
+
+def _getter(column):
+    path = column.split('.')
+    if len(path) == 1:
+        return lambda result: result.get(column)
+
+    def dig(result):
+        for key in path:
+            get = getattr(result, 'get', None)
+            if get is None:
+                return None
+            result = get(key)
+        return result
+    return dig
+
+
+def _converter(column):
+    if column in INTEGER_COLUMNS:
+        return lambda value: value if value is None else int(value)
+
+    def to_str(value):
+        if value is None or isinstance(value, str):
+            return value
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, sort_keys=True)
+        return str(value)
+    return to_str
+
+
+def iter_columns(results, columns=INDICATOR_COLUMNS, batch_size=None):
+    """
+    Yields ``dict`` of column name to list of values, one per batch of
+    ``batch_size`` results, or a single one with all the results when
+    ``batch_size`` is None. Results can be dicts or
+    :mod:`pulsedive.models` objects.
+    """
+    columns = tuple(columns)
+    getters = [_getter(column) for column in columns]
+    converters = [_converter(column) for column in columns]
+    data = [[] for _ in columns]
+    size = 0
+    for result in _results(results):
+        for values, get, convert in zip(data, getters, converters):
+            values.append(convert(get(result)))
+        size += 1
+        if batch_size is not None and size >= batch_size:
+            yield dict(zip(columns, data))
+            data = [[] for _ in columns]
+            size = 0
+    if size or batch_size is None:
+        yield dict(zip(columns, data))
+
+
+def to_columns(results, columns=INDICATOR_COLUMNS):
+    """
+    Returns a ``dict`` of column name to list of values
+    """
+    return next(iter_columns(results, columns))
+
+
+def schema(columns=INDICATOR_COLUMNS):
+    """
+    Returns the ``pyarrow.Schema`` of the tables with ``columns``
+    """
+    pa = _pyarrow()
+    return pa.schema([(column, pa.int64() if column in INTEGER_COLUMNS else pa.string())
+                      for column in columns])
+
+
+def iter_record_batches(results, columns=INDICATOR_COLUMNS, batch_size=65536):
+    """
+    Yields ``pyarrow.RecordBatch`` of at most ``batch_size`` rows
+    """
+    pa = _pyarrow()
+    table_schema = schema(columns)
+    for data in iter_columns(results, columns, batch_size):
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(data[field.name], type=field.type) for field in table_schema],
+            schema=table_schema)
+
+
+def to_arrow(results, columns=INDICATOR_COLUMNS, batch_size=65536):
+    """
+    Returns a ``pyarrow.Table``
+    """
+    pa = _pyarrow()
+    return pa.Table.from_batches(list(iter_record_batches(results, columns, batch_size)),
+                                 schema=schema(columns))
+
+
+def to_parquet(results, path, columns=INDICATOR_COLUMNS, batch_size=65536, **kwargs):
+    """
+    Writes the results to a Parquet file one batch at a time, so iterators
+    such as :meth:`~pulsedive.client.FeedClient.iter_links` are exported
+    with constant memory. Returns the number of rows written.
+
+    :param kwargs: Other parameters passed on to ``pyarrow.parquet.ParquetWriter``
+    """
+    _pyarrow()
+    import pyarrow.parquet as pq
+
+    rows = 0
+    with pq.ParquetWriter(path, schema(columns), **kwargs) as writer:
+        for batch in iter_record_batches(results, columns, batch_size):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def to_dataframe(results, columns=INDICATOR_COLUMNS):
+    """
+    Returns a ``pandas.DataFrame``. ``iid`` uses the nullable ``Int64``
+    type and the other columns the ``object`` type.
+    """
+    try:
+        import pandas as pd
+    except ImportError:
+        raise ImportError('to_dataframe requires pandas, install it with '
+                          '"pip install pulsedive[export]"')
+    data = to_columns(results, columns)
+    df = pd.DataFrame(data, columns=list(columns))
+    for column in columns:
+        if column in INTEGER_COLUMNS:
+            df[column] = pd.array(data[column], dtype='Int64')
+    return df
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError('Arrow and Parquet export require pyarrow, install it with '
+                          '"pip install pulsedive[export]"')
+    return pyarrow
@@ -0,0 +1,210 @@
+"""
+Offline index of the indicators linked to feeds and threats.
+"""
+import sqlite3
+import time
+from collections import namedtuple
+
+
+class IndexEntry(namedtuple('IndexEntry', ['iid', 'type', 'risk', 'threats', 'feeds'])):
+    """
+    Indicator in a :class:`LocalIndex`. ``threats`` and ``feeds`` are tuples of
+    the threat and feed IDs that link to it.
+    """
+    __slots__ = ()
+
+BATCH_SIZE = 10000
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS indicators ('
+    'value TEXT PRIMARY KEY, iid INTEGER, type TEXT, risk TEXT) WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS members ('
+    'kind TEXT, id INTEGER, value TEXT, PRIMARY KEY (kind, id, value)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS members_value ON members (value)',
+    'CREATE TABLE IF NOT EXISTS sources ('
+    'kind TEXT, id INTEGER, synced REAL, count INTEGER, PRIMARY KEY (kind, id))',
+]
+
+
+class LocalIndex:
+    """
+    Keeps the indicators linked to feeds and threats in a SQLite file and
+    answers lookups from memory without calling the API::
+
+        from pulsedive import Pulsedive
+        from pulsedive.index import LocalIndex
+
+        index = LocalIndex('iocs.db', Pulsedive('<API KEY>'))
+        index.sync(feeds=[1, 2], threats=[1])
+
+        entry = index.lookup('afobal.cl')
+        if entry is not None and entry.risk in ('high', 'critical'):
+            ...
+
+    Links are streamed with :meth:`~pulsedive.client.FeedClient.iter_links`
+    and :meth:`~pulsedive.client.ThreatClient.iter_links`. A re-sync only
+    writes the differences with the stored membership. Indicators that are no
+    longer linked to any feed or threat are removed.
+
+    :param path: Location of the database file
+    :param pud: :class:`~pulsedive.Pulsedive` client used to sync. Only
+        needed to call the ``sync`` methods.
+    """
+
+    def __init__(self, path, pud=None):
+        self.path = path
+        self.pud = pud
+        self.conn = sqlite3.connect(path)
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+        self._entries = None
+
+    def close(self):
+        self.conn.close()
+
+    def sync_feed(self, fid, **kwargs):
+        """
+        Updates the indicators linked to feed ``fid``
+
+        :return: The number of linked indicators
+        """
+        return self._sync('feed', int(fid), self.pud.feed.iter_links(fid, **kwargs))
+
+    def sync_threat(self, tid, **kwargs):
+        """
+        Updates the indicators linked to threat ``tid``
+
+        :return: The number of linked indicators
+        """
+        return self._sync('threat', int(tid), self.pud.threat.iter_links(tid, **kwargs))
+
+    def sync(self, feeds=(), threats=(), **kwargs):
+        """
+        Updates the given feeds and threats
+        """
+        for fid in feeds:
+            self.sync_feed(fid, **kwargs)
+        for tid in threats:
+            self.sync_threat(tid, **kwargs)
+
+    def resync(self, **kwargs):
+        """
+        Updates every feed and threat that was synced before
+        """
+        sources = self.sources()
+        self.sync(feeds=[i for kind, i, _, _ in sources if kind == 'feed'],
+                  threats=[i for kind, i, _, _ in sources if kind == 'threat'], **kwargs)
+
+    def remove(self, kind, id):
+        """
+        Removes a feed or threat from the index
+
+        :param kind: Either 'feed' or 'threat'
+        :param id: Feed or threat ID
+        """
+        with self.conn:
+            self.conn.execute('DELETE FROM members WHERE kind = ? AND id = ?', (kind, int(id)))
+            self.conn.execute('DELETE FROM sources WHERE kind = ? AND id = ?', (kind, int(id)))
+            self._prune()
+        self._entries = None
+
+    def sources(self):
+        """
+        Returns ``(kind, id, synced, count)`` for every synced feed and threat
+        """
+        return self.conn.execute('SELECT kind, id, synced, count FROM sources '
+                                 'ORDER BY kind, id').fetchall()
+
+    def _sync(self, kind, id, links):
+        conn = self.conn
+        with conn:
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS synced (value TEXT PRIMARY KEY) WITHOUT ROWID')
+            conn.execute('DELETE FROM synced')
+            count = 0
+            batch = []
+            for link in links:
+                batch.append((link['indicator'], int(link['iid']), link.get('type'), link.get('risk')))
+                if len(batch) >= BATCH_SIZE:
+                    count += self._write_batch(batch)
+                    batch = []
+            count += self._write_batch(batch)
+
+            conn.execute('DELETE FROM members WHERE kind = ? AND id = ? AND value NOT IN '
+                         '(SELECT value FROM synced)', (kind, id))
+            conn.execute('INSERT OR IGNORE INTO members (kind, id, value) '
+                         'SELECT ?, ?, value FROM synced', (kind, id))
+            conn.execute('INSERT OR REPLACE INTO sources (kind, id, synced, count) VALUES (?, ?, ?, ?)',
+                         (kind, id, time.time(), count))
+            self._prune()
+        self._entries = None
+        return count
+
+    def _write_batch(self, batch):
+        # Only rows whose attributes changed are rewritten
+        self.conn.executemany(
+            'INSERT INTO indicators (value, iid, type, risk) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (value) DO UPDATE SET iid = excluded.iid, type = excluded.type, '
+            'risk = excluded.risk WHERE iid IS NOT excluded.iid OR type IS NOT excluded.type '
+            'OR risk IS NOT excluded.risk', batch)
+        self.conn.executemany('INSERT OR IGNORE INTO synced (value) VALUES (?)',
+                              [(row[0],) for row in batch])
+        return len(batch)
+
+    def _prune(self):
+        self.conn.execute('DELETE FROM indicators WHERE value NOT IN (SELECT value FROM members)')
+
+    def load(self):
+        """
+        Loads the index into memory. This is done automatically on the first
+        lookup after a sync.
+        """
+        membership = {}
+        for kind, id, value in self.conn.execute('SELECT kind, id, value FROM members ORDER BY kind, id'):
+            threats, feeds = membership.get(value, ((), ()))
+            if kind == 'threat':
+                threats += (id,)
+            else:
+                feeds += (id,)
+            membership[value] = (threats, feeds)
+
+        # Identical membership tuples are shared between entries
+        shared = {}
+        entries = {}
+        for value, iid, type_, risk in self.conn.execute('SELECT value, iid, type, risk FROM indicators'):
+            threats, feeds = membership.get(value, ((), ()))
+            threats = shared.setdefault(threats, threats)
+            feeds = shared.setdefault(feeds, feeds)
+            entries[value] = IndexEntry(iid, shared.setdefault(type_, type_),
+                                        shared.setdefault(risk, risk), threats, feeds)
+        self._entries = entries
+        return self
+
+    @property
+    def entries(self):
+        """
+        ``dict`` mapping every indicator value to its :class:`IndexEntry`.
+        Use this directly in hot loops.
+        """
+        if self._entries is None:
+            self.load()
+        return self._entries
+
+    def lookup(self, value):
+        """
+        Returns the :class:`IndexEntry` of ``value`` or None
+        """
+        return self.entries.get(value)
+
+    def risk(self, value):
+        """
+        Returns the risk of ``value`` or None if it is not in the index
+        """
+        entry = self.entries.get(value)
+        return entry.risk if entry is not None else None
+
+    def __contains__(self, value):
+        return value in self.entries
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,233 @@
+"""
+Request instrumentation for :class:`~pulsedive.Pulsedive`.
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+
+HOOKS = ('before_send', 'after_response', 'error')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class RequestEvent:
+    """
+    Passed to the hooks registered with :meth:`~pulsedive.Pulsedive.add_hook`.
+    Attributes that do not apply, or are not known yet when the hook is
+    called, are None.
+
+    :ivar endpoint: API endpoint, e.g. ``'info.php'``
+    :ivar method: HTTP method
+    :ivar operation: Sub-client method that made the call, e.g. ``'indicator.get'``
+    :ivar status: HTTP status code
+    :ivar bytes: Size of the response body
+    :ivar bytes_saved: Bytes not transferred thanks to compression or a
+        ``304 Not Modified`` response
+    :ivar elapsed: Wall time of the call in seconds
+    :ivar decode_time: Seconds spent decoding the JSON body
+    :ivar priority: Priority of the call when the client has a scheduler
+    :ivar queue_time: Seconds spent waiting for a slot of the scheduler
+    :ivar retries: Number of retries made
+    :ivar cache: ``'hit'`` or ``'miss'`` when a cache is used
+    :ivar coalesced: Whether the call shared the request of an identical call
+    :ivar error: The exception raised by the call
+    """
+    __slots__ = ('endpoint', 'method', 'operation', 'status', 'bytes', 'bytes_saved', 'elapsed',
+                 'decode_time', 'priority', 'queue_time', 'retries', 'cache', 'coalesced', 'error')
+
+    def __init__(self, endpoint, method, operation=None):
+        self.endpoint = endpoint
+        self.method = method
+        self.operation = operation
+        self.status = None
+        self.bytes = None
+        self.bytes_saved = None
+        self.elapsed = None
+        self.decode_time = None
+        self.priority = None
+        self.queue_time = None
+        self.retries = 0
+        self.cache = None
+        self.coalesced = False
+        self.error = None
+
+    def __repr__(self):
+        return '<RequestEvent {} {} status={} elapsed={}>'.format(
+            self.method, self.endpoint, self.status, self.elapsed)
+
+
+def _labels(**labels):
+    parts = []
+    for name, value in sorted(labels.items()):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append('{}="{}"'.format(name, value))
+    return '{' + ','.join(parts) + '}'
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsCollector:
+    """
+    Collects per-endpoint latency histograms and counters from the request
+    hooks of one or more clients::
+
+        from pulsedive.metrics import MetricsCollector
+
+        metrics = MetricsCollector()
+        metrics.install(pud)
+        ...
+        print(metrics.to_prometheus())
+
+    :param buckets: Upper bounds of the latency histogram buckets in seconds
+    :param prefix: Prefix of the metric names. Default: 'pulsedive'
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='pulsedive'):
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._decode = defaultdict(float)
+        self._requests = defaultdict(int)
+        self._errors = defaultdict(int)
+        self._bytes = defaultdict(int)
+        self._bytes_saved = defaultdict(int)
+        self._retries = defaultdict(int)
+        self._cache = defaultdict(int)
+        self._coalesced = defaultdict(int)
+        self._queue_time = defaultdict(float)
+        self._scheduled = defaultdict(int)
+        self._schedulers = []
+
+    def install(self, pud):
+        """
+        Registers the collector's hooks on ``pud``
+        """
+        pud.add_hook('after_response', self.observe)
+        pud.add_hook('error', self.observe_error)
+        scheduler = getattr(pud, 'scheduler', None)
+        if scheduler is not None and scheduler not in self._schedulers:
+            self._schedulers.append(scheduler)
+        return self
+
+    def observe(self, event):
+        """
+        Records a completed call. Used as the ``after_response`` hook.
+        """
+        endpoint = event.endpoint
+        with self._lock:
+            hist = self._latency.get(endpoint)
+            if hist is None:
+                hist = self._latency[endpoint] = _Histogram(len(self.buckets))
+            index = bisect.bisect_left(self.buckets, event.elapsed)
+            if index < len(self.buckets):
+                hist.counts[index] += 1
+            hist.sum += event.elapsed
+            hist.count += 1
+
+            status = str(event.status) if event.status is not None else ''
+            self._requests[(endpoint, event.operation or '', status)] += 1
+            if event.bytes:
+                self._bytes[endpoint] += event.bytes
+            if event.bytes_saved:
+                self._bytes_saved[endpoint] += event.bytes_saved
+            if event.decode_time:
+                self._decode[endpoint] += event.decode_time
+            if event.retries:
+                self._retries[endpoint] += event.retries
+            if event.cache is not None:
+                self._cache[(endpoint, event.cache)] += 1
+            if event.coalesced:
+                self._coalesced[endpoint] += 1
+            if event.queue_time is not None:
+                self._queue_time[event.priority] += event.queue_time
+                self._scheduled[event.priority] += 1
+
+    def observe_error(self, event):
+        """
+        Records a failed call. Used as the ``error`` hook.
+        """
+        with self._lock:
+            self._errors[(event.endpoint, event.operation or '', type(event.error).__name__)] += 1
+
+    def throughput(self):
+        """
+        Returns the average number of calls per second per endpoint since the
+        collector was created
+        """
+        elapsed = max(time.time() - self.started, 1e-9)
+        with self._lock:
+            return dict((endpoint, hist.count / elapsed) for endpoint, hist in self._latency.items())
+
+    def to_prometheus(self):
+        """
+        Returns the metrics in the Prometheus text exposition format
+        """
+        p = self.prefix
+        lines = []
+
+        def header(name, kind, text):
+            lines.append('# HELP {}_{} {}'.format(p, name, text))
+            lines.append('# TYPE {}_{} {}'.format(p, name, kind))
+
+        def counter(name, text, values, label_names):
+            header(name, 'counter', text)
+            for key, value in sorted(values.items()):
+                key = key if isinstance(key, tuple) else (key,)
+                labels = _labels(**dict(zip(label_names, key)))
+                lines.append('{}_{}{} {}'.format(p, name, labels, value))
+
+        with self._lock:
+            header('request_duration_seconds', 'histogram', 'Wall time of API calls')
+            for endpoint, hist in sorted(self._latency.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, hist.counts):
+                    cumulative += count
+                    lines.append('{}_request_duration_seconds_bucket{} {}'.format(
+                        p, _labels(endpoint=endpoint, le=repr(float(bound))), cumulative))
+                lines.append('{}_request_duration_seconds_bucket{} {}'.format(
+                    p, _labels(endpoint=endpoint, le='+Inf'), hist.count))
+                lines.append('{}_request_duration_seconds_sum{} {}'.format(
+                    p, _labels(endpoint=endpoint), hist.sum))
+                lines.append('{}_request_duration_seconds_count{} {}'.format(
+                    p, _labels(endpoint=endpoint), hist.count))
+
+            counter('requests_total', 'Completed API calls', self._requests,
+                    ('endpoint', 'operation', 'status'))
+            counter('errors_total', 'Failed API calls', self._errors,
+                    ('endpoint', 'operation', 'error'))
+            counter('response_bytes_total', 'Bytes received', self._bytes, ('endpoint',))
+            counter('response_bytes_saved_total', 'Bytes saved by compression and 304 responses',
+                    self._bytes_saved, ('endpoint',))
+            counter('decode_seconds_total', 'Time spent decoding JSON', self._decode, ('endpoint',))
+            counter('retries_total', 'Retried requests', self._retries, ('endpoint',))
+            counter('cache_total', 'Cache lookups by result', self._cache, ('endpoint', 'result'))
+            counter('coalesced_total', 'Calls that shared an identical request', self._coalesced,
+                    ('endpoint',))
+            counter('scheduled_total', 'Calls sent through the scheduler', self._scheduled,
+                    ('priority',))
+            counter('queue_wait_seconds_total', 'Time spent waiting for a scheduler slot',
+                    self._queue_time, ('priority',))
+            if self._schedulers:
+                queued = defaultdict(int)
+                active = 0
+                for scheduler in self._schedulers:
+                    stats = scheduler.stats()
+                    active += stats['active']
+                    for name, queue in stats['queues'].items():
+                        queued[name] += queue['queued']
+                header('scheduler_active', 'gauge', 'Requests holding a scheduler slot')
+                lines.append('{}_scheduler_active {}'.format(p, active))
+                header('scheduler_queue_depth', 'gauge', 'Requests waiting for a scheduler slot')
+                for name, depth in sorted(queued.items()):
+                    lines.append('{}_scheduler_queue_depth{} {}'.format(p, _labels(priority=name), depth))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,282 @@
+"""
+Compact result objects, returned instead of dicts when the client is created
+with ``models=True`` or a call is made with ``models=True``::
+
+    pud = Pulsedive(models=True)
+    for link in pud.feed.iter_links(1):
+        print(link.iid, link.value, link.risk)
+
+Models use ``__slots__`` instead of a ``dict`` per object. The indicator
+value, type, risk and other low-cardinality strings are interned so results
+repeating them share one string, and IDs are stored as ``int``. Rarely used
+nested sections, such as ``properties`` or ``summary``, and any fields that
+are not known to the model are kept as compact JSON and only decoded when
+they are accessed.
+
+Fields can also be read with the API's keys, e.g. ``link['indicator']``.
+"""
+import json
+import sys
+
+_intern = sys.intern
+
+
+def _slots(fields, sections):
+    return tuple(attr for attr, _, _ in fields) + tuple('_' + attr for attr, _ in sections)
+
+
+def _model(cls):
+    """
+    Class decorator of the models adding the section descriptors and the
+    mapping of the API's keys to attributes
+    """
+    for attr, _ in cls._sections:
+        setattr(cls, attr, _Section('_' + attr))
+    cls._attrs = dict((key, attr) for attr, key, _ in cls._fields)
+    cls._attrs.update((key, attr) for attr, key in cls._sections)
+    return cls
+
+
+def _pack(value):
+    # Empty sections are not worth encoding
+    if not value:
+        return value
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class _Section:
+    """
+    Decodes a packed section on first access and keeps the decoded value
+    """
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        value = getattr(obj, self.slot)
+        if isinstance(value, bytes):
+            value = json.loads(value.decode('utf-8'))
+            setattr(obj, self.slot, value)
+        return value
+
+
+class Model:
+    """
+    Base class of the result models.
+
+    ``_fields`` lists ``(attribute, key, convert)`` of the fields stored
+    directly, ``_sections`` lists ``(attribute, key)`` of the nested sections
+    decoded lazily. Other keys go to :attr:`extra`. Subclasses are decorated
+    with ``_model``.
+    """
+    __slots__ = ('_extra',)
+    _fields = ()
+    _sections = ()
+
+    #: Fields of the result that are not attributes of the model
+    extra = _Section('_extra')
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates the model from a result of the API
+        """
+        obj = cls.__new__(cls)
+        for attr, key, convert in cls._fields:
+            value = data.get(key)
+            if value is not None and convert is not None:
+                value = convert(value)
+            setattr(obj, attr, value)
+        for attr, key in cls._sections:
+            setattr(obj, '_' + attr, _pack(data.get(key)))
+        attrs = cls._attrs
+        obj._extra = _pack(dict((k, v) for k, v in data.items() if k not in attrs)) or None
+        return obj
+
+    def to_dict(self):
+        """
+        Returns the result as a ``dict`` with the API's keys
+        """
+        data = dict(self.extra or ())
+        for key, attr in self._attrs.items():
+            data[key] = getattr(self, attr)
+        return data
+
+    def __getitem__(self, key):
+        attr = self._attrs.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        extra = self.extra
+        if not extra:
+            raise KeyError(key)
+        return extra[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self):
+        attr, _, _ = self._fields[0]
+        return '<{} {}={!r} {}={!r}>'.format(
+            type(self).__name__, attr, getattr(self, attr),
+            self._fields[1][0], getattr(self, self._fields[1][0]))
+
+
+@_model
+class Link(Model):
+    """
+    Indicator linked to a threat, a feed or another indicator
+    """
+    _fields = (
+        ('iid', 'iid', int),
+        ('value', 'indicator', _intern),
+        ('type', 'type', _intern),
+        ('risk', 'risk', _intern),
+        ('stamp_added', 'stamp_added', None),
+        ('stamp_updated', 'stamp_updated', None),
+        ('stamp_seen', 'stamp_seen', None),
+        ('stamp_linked', 'stamp_linked', None),
+    )
+    _sections = (
+        ('summary', 'summary'),
+    )
+    __slots__ = _slots(_fields, _sections)
+
+
+@_model
+class SearchHit(Model):
+    """
+    Indicator returned by :meth:`~pulsedive.client.SearchClient.indicator`
+    """
+    _fields = (
+        ('iid', 'iid', int),
+        ('value', 'indicator', _intern),
+        ('type', 'type', _intern),
+        ('risk', 'risk', _intern),
+        ('stamp_added', 'stamp_added', None),
+        ('stamp_updated', 'stamp_updated', None),
+        ('stamp_seen', 'stamp_seen', None),
+        ('stamp_probed', 'stamp_probed', None),
+        ('stamp_retired', 'stamp_retired', None),
+        ('recent', 'recent', None),
+    )
+    _sections = (
+        ('summary', 'summary'),
+    )
+    __slots__ = _slots(_fields, _sections)
+
+
+@_model
+class Indicator(Model):
+    """
+    Indicator returned by :meth:`~pulsedive.client.IndicatorClient.get`
+    """
+    _fields = (
+        ('iid', 'iid', int),
+        ('value', 'indicator', _intern),
+        ('type', 'type', _intern),
+        ('risk', 'risk', _intern),
+        ('risk_recommended', 'risk_recommended', _intern),
+        ('manualrisk', 'manualrisk', None),
+        ('retired', 'retired', None),
+        ('stamp_added', 'stamp_added', None),
+        ('stamp_updated', 'stamp_updated', None),
+        ('stamp_seen', 'stamp_seen', None),
+        ('stamp_probed', 'stamp_probed', None),
+        ('stamp_retired', 'stamp_retired', None),
+        ('recent', 'recent', None),
+        ('submissions', 'submissions', None),
+        ('umbrella_rank', 'umbrella_rank', None),
+        ('umbrella_domain', 'umbrella_domain', None),
+    )
+    _sections = (
+        ('riskfactors', 'riskfactors'),
+        ('redirects', 'redirects'),
+        ('threats', 'threats'),
+        ('feeds', 'feeds'),
+        ('comments', 'comments'),
+        ('attributes', 'attributes'),
+        ('properties', 'properties'),
+    )
+    __slots__ = _slots(_fields, _sections)
+
+
+@_model
+class Threat(Model):
+    """
+    Threat returned by :meth:`~pulsedive.client.ThreatClient.get` and
+    :meth:`~pulsedive.client.SearchClient.threat`
+    """
+    _fields = (
+        ('tid', 'tid', int),
+        ('name', 'threat', _intern),
+        ('category', 'category', _intern),
+        ('risk', 'risk', _intern),
+        ('description', 'description', None),
+        ('stamp_added', 'stamp_added', None),
+        ('stamp_updated', 'stamp_updated', None),
+        ('stamp_seen', 'stamp_seen', None),
+        ('stamp_linked', 'stamp_linked', None),
+    )
+    _sections = (
+        ('wikisummary', 'wikisummary'),
+        ('othernames', 'othernames'),
+        ('wikireferences', 'wikireferences'),
+        ('news', 'news'),
+        ('attributes', 'attributes'),
+    )
+    __slots__ = _slots(_fields, _sections)
+
+
+@_model
+class Feed(Model):
+    """
+    Feed returned by :meth:`~pulsedive.client.FeedClient.get` and
+    :meth:`~pulsedive.client.SearchClient.feed`
+    """
+    _fields = (
+        ('fid', 'fid', int),
+        ('name', 'feed', _intern),
+        ('category', 'category', _intern),
+        ('organization', 'organization', _intern),
+        ('website', 'website', None),
+        ('schedule', 'schedule', _intern),
+        ('pricing', 'pricing', _intern),
+        ('stamp_added', 'stamp_added', None),
+        ('stamp_updated', 'stamp_updated', None),
+        ('stamp_pulled', 'stamp_pulled', None),
+        ('stamp_linked', 'stamp_linked', None),
+    )
+    __slots__ = _slots(_fields, ())
+
+
+def _results(ret, cls):
+    """
+    Converts the ``results`` of a links or search response. The response is
+    copied as it may be held by the cache.
+    """
+    results = ret.get('results')
+    if results:
+        ret = dict(ret)
+        ret['results'] = [cls.from_dict(item) for item in results]
+    return ret
+
+
+def _grouped(ret, cls):
+    """
+    Converts the lists of a response grouping results by kind, such as the
+    links of an indicator
+    """
+    return dict((kind, [cls.from_dict(item) for item in items] if isinstance(items, list) else items)
+                for kind, items in ret.items())
@@ -0,0 +1,259 @@
+"""
+Multi-hop pivoting across indicators, threats and feeds, from
+:meth:`pulsedive.Pulsedive.pivot`::
+
+    graph = pud.pivot('pulsedive.com', depth=2, max_nodes=500)
+    for kind, id_ in graph.neighbors(('indicator', 1)):
+        print(kind, id_, graph.label((kind, id_)))
+
+The graph is expanded breadth-first, one level at a time, with the nodes of a
+level fetched concurrently:
+
+* An indicator links to the threats and feeds it is part of, and to its
+  related indicators when ``indicator_links`` is set
+* A threat or a feed links to its indicators
+
+Nodes are identified by ``(kind, id)`` tuples, e.g. ``('threat', 3)``, and
+are only fetched once. Edges are undirected and stored once. At most
+``fanout`` links are followed per node, read incrementally so large threats
+and feeds are not downloaded in full, and no more than ``max_nodes`` nodes
+are added.
+"""
+from array import array
+from itertools import islice
+
+INDICATOR = 'indicator'
+THREAT = 'threat'
+FEED = 'feed'
+
+
+class PivotGraph:
+    """
+    Undirected graph of indicators, threats and feeds.
+
+    Nodes are numbered in the order they were found, the seed being 0, and
+    the neighbors of each node are kept in an ``array`` of node numbers.
+
+    :ivar nodes: ``(kind, id)`` of every node
+    :ivar labels: Indicator value, or threat or feed name, of every node
+    :ivar depths: Number of hops between every node and the seed
+    :ivar errors: ``dict`` of ``(kind, id)`` to the error raised when the
+        node was expanded
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.labels = []
+        self.depths = array('B')
+        self.errors = {}
+        self._index = {}
+        self._adjacency = []
+        self._edges = set()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return tuple(node) in self._index
+
+    def add_node(self, node, label=None, depth=0):
+        """
+        Adds ``node`` if it is not in the graph yet and returns its number
+        """
+        index = self._index.get(node)
+        if index is None:
+            index = self._index[node] = len(self.nodes)
+            self.nodes.append(node)
+            self.labels.append(label)
+            self.depths.append(min(depth, 255))
+            self._adjacency.append(array('I'))
+        elif label is not None and self.labels[index] is None:
+            self.labels[index] = label
+        return index
+
+    def add_edge(self, a, b):
+        """
+        Links the nodes numbered ``a`` and ``b``. Returns False if they were
+        already linked.
+        """
+        if a == b:
+            return False
+        key = (a << 32) | b if a < b else (b << 32) | a
+        if key in self._edges:
+            return False
+        self._edges.add(key)
+        self._adjacency[a].append(b)
+        self._adjacency[b].append(a)
+        return True
+
+    def index(self, node):
+        """
+        Returns the number of ``node``
+        """
+        return self._index[tuple(node)]
+
+    def label(self, node):
+        """
+        Returns the indicator value, or threat or feed name, of ``node``
+        """
+        return self.labels[self.index(node)]
+
+    def neighbors(self, node):
+        """
+        Returns the ``(kind, id)`` of the nodes linked to ``node``
+        """
+        return [self.nodes[i] for i in self._adjacency[self.index(node)]]
+
+    def edges(self):
+        """
+        Yields every edge once as a pair of ``(kind, id)``
+        """
+        nodes = self.nodes
+        for a, neighbors in enumerate(self._adjacency):
+            for b in neighbors:
+                if a < b:
+                    yield nodes[a], nodes[b]
+
+    @property
+    def edge_count(self):
+        """
+        Number of edges
+        """
+        return len(self._edges)
+
+    def to_dict(self):
+        """
+        Returns the graph as JSON-serializable lists of nodes and edges,
+        edges referring to nodes by their position
+        """
+        return {
+            'nodes': [{'kind': kind, 'id': id_, 'label': label, 'depth': depth}
+                      for (kind, id_), label, depth in zip(self.nodes, self.labels, self.depths)],
+            'edges': [[a, b] for a, neighbors in enumerate(self._adjacency)
+                      for b in neighbors if a < b],
+        }
+
+    def __repr__(self):
+        return '<PivotGraph nodes={} edges={}>'.format(len(self.nodes), len(self._edges))
+
+
+def _close(items):
+    close = getattr(items, 'close', None)
+    if close is not None:
+        close()
+
+
+class Pivot:
+    """
+    Breadth-first crawler building a :class:`PivotGraph`.
+
+    :param pud: :class:`~pulsedive.Pulsedive` client
+    :param depth: Number of hops from the seed. Default: 2
+    :param max_nodes: Maximum number of nodes in the graph. Default: 1000
+    :param fanout: Maximum number of links followed per node. Default: 100
+    :param indicator_links: Whether to follow the related indicators of
+        indicators. Default: False
+    :param max_workers: Number of concurrent fetches. Keep this at or below
+        the client's ``pool_maxsize``. Default: 8
+    :param kwargs: Other parameters passed on to every call, e.g. ``priority``
+    """
+
+    def __init__(self, pud, depth=2, max_nodes=1000, fanout=100, indicator_links=False,
+                 max_workers=8, **kwargs):
+        kwargs.pop('models', None)
+        self.pud = pud
+        self.depth = depth
+        self.max_nodes = max_nodes
+        self.fanout = fanout
+        self.indicator_links = indicator_links
+        self.max_workers = max_workers
+        self.kwargs = kwargs
+
+    def _links(self, items):
+        items = iter(items)
+        try:
+            return [((INDICATOR, int(link['iid'])), link.get('indicator'))
+                    for link in islice(items, self.fanout)]
+        finally:
+            _close(items)
+
+    def _expand_indicator(self, iid, info=None):
+        pud = self.pud
+        if info is None:
+            info = pud.indicator.get(iid=iid, **self.kwargs)
+        found = []
+        for threat in info.get('threats') or ():
+            found.append(((THREAT, int(threat['tid'])), threat.get('name')))
+        for feed in info.get('feeds') or ():
+            found.append(((FEED, int(feed['fid'])), feed.get('name')))
+        if self.indicator_links and len(found) < self.fanout:
+            for items in pud.indicator.links(iid, **self.kwargs).values():
+                if isinstance(items, list):
+                    found.extend(((INDICATOR, int(link['iid'])), link.get('indicator'))
+                                 for link in items)
+        return info.get('indicator'), found[:self.fanout]
+
+    def expand(self, node, info=None):
+        """
+        Fetches ``node`` and returns its label and the ``((kind, id), label)``
+        of the nodes it links to
+        """
+        kind, id_ = node
+        if kind == INDICATOR:
+            return self._expand_indicator(id_, info)
+        if kind == THREAT:
+            return None, self._links(self.pud.threat.iter_links(id_, **self.kwargs))
+        if kind == FEED:
+            return None, self._links(self.pud.feed.iter_links(id_, **self.kwargs))
+        raise ValueError('Unknown node kind "{}"'.format(kind))
+
+    def _seed(self, seed):
+        # Indicator values are looked up once to find their iid, and the
+        # response is reused to expand the seed
+        if isinstance(seed, tuple):
+            kind, id_ = seed
+            return (kind, int(id_)), None
+        if isinstance(seed, int):
+            return (INDICATOR, seed), None
+        info = self.pud.indicator.get(value=seed, **self.kwargs)
+        return (INDICATOR, int(info['iid'])), info
+
+    def _expand_safe(self, node, info):
+        try:
+            return self.expand(node, info), None
+        except Exception as e:
+            return None, e
+
+    def run(self, seed):
+        """
+        Crawls the graph from ``seed`` and returns the :class:`PivotGraph`
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        graph = PivotGraph()
+        node, info = self._seed(seed)
+        graph.add_node(node, info.get('indicator') if info else None, 0)
+        frontier = [node]
+        prefetched = {node: info}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for depth in range(self.depth):
+                if not frontier:
+                    break
+                results = executor.map(lambda n: self._expand_safe(n, prefetched.pop(n, None)),
+                                       frontier)
+                next_frontier = []
+                for node, (result, error) in zip(frontier, results):
+                    if error is not None:
+                        graph.errors[node] = error
+                        continue
+                    label, found = result
+                    index = graph.add_node(node, label)
+                    for other, other_label in found:
+                        if other not in graph:
+                            if len(graph) >= self.max_nodes:
+                                continue
+                            next_frontier.append(other)
+                        graph.add_edge(index, graph.add_node(other, other_label, depth + 1))
+                frontier = next_frontier
+        return graph
@@ -0,0 +1,221 @@
+"""
+Background scheduler for the results of the Analyze API.
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .exceptions import PulsediveException
+
+PENDING_STATUSES = ('queued', 'processing', 'pending')
+# Options of a submission that are not request options of its polls
+SUBMIT_OPTIONS = ('enrich', 'probe')
+# Parts of the API errors answered while an analysis is not finished
+PENDING_MESSAGES = PENDING_STATUSES + ('not ready',)
+
+
+def is_pending(result):
+    """
+    Whether ``result``, the response of the Analyze API for a ``qid`` or the
+    :class:`~pulsedive.PulsediveException` raised for it, means that the
+    analysis is not finished. Other errors, such as an unknown ``qid``, are
+    final.
+    """
+    if isinstance(result, PulsediveException):
+        message = str(result).lower()
+        return any(part in message for part in PENDING_MESSAGES)
+    return result.get('status') in PENDING_STATUSES
+
+
+def poll_options(kwargs):
+    """
+    Returns the request options of the polls of a submission made with ``kwargs``,
+    such as ``priority``
+    """
+    return {name: value for name, value in kwargs.items() if name not in SUBMIT_OPTIONS}
+
+
+class _Job:
+    __slots__ = ('value', 'qid', 'future', 'kwargs', 'delay', 'submitted')
+
+    def __init__(self, value, qid, future, kwargs):
+        self.value = value
+        self.qid = qid
+        self.future = future
+        self.kwargs = kwargs
+        self.delay = None
+        self.submitted = None
+
+
+class ResultsPoller:
+    """
+    Submits indicators to the analyze queue and polls their results.
+
+    Every pending ``qid`` is kept in one schedule. A single background thread
+    hands the jobs that are due to a pool of at most ``max_polls`` workers.
+    When a result is not ready the job is polled again after a delay that
+    grows by ``backoff`` up to ``max_delay``. The first poll is scheduled from
+    a running average of how long previous jobs took, so most jobs are
+    resolved on their first or second poll.
+
+    The futures returned by :meth:`submit` and :meth:`watch` are resolved as
+    soon as the result is ready, so the wall time of a batch is that of its
+    slowest job.
+
+    :param analyze: The :class:`~pulsedive.client.AnalyzeClient` to use
+    :param max_polls: Maximum number of concurrent requests. Default: 4
+    :param initial_delay: Seconds before the first poll until a duration
+        estimate is available. Default: 2
+    :param min_delay: Shortest delay between polls. Default: 0.5
+    :param max_delay: Longest delay between polls. Default: 30
+    :param backoff: Factor applied to the delay after each poll. Default: 1.5
+    :param timeout: Seconds after which a job that is still not ready fails
+        with a :class:`~pulsedive.PulsediveException`. Default: 600
+    """
+
+    def __init__(self, analyze, max_polls=4, initial_delay=2, min_delay=0.5,
+                 max_delay=30, backoff=1.5, timeout=600):
+        self.analyze = analyze
+        self.max_polls = max_polls
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self._estimate = None
+        self._schedule = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(max_polls)
+        self._executor = ThreadPoolExecutor(max_workers=max_polls)
+        self._thread = None
+        self._closed = False
+
+    def submit(self, value, **kwargs):
+        """
+        Submits ``value`` to the analyze queue and returns a
+        :class:`concurrent.futures.Future` of its results
+
+        :param value: Value to be analyzed
+        :param kwargs: Passed on to :meth:`~pulsedive.client.AnalyzeClient.__call__`
+        """
+        job = _Job(value, None, Future(), kwargs)
+        self._push(job, 0)
+        return job.future
+
+    def watch(self, qid, **kwargs):
+        """
+        Returns a :class:`concurrent.futures.Future` of the results of an
+        already submitted ``qid``
+
+        :param kwargs: Passed on to :meth:`~pulsedive.client.AnalyzeClient.results`
+        """
+        job = _Job(None, qid, Future(), kwargs)
+        job.submitted = time.monotonic()
+        job.delay = self.initial_delay
+        self._push(job, 0)
+        return job.future
+
+    def pending(self):
+        """
+        Returns the number of jobs waiting for their next poll
+        """
+        with self._cond:
+            return len(self._schedule)
+
+    def close(self):
+        """
+        Stops the scheduler. Unresolved futures are cancelled.
+        """
+        with self._cond:
+            self._closed = True
+            jobs, self._schedule = self._schedule, []
+            self._cond.notify()
+        for _, _, job in jobs:
+            job.future.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _push(self, job, delay):
+        with self._cond:
+            if self._closed:
+                raise PulsediveException('The results poller is closed')
+            heapq.heappush(self._schedule, (time.monotonic() + delay, next(self._counter), job))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='pulsedive-poller')
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    now = time.monotonic()
+                    if self._schedule and self._schedule[0][0] <= now:
+                        break
+                    timeout = self._schedule[0][0] - now if self._schedule else None
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+                _, _, job = heapq.heappop(self._schedule)
+            if job.future.cancelled():
+                continue
+            self._slots.acquire()
+            try:
+                self._executor.submit(self._step, job)
+            except RuntimeError:
+                self._slots.release()
+                return
+
+    def _first_delay(self):
+        if self._estimate is None:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, self._estimate))
+
+    def _step(self, job):
+        try:
+            if job.qid is None:
+                self._submit(job)
+            else:
+                self._poll(job)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def _submit(self, job):
+        res = self.analyze(job.value, **job.kwargs)
+        job.qid = res['qid']
+        job.submitted = time.monotonic()
+        job.delay = self._first_delay()
+        self._push(job, job.delay)
+
+    def _poll(self, job):
+        try:
+            result = self.analyze.results(job.qid, **poll_options(job.kwargs))
+            pending = is_pending(result)
+        except PulsediveException as e:
+            if not is_pending(e):
+                raise
+            pending = True
+        if pending:
+            elapsed = time.monotonic() - job.submitted
+            if elapsed > self.timeout:
+                raise PulsediveException('Results of qid {} not ready after {:.0f} seconds'.format(
+                    job.qid, elapsed))
+            job.delay = min(self.max_delay, max(self.min_delay, job.delay * self.backoff))
+            self._push(job, job.delay)
+            return
+
+        elapsed = time.monotonic() - job.submitted
+        with self._cond:
+            if self._estimate is None:
+                self._estimate = elapsed
+            else:
+                self._estimate = 0.8 * self._estimate + 0.2 * elapsed
+        if not job.future.done():
+            job.future.set_result(result)
@@ -0,0 +1,156 @@
+"""
+Client-side rate limiting and retries for :class:`~pulsedive.Pulsedive`::
+
+    from pulsedive import Pulsedive
+    from pulsedive.ratelimit import Retry
+
+    pud = Pulsedive('<API KEY>', rate_limit=5, retry=Retry(total=5))
+
+``rate_limit`` is the number of requests per second allowed for the API key.
+All threads using the client, and all clients created in the process with
+the same API key, share one :class:`TokenBucket`. Creating a client with a
+different rate for a key that already has one raises a
+:class:`~pulsedive.PulsediveException`.
+"""
+import threading
+import time
+
+from .exceptions import PulsediveException
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# A POST, such as an analyze submission, may have been processed before a
+# server error, so only rate limited POSTs are retried
+POST_RETRY_STATUSES = (429,)
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens are added at ``rate`` per second up to ``burst``. Each request takes
+    one token and callers wait when the bucket is empty. Waiting callers are
+    served in the order they arrived.
+
+    :param rate: Requests per second
+    :param burst: Maximum number of requests that can be sent at once after
+        the bucket has been idle. Default: ``max(1, rate)``
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes a token, waiting until one is available.
+
+        :return: The number of seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Tokens are reserved up front so concurrent callers queue up
+            self._tokens -= 1
+            wait = max(-self._tokens / self.rate, self._paused_until - now, 0)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """
+        Stops handing out tokens for ``seconds``. This is used when the API
+        reports that the rate limit was exceeded so that every thread backs off.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def get_bucket(api_key, rate, burst=None):
+    """
+    Returns the :class:`TokenBucket` of ``api_key``, creating it with ``rate``
+    and ``burst`` the first time the key is seen. Raises a
+    :class:`~pulsedive.PulsediveException` if the key already has a bucket
+    with another rate or burst.
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(api_key)
+        if bucket is None:
+            bucket = _buckets[api_key] = TokenBucket(rate, burst)
+        elif float(rate) != bucket.rate or (burst is not None and float(burst) != bucket.burst):
+            raise PulsediveException('The API key already has a rate limit of {} requests per second '
+                                     'with a burst of {}, which is shared by all its clients'.format(
+                                         bucket.rate, bucket.burst))
+        return bucket
+
+
+def parse_retry_after(value):
+    """
+    Parses a ``Retry-After`` header given either in seconds or as an HTTP
+    date. Returns None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    import email.utils
+
+    try:
+        date = email.utils.parsedate_tz(value)
+        return max(0.0, email.utils.mktime_tz(date) - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class Retry:
+    """
+    Retry policy for responses with a retryable status code.
+
+    Delays grow exponentially with full jitter, ``uniform(0, backoff_factor * 2 ** attempt)``,
+    capped at ``max_backoff``. A ``Retry-After`` header sent by the API takes
+    precedence. If it asks for more than ``max_backoff`` seconds the response is
+    not retried.
+
+    :param total: Maximum number of retries per request. Default: 3
+    :param backoff_factor: Base delay in seconds. Default: 0.5
+    :param max_backoff: Longest delay in seconds. Default: 60
+    :param statuses: Status codes to retry. Default: 429, 500, 502, 503 and 504
+    :param post_statuses: Status codes to retry for ``POST`` requests, which
+        are not idempotent. Default: 429
+    """
+
+    def __init__(self, total=3, backoff_factor=0.5, max_backoff=60, statuses=RETRY_STATUSES,
+                 post_statuses=POST_RETRY_STATUSES):
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.post_statuses = frozenset(post_statuses)
+
+    def delay(self, attempt, response, method='GET'):
+        """
+        Returns the seconds to wait before retrying ``response``, or None if it
+        should not be retried
+
+        :param attempt: Number of retries already made for the request
+        :param response: The response with a retryable status
+        :param method: HTTP method of the request
+        """
+        statuses = self.post_statuses if method == 'POST' else self.statuses
+        if attempt >= self.total or response.status_code not in statuses:
+            return None
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_backoff else None
+        import random
+
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
@@ -0,0 +1,158 @@
+"""
+Priority scheduling of the requests of a :class:`~pulsedive.Pulsedive`
+client, so that interactive lookups are not stuck behind bulk jobs sharing
+the same API key::
+
+    from pulsedive import Pulsedive
+
+    pud = Pulsedive('<API KEY>', rate_limit=5, scheduler=4)
+
+    pud.indicator(value='pulsedive.com', priority='interactive')
+    pud.feed.links(1, priority='bulk')
+
+Every HTTP request takes one of ``concurrency`` slots before it waits on the
+rate limit and is sent. When all slots are taken, requests queue by priority
+and a freed slot goes to the request with the highest priority, the oldest
+first. Requests get an extra ``aging`` seconds of priority per level, so a
+bulk request that has waited long enough is served before newer interactive
+ones and is never starved.
+
+Cache hits and calls coalesced with a request in flight do not take a slot.
+"""
+import threading
+import time
+from collections import deque
+
+#: Default priorities, from the highest to the lowest
+PRIORITIES = ('interactive', 'normal', 'bulk')
+
+
+class _Queue:
+    __slots__ = ('rank', 'waiting', 'max_queued', 'granted', 'wait_time', 'max_wait')
+
+    def __init__(self, rank):
+        self.rank = rank
+        self.waiting = deque()
+        self.max_queued = 0
+        self.granted = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+
+class PriorityScheduler:
+    """
+    Thread-safe scheduler handing out a fixed number of slots to requests
+    queued by priority.
+
+    :param concurrency: Maximum number of requests in flight. Default: 4
+    :param priorities: Names of the priorities, from the highest to the
+        lowest. Default: ``('interactive', 'normal', 'bulk')``
+    :param default: Priority of calls made without ``priority``.
+        Default: ``'normal'``, or the middle priority
+    :param aging: Seconds of waiting that make up for one priority level.
+        Default: 5
+    """
+
+    def __init__(self, concurrency=4, priorities=PRIORITIES, default=None, aging=5.0):
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+        priorities = tuple(priorities)
+        if default is None:
+            default = 'normal' if 'normal' in priorities else priorities[len(priorities) // 2]
+        if default not in priorities:
+            raise ValueError('Unknown default priority "{}"'.format(default))
+        self.concurrency = concurrency
+        self.priorities = priorities
+        self.default = default
+        self.aging = float(aging)
+        self._queues = dict((name, _Queue(rank)) for rank, name in enumerate(priorities))
+        self._active = 0
+        self._cond = threading.Condition()
+
+    def resolve(self, priority):
+        """
+        Returns the name of ``priority``, the default one if it is None
+
+        :raises ValueError: If the priority is unknown
+        """
+        if priority is None:
+            return self.default
+        if priority not in self._queues:
+            raise ValueError('Unknown priority "{}", expected one of {}'.format(
+                priority, ', '.join(self.priorities)))
+        return priority
+
+    def _next(self):
+        # The head of each queue is its oldest request, the one to serve is
+        # the earliest once every level is pushed back by aging seconds
+        best = None
+        best_key = None
+        for queue in self._queues.values():
+            if queue.waiting:
+                key = queue.waiting[0][0] + queue.rank * self.aging
+                if best_key is None or key < best_key:
+                    best, best_key = queue, key
+        return best
+
+    def acquire(self, priority=None):
+        """
+        Takes a slot, waiting behind requests of higher priority.
+
+        :param priority: One of :attr:`priorities`, or None for the default
+        :return: The number of seconds spent waiting
+        """
+        queue = self._queues[self.resolve(priority)]
+        with self._cond:
+            if self._active < self.concurrency and self._next() is None:
+                self._active += 1
+                queue.granted += 1
+                return 0.0
+
+            enqueued = time.monotonic()
+            entry = [enqueued]
+            queue.waiting.append(entry)
+            queue.max_queued = max(queue.max_queued, len(queue.waiting))
+            while not (self._active < self.concurrency and self._next() is queue and
+                       queue.waiting[0] is entry):
+                self._cond.wait()
+            queue.waiting.popleft()
+            self._active += 1
+
+            waited = time.monotonic() - enqueued
+            queue.granted += 1
+            queue.wait_time += waited
+            queue.max_wait = max(queue.max_wait, waited)
+            # Another slot may be free for the next request in line
+            self._cond.notify_all()
+            return waited
+
+    def release(self):
+        """
+        Frees a slot taken with :meth:`acquire`
+        """
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def stats(self):
+        """
+        Returns a snapshot of the scheduler, with ``active``, the number of
+        slots taken, and ``queues``, a ``dict`` with per priority:
+
+        * ``queued``: Requests waiting for a slot
+        * ``max_queued``: Most requests waiting at once
+        * ``granted``: Slots handed out
+        * ``wait_time``: Seconds spent waiting for a slot
+        * ``max_wait``: Longest wait for a slot in seconds
+        """
+        with self._cond:
+            queues = {}
+            for name, queue in self._queues.items():
+                queues[name] = {
+                    'queued': len(queue.waiting),
+                    'max_queued': queue.max_queued,
+                    'granted': queue.granted,
+                    'wait_time': queue.wait_time,
+                    'max_wait': queue.max_wait,
+                }
+            return {'active': self._active, 'queues': queues}
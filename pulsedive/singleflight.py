@@ -0,0 +1,66 @@
+"""
+Coalescing of identical concurrent requests.
+"""
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Threads that ask for a key
+    while a call for it is in flight wait for that call and receive its
+    result or exception instead of making their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {'calls': 0, 'coalesced': 0}
+
+    def do(self, key, fn):
+        """
+        Returns ``(result, shared)`` where ``result`` is that of ``fn()``, or
+        of the call for ``key`` already in flight in which case ``shared`` is True
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._stats['calls'] += 1
+                leader = True
+            else:
+                self._stats['coalesced'] += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        """
+        Returns the number of ``calls`` made and of callers ``coalesced``
+        into them
+        """
+        with self._lock:
+            return dict(self._stats)
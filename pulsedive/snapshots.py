@@ -0,0 +1,249 @@
+"""
+Snapshots of the indicators linked to feeds, to get what changed in a feed
+since the previous run with :meth:`~pulsedive.client.FeedClient.diff`::
+
+    pud = Pulsedive('<API KEY>', snapshots='~/.cache/pulsedive/snapshots')
+
+    diff = pud.feed.diff(1)
+    for link in diff.added:
+        print('+', link['indicator'])
+    for iid in diff.removed:
+        print('-', iid)
+
+Every snapshot is a file holding the sorted indicator IDs of a feed as
+64-bit integers, which is read through a memory map. The links of the feed
+are streamed and their IDs sorted in bounded runs spilled to disk, then the
+runs are merged into the new snapshot and compared with the previous one in
+a single linear pass. Only the added links and the removed IDs are kept in
+memory.
+"""
+import bisect
+import heapq
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from collections import namedtuple
+
+MAGIC = b'PDSN'
+VERSION = 1
+# magic, version, number of IDs, time of the snapshot
+HEADER = struct.Struct('<4sB3xQd')
+
+# Number of IDs sorted in memory at once
+RUN_SIZE = 1 << 16
+# Number of IDs read from each run and written to the snapshot at once
+_BLOCK = 1024
+
+
+class FeedDiff(namedtuple('FeedDiff', ['fid', 'added', 'removed', 'previous', 'current', 'since'])):
+    """
+    Changes of a feed since its previous snapshot. ``added`` is the list of the
+    new links, ``removed`` an ``array`` of the IDs of the indicators that are no
+    longer linked, ``previous`` and ``current`` the number of indicators in the
+    previous and the new snapshot, and ``since`` the time of the previous
+    snapshot. ``previous`` and ``since`` are None the first time a feed is seen,
+    and all its links are then added.
+    """
+    __slots__ = ()
+
+
+def _to_file(values, f):
+    if sys.byteorder != 'little':
+        values = array('Q', values)
+        values.byteswap()
+    values.tofile(f)
+
+
+def _read_ids(f):
+    # Yields the IDs of a file of little-endian 64-bit integers
+    while True:
+        block = array('Q')
+        block.frombytes(f.read(_BLOCK * 8))
+        if not block:
+            return
+        if sys.byteorder != 'little':
+            block.byteswap()
+        for value in block:
+            yield value
+
+
+class Snapshot:
+    """
+    Read-only, memory-mapped snapshot of the sorted IDs of a feed.
+    Membership tests are binary searches.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, self.timestamp = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError('{} is not a snapshot file'.format(path))
+        if sys.byteorder == 'little':
+            self._ids = memoryview(self._mmap)[HEADER.size:HEADER.size + count * 8].cast('Q')
+        else:
+            self._ids = array('Q', self._mmap[HEADER.size:HEADER.size + count * 8])
+            self._ids.byteswap()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __contains__(self, iid):
+        ids = self._ids
+        i = bisect.bisect_left(ids, iid)
+        return i < len(ids) and ids[i] == iid
+
+    def close(self):
+        if self._mmap is not None:
+            if isinstance(self._ids, memoryview):
+                self._ids.release()
+            self._ids = ()
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def diff_sorted(old, new):
+    """
+    Compares two iterables of sorted unique integers in one pass and returns
+    the ``array`` of the integers only in ``new`` and of those only in ``old``
+    """
+    added = array('Q')
+    removed = array('Q')
+    old = iter(old)
+    new = iter(new)
+    a = next(old, None)
+    b = next(new, None)
+    while a is not None and b is not None:
+        if a == b:
+            a = next(old, None)
+            b = next(new, None)
+        elif a < b:
+            removed.append(a)
+            a = next(old, None)
+        else:
+            added.append(b)
+            b = next(new, None)
+    while a is not None:
+        removed.append(a)
+        a = next(old, None)
+    while b is not None:
+        added.append(b)
+        b = next(new, None)
+    return added, removed
+
+
+class SnapshotStore:
+    """
+    Directory of feed snapshots.
+
+    :param directory: Directory of the snapshot files, created if needed
+    :param run_size: Number of IDs sorted in memory at once. Default: 65536
+    """
+
+    def __init__(self, directory, run_size=RUN_SIZE):
+        self.directory = os.path.expanduser(directory)
+        self.run_size = run_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, fid):
+        return os.path.join(self.directory, 'feed-{}.snap'.format(int(fid)))
+
+    def load(self, fid):
+        """
+        Returns the :class:`Snapshot` of ``fid``, or None if there is none
+        """
+        path = self.path(fid)
+        if not os.path.exists(path):
+            return None
+        return Snapshot(path)
+
+    def remove(self, fid):
+        """
+        Deletes the snapshot of ``fid``
+        """
+        path = self.path(fid)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _spill(self, run, runs):
+        run = array('Q', sorted(run))
+        f = tempfile.TemporaryFile(dir=self.directory)
+        _to_file(run, f)
+        f.seek(0)
+        runs.append(f)
+
+    def diff(self, fid, links, update=True):
+        """
+        Compares ``links``, an iterable of the links of the feed, with the
+        previous snapshot of ``fid`` and returns a :class:`FeedDiff`. The new
+        snapshot replaces the previous one unless ``update`` is False.
+        """
+        previous = self.load(fid)
+        runs = []
+        tmp = '{}.{}.tmp'.format(self.path(fid), os.getpid())
+        try:
+            added_links = {}
+            run = array('Q')
+            for link in links:
+                iid = int(link['iid'])
+                if previous is None or iid not in previous:
+                    added_links[iid] = link
+                run.append(iid)
+                if len(run) >= self.run_size:
+                    self._spill(run, runs)
+                    run = array('Q')
+            self._spill(run, runs)
+
+            # The runs are merged into the new snapshot, dropping duplicates
+            count = 0
+            last = None
+            with open(tmp, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, 0, time.time()))
+                block = array('Q')
+                for iid in heapq.merge(*[_read_ids(run) for run in runs]):
+                    if iid == last:
+                        continue
+                    last = iid
+                    block.append(iid)
+                    if len(block) >= _BLOCK:
+                        _to_file(block, f)
+                        count += len(block)
+                        block = array('Q')
+                _to_file(block, f)
+                count += len(block)
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, VERSION, count, time.time()))
+
+            with Snapshot(tmp) as current:
+                added, removed = diff_sorted(previous if previous is not None else (), current)
+            result = FeedDiff(int(fid), [added_links[iid] for iid in added], removed,
+                              len(previous) if previous is not None else None, count,
+                              previous.timestamp if previous is not None else None)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        finally:
+            for run in runs:
+                run.close()
+            if previous is not None:
+                previous.close()
+        if update:
+            os.replace(tmp, self.path(fid))
+        else:
+            os.remove(tmp)
+        return result
@@ -0,0 +1,122 @@
+"""
+Incremental parsing of large JSON responses.
+"""
+import codecs
+import json
+
+from .exceptions import PulsediveException
+
+WHITESPACE = ' \t\n\r'
+NUMBER_CHARS = '0123456789.eE+-'
+
+
+class _Buffer:
+    """
+    Text buffer over an iterable of byte chunks that discards consumed text
+    """
+
+    def __init__(self, chunks, encoding):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Reads the next chunk. Returns False at the end of the input.
+        """
+        if self.eof:
+            return False
+        if self.pos > len(self.text) // 2:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.text += self.decoder.decode(b'', final=True)
+            self.eof = True
+            return False
+        self.text += self.decoder.decode(chunk)
+        return True
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character, or '' at the end
+        """
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        c = self.peek()
+        if c == '' or c not in chars:
+            raise ValueError('Expected one of {!r} at offset {} but found {!r}'.format(
+                chars, self.pos, c))
+        self.pos += 1
+        return c
+
+    def value(self, decoder):
+        """
+        Decodes the next complete JSON value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if (isinstance(value, (int, float)) and not isinstance(value, bool) and
+                    (end == len(self.text) or self.text[end] in NUMBER_CHARS) and
+                    self.fill()):
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(chunks, key='results', encoding='utf-8'):
+    """
+    Yields the elements of the array stored under ``key`` in a JSON object
+    without loading the whole document, e.g. the linked indicators in::
+
+        {"results": [{"iid": 1, ...}, {"iid": 2, ...}], ...}
+
+    Only one element and one chunk are held in memory at a time. The other
+    members of the object are parsed and discarded. If the object has an
+    ``error`` member a :class:`~pulsedive.PulsediveException` is raised.
+
+    :param chunks: Iterable of ``bytes``, such as ``response.iter_content()``
+    :param key: Name of the array to yield. Default: 'results'
+    :param encoding: Encoding of the input. Default: 'utf-8'
+    """
+    buf = _Buffer(chunks, encoding)
+    decoder = json.JSONDecoder()
+
+    buf.expect('{')
+    if buf.peek() == '}':
+        return
+    while True:
+        name = buf.value(decoder)
+        buf.expect(':')
+        if name == key and buf.peek() == '[':
+            buf.expect('[')
+            if buf.peek() == ']':
+                buf.pos += 1
+            else:
+                while True:
+                    yield buf.value(decoder)
+                    if buf.expect(',]') == ']':
+                        break
+        else:
+            value = buf.value(decoder)
+            if name == 'error':
+                raise PulsediveException('Error encountered with the API with error "{}'.format(value))
+        if buf.expect(',}') == '}':
+            return
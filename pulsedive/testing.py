@@ -0,0 +1,331 @@
+"""
+Local stand-in for the Pulsedive API, for tests and benchmarks that must not
+depend on the network::
+
+    from pulsedive import Pulsedive
+    from pulsedive.testing import StubServer
+
+    with StubServer(latency=0.02, error_rate=0.01) as server:
+        pud = Pulsedive(base_url=server.url)
+        pud.indicator(value='host1.example')
+
+The server emulates ``info.php``, ``search.php`` and ``analyze.php`` with
+generated data of realistic size. Values ending in ``.invalid`` are reported
+as not found. Any endpoint can be replaced through :attr:`StubServer.routes`.
+"""
+import base64
+import binascii
+import csv
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+RISKS = ('none', 'low', 'medium', 'high', 'critical')
+VALUE_RE = re.compile(r'^host(\d+)\.example$')
+RANGE_RE = re.compile(r'^bytes=(\d+)-(\d*)$')
+
+
+def _risk(n):
+    return RISKS[n * 7 % len(RISKS)]
+
+
+def _stamp(n):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(1500000000 + n * 3607))
+
+
+def make_link(iid):
+    """
+    Returns a linked indicator as found in the ``results`` of links and searches
+    """
+    return {
+        'iid': str(iid),
+        'indicator': 'host{}.example'.format(iid),
+        'type': 'domain',
+        'risk': _risk(iid),
+        'stamp_added': _stamp(iid),
+        'stamp_updated': _stamp(iid + 11),
+        'stamp_seen': _stamp(iid + 29),
+        'stamp_linked': _stamp(iid + 3),
+        'summary': {'properties': {'geo': {'country': 'US', 'org': 'Example Hosting'}}},
+    }
+
+
+def make_indicator(iid):
+    """
+    Returns an indicator as returned by ``info.php``
+    """
+    ind = make_link(iid)
+    ind.update({
+        'risk_recommended': _risk(iid + 1),
+        'manualrisk': '0',
+        'retired': None,
+        'stamp_retired': None,
+        'recent': '0',
+        'submissions': str(iid % 13),
+        'umbrella_rank': str(iid * 31 % 1000000),
+        'umbrella_domain': 'example',
+        'riskfactors': [{'rfid': str(i), 'description': 'risk factor {}'.format(i), 'risk': _risk(i)}
+                        for i in range(iid % 4 + 1)],
+        'redirects': {'from': [], 'to': []},
+        'threats': [{'tid': str(iid % 50 + 1), 'name': 'Threat {}'.format(iid % 50 + 1),
+                     'category': 'malware', 'risk': 'high', 'stamp_linked': _stamp(iid)}],
+        'feeds': [{'fid': str(iid % 20 + 1), 'name': 'Feed {}'.format(iid % 20 + 1),
+                   'category': 'malware', 'organization': 'Example Org', 'pricing': 'free',
+                   'stamp_linked': _stamp(iid)}],
+        'comments': [],
+        'attributes': {'port': ['80', '443'], 'protocol': ['HTTP', 'HTTPS'],
+                       'technology': ['Apache', 'PHP', 'jQuery']},
+        'properties': {
+            'dns': {'A': ['10.{}.{}.{}'.format(iid % 250, iid * 3 % 250, iid * 7 % 250)],
+                    'NS': ['ns1.example', 'ns2.example'], 'MX': ['mail.example']},
+            'http': {'++code': '200', '++content-type': 'text/html; charset=UTF-8',
+                     'server': 'Apache/2.4.29 (Ubuntu)'},
+            'whois': {'registrar': 'Example Registrar', 'created': _stamp(iid - 1000),
+                      'expires': _stamp(iid + 9000), '++nameserver': 'ns1.example'},
+        },
+    })
+    return ind
+
+
+def iid_of(value):
+    match = VALUE_RE.match(value or '')
+    if match:
+        return int(match.group(1))
+    return sum(ord(c) for c in value) % 100000 + 1
+
+
+class StubServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    Threaded HTTP server emulating the Pulsedive API on ``127.0.0.1``.
+
+    :param latency: Seconds added to every response. Default: 0
+    :param error_rate: Fraction of requests answered with a 503. Default: 0
+    :param links_size: Number of indicators linked to every threat and feed.
+        Default: 1000
+    :param search_size: Number of results of every indicator search.
+        Default: 1000
+    :param page_size: Number of search results per page when ``limit`` is
+        not set. Default: 500
+    :param analyze_delay: Seconds before a submitted analysis is ready.
+        Default: 0.1
+    :param routes: Mapping of endpoint name to handler. A handler receives
+        the query or form parameters and returns ``(status, body)`` or
+        ``(status, body, headers)`` where ``body`` is a ``dict`` or ``bytes``.
+        Defaults to the emulated endpoints.
+    :param seed: Seed of the random errors
+    :param etags: Whether to send an ``ETag`` with ``GET`` responses and
+        answer ``304 Not Modified`` when it matches ``If-None-Match``, or
+        when ``If-Modified-Since`` matches the ``Last-Modified`` header set
+        by a route. Default: True
+    :param compress: Whether to gzip bodies of 1KB or more when the client
+        accepts it. Default: True
+    :param ranges: Whether to answer ``GET`` requests with a ``Range``
+        header with ``206 Partial Content``, honoring ``If-Range``.
+        Default: True
+    """
+    daemon_threads = True
+
+    def __init__(self, latency=0, error_rate=0, links_size=1000, search_size=1000,
+                 page_size=500, analyze_delay=0.1, routes=None, seed=None, etags=True,
+                 compress=True, ranges=True):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.links_size = links_size
+        self.search_size = search_size
+        self.page_size = page_size
+        self.analyze_delay = analyze_delay
+        self.etags = etags
+        self.compress = compress
+        self.ranges = ranges
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        #: Every request received as ``(method, endpoint, params, client_address)``
+        self.requests = []
+        self.routes = dict(routes) if routes is not None else {
+            'info.php': self.info,
+            'search.php': self.search,
+            'analyze.php': self.analyze,
+        }
+        self._qids = itertools.count(1)
+        self._jobs = {}
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        Base URL to pass to :class:`~pulsedive.Pulsedive` as ``base_url``
+        """
+        return 'http://127.0.0.1:{}/api'.format(self.server_address[1])
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def info(self, params):
+        if 'tid' in params or 'tname' in params:
+            tid = int(params.get('tid', 1))
+            if params.get('get') == 'links':
+                return 200, {'results': [make_link(tid * 100000 + i) for i in range(self.links_size)]}
+            return 200, {'tid': str(tid), 'threat': 'Threat {}'.format(tid), 'category': 'malware',
+                         'risk': 'high', 'description': 'Generated threat', 'wikisummary': 'x' * 512,
+                         'stamp_added': _stamp(tid), 'stamp_updated': _stamp(tid + 1),
+                         'othernames': ['Alias {}'.format(tid)], 'news': []}
+        if 'fid' in params or 'feed' in params:
+            fid = int(params.get('fid', 1))
+            if params.get('get') == 'links':
+                return 200, {'results': [make_link(fid * 100000 + i) for i in range(self.links_size)]}
+            return 200, {'fid': str(fid), 'feed': 'Feed {}'.format(fid), 'category': 'malware',
+                         'organization': 'Example Org', 'website': 'https://feed.example',
+                         'schedule': 'hourly', 'pricing': 'free', 'stamp_added': _stamp(fid),
+                         'stamp_updated': _stamp(fid + 1), 'stamp_pulled': _stamp(fid + 2)}
+        value = params.get('indicator')
+        if value is not None and value.endswith('.invalid'):
+            return 200, {'error': 'Indicator not found.'}
+        iid = int(params['iid']) if 'iid' in params else iid_of(value)
+        if params.get('get') == 'links':
+            return 200, {'Active DNS': [make_link(iid + i) for i in range(1, 4)],
+                         'Related URLs': [make_link(iid + i) for i in range(4, 6)]}
+        if params.get('get') == 'properties':
+            return 200, make_indicator(iid)['properties']
+        return 200, make_indicator(iid)
+
+    def search(self, params):
+        if params.get('search') in ('threat', 'feed'):
+            kind = params['search']
+            return 200, {'results': [{'{}id'.format(kind[0]): str(i), kind: '{} {}'.format(kind.title(), i)}
+                                     for i in range(1, 21)]}
+        limits = {'hundred': 100, 'thousand': 1000, 'tenthousand': 10000}
+        total = min(self.search_size, limits.get(params.get('limit'), self.search_size))
+        if str(params.get('export')) == '1':
+            out = io.StringIO()
+            writer = csv.writer(out)
+            writer.writerow(['iid', 'indicator', 'type', 'risk', 'stamp_added', 'stamp_seen'])
+            for i in range(1, total + 1):
+                link = make_link(i)
+                writer.writerow([link['iid'], link['indicator'], link['type'], link['risk'],
+                                 link['stamp_added'], link['stamp_seen']])
+            return 200, out.getvalue().encode('utf-8'), {'Content-Type': 'text/csv'}
+        if 'limit' in params:
+            return 200, {'results': [make_link(i) for i in range(1, total + 1)]}
+        page = int(params.get('page', 0))
+        start = page * self.page_size
+        body = {'page_current': page,
+                'results': [make_link(i) for i in range(start + 1, min(total, start + self.page_size) + 1)]}
+        if start + self.page_size < total:
+            body['page_next'] = page + 1
+        return 200, body
+
+    def analyze(self, params):
+        if 'ioc' in params:
+            try:
+                value = base64.b64decode(params['ioc']).decode('utf-8')
+            except (binascii.Error, UnicodeDecodeError):
+                return 200, {'error': 'Invalid indicator.'}
+            with self.lock:
+                qid = next(self._qids)
+                self._jobs[qid] = (time.monotonic(), value)
+            return 200, {'success': 'Added request to queue.', 'qid': qid}
+        job = self._jobs.get(int(params.get('qid', 0)))
+        if job is None:
+            return 200, {'error': 'Request not found.'}
+        if time.monotonic() - job[0] < self.analyze_delay:
+            return 200, {'qid': params['qid'], 'status': 'processing'}
+        return 200, {'success': 'Analysis complete.', 'qid': params['qid'], 'status': 'done',
+                     'data': make_indicator(iid_of(job[1]))}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _handle(self, params):
+        server = self.server
+        path = urlparse(self.path).path.rsplit('/', 1)[-1]
+        params = dict((k, v[0] if len(v) == 1 else v) for k, v in params.items())
+        with server.lock:
+            server.requests.append((self.command, path, params, self.client_address))
+            failed = server.error_rate and server.random.random() < server.error_rate
+        if server.latency:
+            time.sleep(server.latency)
+
+        headers = {}
+        route = server.routes.get(path)
+        if failed:
+            status, body = 503, {'error': 'Service unavailable.'}
+        elif route is None:
+            status, body = 404, {'error': 'Not found'}
+        else:
+            res = route(params)
+            status, body = res[:2]
+            if len(res) > 2:
+                headers = dict(res[2])
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        if status == 200 and server.etags and self.command == 'GET':
+            headers.setdefault('ETag', '"{}"'.format(hashlib.sha256(body).hexdigest()[:16]))
+            if (self.headers.get('If-None-Match') == headers['ETag'] or
+                    self.headers.get('If-Modified-Since', 0) == headers.get('Last-Modified')):
+                status, body = 304, b''
+        if status == 200 and server.ranges and self.command == 'GET':
+            headers['Accept-Ranges'] = 'bytes'
+            status, body = self._range(body, headers)
+        if (status == 200 and server.compress and len(body) >= 1024 and
+                'gzip' in self.headers.get('Accept-Encoding', '')):
+            body = gzip.compress(body, 1)
+            headers['Content-Encoding'] = 'gzip'
+        self.send_response(status)
+        if 'Content-Type' not in headers:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _range(self, body, headers):
+        match = RANGE_RE.match(self.headers.get('Range', ''))
+        if match is None:
+            return 200, body
+        if_range = self.headers.get('If-Range')
+        validators = (headers.get('ETag'), headers.get('Last-Modified'))
+        if if_range is not None and if_range not in validators:
+            return 200, body
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else len(body) - 1, len(body) - 1)
+        if start > end:
+            headers['Content-Range'] = 'bytes */{}'.format(len(body))
+            return 416, b''
+        headers['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, len(body))
+        return 206, body[start:end + 1]
+
+    def do_GET(self):
+        self._handle(parse_qs(urlparse(self.path).query))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self._handle(parse_qs(self.rfile.read(length).decode('utf-8')))
@@ -0,0 +1,399 @@
+"""
+HTTP transports used by :class:`~pulsedive.Pulsedive` to send requests.
+
+A transport has a ``request(method, url, params, stream=False, **kwargs)``
+method returning a response with ``status_code``, ``headers``, ``content``,
+``text``, ``json()``, ``raise_for_status()``, ``iter_content()`` and
+``close()``, and a ``close()`` method releasing its connections. ``params``
+are sent in the query string of ``GET`` requests and form-encoded in the body
+of ``POST`` requests.
+
+The transport is chosen with the ``transport`` option of the client, either
+by name or as an instance::
+
+    pud = Pulsedive(transport='urllib3')
+    pud = Pulsedive(transport=HTTPXTransport(http2=True))
+"""
+import json
+import threading
+from urllib.parse import urlencode, urlsplit
+
+from .cache import make_key
+from .exceptions import PulsediveException
+
+
+def _encode_params(params):
+    """
+    Converts params to a list of pairs, expanding list values into repeated
+    keys the same way ``requests`` does
+    """
+    pairs = []
+    for key, value in params.items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for v in values:
+            if v is None:
+                continue
+            if isinstance(v, bytes):
+                v = v.decode('utf-8')
+            pairs.append((key, v if isinstance(v, str) else str(v)))
+    return pairs
+
+
+class HTTPError(PulsediveException):
+    """
+    Raised by :meth:`Response.raise_for_status` for 4xx and 5xx responses
+    """
+
+    def __init__(self, message, response=None):
+        PulsediveException.__init__(self, message)
+        self.response = response
+
+
+class Headers(dict):
+    """
+    Response headers with case-insensitive lookups
+    """
+
+    def __init__(self, items=()):
+        dict.__init__(self)
+        for name, value in (items.items() if hasattr(items, 'items') else items):
+            self[name] = value
+
+    def __setitem__(self, name, value):
+        dict.__setitem__(self, name.lower(), value)
+
+    def __getitem__(self, name):
+        return dict.__getitem__(self, name.lower())
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name.lower())
+
+    def get(self, name, default=None):
+        return dict.get(self, name.lower(), default)
+
+
+class Response:
+    """
+    Response returned by the transports other than :class:`RequestsTransport`,
+    mirroring the parts of ``requests.Response`` used by the client.
+
+    :param status_code: HTTP status code
+    :param headers: Response headers
+    :param url: URL of the request
+    :param content: The body, if it has been read
+    :param chunks: Iterator over the body, for streamed responses
+    :param release: Called when the response is closed
+    """
+
+    def __init__(self, status_code, headers, url, content=None, chunks=None, release=None):
+        self.status_code = status_code
+        self.headers = Headers(headers)
+        self.url = url
+        self._content = content
+        self._chunks = chunks
+        self._release = release
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = b''.join(self._chunks(65536))
+            self._chunks = None
+            self.close()
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+    def iter_content(self, chunk_size=65536):
+        if self._content is not None:
+            for i in range(0, len(self._content), chunk_size):
+                yield self._content[i:i + chunk_size]
+            return
+        try:
+            for chunk in self._chunks(chunk_size):
+                if chunk:
+                    yield chunk
+        finally:
+            self.close()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError('{} error for url {}'.format(self.status_code, self.url), response=self)
+
+    def close(self):
+        if self._release is not None:
+            release, self._release = self._release, None
+            release()
+
+
+class RequestsTransport:
+    """
+    Sends requests through a pooled ``requests.Session``. This is the default.
+
+    :param session: An existing ``requests.Session`` to use instead of creating
+        one. The transport will not close a session it did not create.
+    :param pool_connections: Number of connection pools to cache. Default: 10
+    :param pool_maxsize: Maximum number of connections kept alive per host.
+        Default: 10
+    :param pool_block: Whether to block when no free connection is available.
+        Default: False
+    :param keep_alive: Whether to reuse connections. Default: True
+    """
+
+    def __init__(self, session=None, pool_connections=10, pool_maxsize=10,
+                 pool_block=False, keep_alive=True):
+        import requests
+        import requests.adapters
+
+        self._owns_session = session is None
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            if not keep_alive:
+                session.headers['Connection'] = 'close'
+        self.session = session
+
+    def request(self, method, url, params, stream=False, **kwargs):
+        if method == 'GET':
+            return self.session.get(url, params=params, stream=stream, **kwargs)
+        return self.session.post(url, data=params, stream=stream, **kwargs)
+
+    def close(self):
+        if self._owns_session:
+            self.session.close()
+
+
+class Urllib3Transport:
+    """
+    Sends requests through a ``urllib3.PoolManager``, skipping the overhead of
+    ``requests`` sessions.
+
+    :param pool_connections: Number of connection pools to cache. Default: 10
+    :param pool_maxsize: Maximum number of connections kept alive per host.
+        Default: 10
+    :param pool_block: Whether to block when no free connection is available.
+        Default: False
+    :param keep_alive: Whether to reuse connections. Default: True
+    :param kwargs: Other parameters passed on to ``urllib3.PoolManager``
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True, **kwargs):
+        import urllib3
+
+        # Compressed transfer is negotiated like requests does
+        headers = urllib3.util.make_headers(accept_encoding=True)
+        headers.update(kwargs.pop('headers', {}))
+        if not keep_alive:
+            headers['Connection'] = 'close'
+        self.pool = urllib3.PoolManager(num_pools=pool_connections, maxsize=pool_maxsize,
+                                        block=pool_block, headers=headers, **kwargs)
+
+    def request(self, method, url, params, stream=False, timeout=None, headers=None):
+        body = urlencode(_encode_params(params))
+        request_headers = dict(self.pool.headers)
+        request_headers.update(headers or {})
+        if method == 'GET':
+            url = '{}?{}'.format(url, body)
+            body = None
+        else:
+            request_headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        r = self.pool.request(method, url, body=body, headers=request_headers, timeout=timeout,
+                              preload_content=not stream, redirect=True, retries=False)
+        if not stream:
+            return Response(r.status, r.headers, url, content=r.data)
+
+        def release():
+            r.drain_conn()
+            r.release_conn()
+
+        return Response(r.status, r.headers, url,
+                        chunks=lambda size: r.stream(size, decode_content=True), release=release)
+
+    def close(self):
+        self.pool.clear()
+
+
+class HTTPXTransport:
+    """
+    Sends requests through an ``httpx.Client``, which can multiplex requests
+    over a single HTTP/2 connection. This requires ``httpx``, and ``h2`` for
+    HTTP/2, which can be installed with::
+
+        pip install pulsedive[http2]
+
+    :param http2: Whether to negotiate HTTP/2. Default: True
+    :param pool_maxsize: Maximum number of connections. Default: 10
+    :param keep_alive: Whether to reuse connections. Default: True
+    :param kwargs: Other parameters passed on to ``httpx.Client``
+
+    ``pool_connections`` and ``pool_block`` are accepted for compatibility
+    with the other transports and ignored: ``httpx`` keeps a single pool and
+    always waits for a free connection.
+    """
+
+    def __init__(self, http2=True, pool_connections=10, pool_maxsize=10, pool_block=True,
+                 keep_alive=True, **kwargs):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError('HTTPXTransport requires httpx, install it with '
+                              '"pip install pulsedive[http2]"')
+        limits = httpx.Limits(max_connections=pool_maxsize,
+                              max_keepalive_connections=pool_maxsize if keep_alive else 0)
+        self.client = httpx.Client(http2=http2, limits=limits, follow_redirects=True, **kwargs)
+
+    def request(self, method, url, params, stream=False, timeout=None, headers=None):
+        pairs = _encode_params(params)
+        if method == 'GET':
+            request = self.client.build_request(method, url, params=pairs, headers=headers,
+                                                timeout=timeout)
+        else:
+            request = self.client.build_request(method, url, data=dict(pairs), headers=headers,
+                                                timeout=timeout)
+        r = self.client.send(request, stream=stream)
+        if not stream:
+            return Response(r.status_code, r.headers.items(), url, content=r.content)
+        return Response(r.status_code, r.headers.items(), url,
+                        chunks=lambda size: r.iter_bytes(size), release=r.close)
+
+    def close(self):
+        self.client.close()
+
+
+class RecordReplayTransport:
+    """
+    Saves responses to a file and serves them back without the network,
+    for deterministic tests and for profiling against recorded traffic::
+
+        # Record real traffic
+        with Pulsedive(transport=RecordReplayTransport('traffic.jsonl', mode='record')) as pud:
+            run_workload(pud)
+
+        # Replay it
+        with Pulsedive(transport=RecordReplayTransport('traffic.jsonl')) as pud:
+            run_workload(pud)
+
+    Requests are matched on the method, the URL path and the parameters,
+    excluding the API key, which is never saved. Identical requests are
+    answered with their recorded responses in order, the last one being
+    repeated once they are used up.
+
+    :param path: JSON Lines file of the recorded responses
+    :param mode: ``'replay'`` only serves recorded responses and raises a
+        :class:`~pulsedive.PulsediveException` for any other request.
+        ``'record'`` sends every request and saves the responses, replacing
+        the file. ``'auto'`` replays recorded responses and records the
+        others. Default: ``'replay'``
+    :param transport: Transport used to send requests when recording.
+        Default: :class:`RequestsTransport`
+    """
+
+    def __init__(self, path, mode='replay', transport=None):
+        if mode not in ('replay', 'record', 'auto'):
+            raise ValueError('Unknown mode "{}", expected replay, record or auto'.format(mode))
+        self.path = path
+        self.mode = mode
+        self._owns_transport = transport is None and mode != 'replay'
+        if self._owns_transport:
+            transport = RequestsTransport()
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._recorded = {}
+        self._served = {}
+        self._file = None
+
+        if mode != 'record':
+            try:
+                with open(path) as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self._recorded.setdefault(entry['key'], []).append(entry)
+            except FileNotFoundError:
+                if mode == 'replay':
+                    raise
+        if mode != 'replay':
+            self._file = open(path, 'w' if mode == 'record' else 'a')
+
+    @staticmethod
+    def _key(method, url, params):
+        return make_key(method, urlsplit(url).path, params)
+
+    def request(self, method, url, params, stream=False, **kwargs):
+        key = self._key(method, url, params)
+        with self._lock:
+            entries = self._recorded.get(key)
+            if entries and self.mode != 'record':
+                index = self._served.get(key, 0)
+                self._served[key] = index + 1
+                return self._response(entries[min(index, len(entries) - 1)], url)
+        if self.mode == 'replay':
+            raise PulsediveException('No recorded response for {} {}'.format(method, url))
+
+        r = self.transport.request(method, url, params, **kwargs)
+        content = r.content
+        r.close()
+        entry = {
+            'key': key,
+            'status': r.status_code,
+            'headers': dict((name, value) for name, value in r.headers.items()
+                            if name.lower() not in ('content-encoding', 'content-length',
+                                                    'transfer-encoding', 'set-cookie')),
+        }
+        try:
+            entry['text'] = content.decode('utf-8')
+        except UnicodeDecodeError:
+            import base64
+            entry['base64'] = base64.b64encode(content).decode('ascii')
+        with self._lock:
+            self._recorded.setdefault(key, []).append(entry)
+            self._served[key] = len(self._recorded[key])
+            self._file.write(json.dumps(entry, sort_keys=True) + '\n')
+            self._file.flush()
+        return Response(r.status_code, entry['headers'], url, content=content)
+
+    @staticmethod
+    def _response(entry, url):
+        if 'base64' in entry:
+            import base64
+            content = base64.b64decode(entry['base64'])
+        else:
+            content = entry['text'].encode('utf-8')
+        return Response(entry['status'], entry['headers'], url, content=content)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._owns_transport:
+            self.transport.close()
+
+
+TRANSPORTS = {
+    'requests': RequestsTransport,
+    'urllib3': Urllib3Transport,
+    'httpx': HTTPXTransport,
+}
+
+
+def get_transport(name, **kwargs):
+    """
+    Creates the transport registered as ``name`` in :data:`TRANSPORTS`
+    """
+    try:
+        cls = TRANSPORTS[name]
+    except KeyError:
+        raise ValueError('Unknown transport "{}", expected one of {}'.format(
+            name, ', '.join(sorted(TRANSPORTS))))
+    return cls(**kwargs)
@@ -1,16 +1,31 @@
+def _join(path, key, sep):
+    if sep is None:
+        return '{}[{}]'.format(path, key)
+    return '{}{}{}'.format(path, sep, key) if path else str(key)
 
-def flatten(value, prefix=''):
-    if isinstance(value, list):
-        ret = {}
-        for idx, e in enumerate(value):
-            flattened = flatten(e, prefix='{}[{}]'.format(prefix, idx))
-            ret.update(flattened)
-        return ret
-    if isinstance(value, dict):
-        ret = {}
-        for field, e in value.items():
-            flattened = flatten(e, prefix='{}[{}]'.format(prefix, field))
-            ret.update(flattened)
-        return ret
-    return {prefix: value}
 
+def flatten(value, prefix='', sep=None):
+    """
+    Flattens nested dicts and lists into a single dict whose keys are the
+    paths of the values, ``[field][0]`` by default or ``field.0`` with
+    ``sep='.'``. Empty dicts and lists are dropped.
+
+    The payload is walked with an explicit stack, so deep or wide payloads
+    are flattened in linear time and without recursion limits.
+    """
+    ret = {}
+    stack = [(prefix, value)]
+    while stack:
+        path, value = stack.pop()
+        if isinstance(value, dict):
+            items = value.items()
+        elif isinstance(value, list):
+            items = enumerate(value)
+        else:
+            ret[path] = value
+            continue
+        # Pushed in reverse so the values are visited in order
+        children = [(_join(path, key, sep), child) for key, child in items]
+        children.reverse()
+        stack.extend(children)
+    return ret
@@ -32,12 +32,21 @@ setup(
         'Intended Audience :: Developers',
         'Operating System :: OS Independent',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2.7',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6'
     ],
+    python_requires='>=3.5',
     install_requires=['requests'],
+    entry_points={
+        'console_scripts': ['pulsedive = pulsedive.cli:main'],
+    },
     extras_require={
         'develop': tests_require + ["sphinx", "sphinx_rtd_theme"],
+        'async': ['aiohttp; python_version >= "3.6"'],
+        'http2': ['httpx[http2]'],
+        'fast': ['orjson'],
+        'export': ['pandas', 'pyarrow'],
     }
 )
@@ -1,7 +1,48 @@
+import sys
+
 import pytest
 import pulsedive
+from pulsedive import ratelimit
+from pulsedive.testing import StubServer
+
+# pulsedive.aio uses asynchronous generators
+collect_ignore = ['test_aio.py'] if sys.version_info < (3, 6) else []
+
+
+@pytest.fixture(autouse=True)
+def rate_limit_buckets(monkeypatch):
+    """
+    Rate limits are shared by all the clients of an API key in the process,
+    every test starts without any
+    """
+    monkeypatch.setattr(ratelimit, '_buckets', {})
 
 
 @pytest.fixture
 def pud():
     return pulsedive.Pulsedive()
+
+
+@pytest.fixture
+def stub():
+    """
+    Local stand-in for the API without any routes. Tests set the handlers
+    they need in ``stub.routes``.
+    """
+    with StubServer(routes={}) as server:
+        yield server
+
+
+@pytest.fixture
+def emulator():
+    """
+    Local stand-in for the API emulating all endpoints
+    """
+    with StubServer(links_size=50, search_size=120, page_size=50, analyze_delay=0.05) as server:
+        yield server
+
+
+@pytest.fixture
+def stub_pud(stub):
+    with pulsedive.Pulsedive(base_url=stub.url) as client:
+        yield client
@@ -0,0 +1,212 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+import pulsedive
+
+aio = pytest.importorskip('pulsedive.aio')
+aiohttp = pytest.importorskip('aiohttp')
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestAsyncPulsedive:
+    def test_indicator(self, stub):
+        stub.routes['info.php'] = lambda params: (200, {'iid': params['iid'], 'indicator': 'afobal.cl'})
+
+        async def main():
+            async with aio.AsyncPulsedive(base_url=stub.url) as pud:
+                return await pud.indicator('1')
+
+        result = run(main())
+        assert result['iid'] == '1'
+
+    def test_list_params_are_repeated(self, stub):
+        stub.routes['search.php'] = lambda params: (200, {'results': [], 'params': params})
+
+        async def main():
+            async with aio.AsyncPulsedive(base_url=stub.url) as pud:
+                return await pud.search.indicator(risk=['high', 'critical'])
+
+        result = run(main())
+        assert result['params']['risk[]'] == ['high', 'critical']
+
+    def test_export(self, stub):
+        stub.routes['search.php'] = lambda params: (200, b'iid,indicator\n1,afobal.cl\n')
+
+        async def main():
+            async with aio.AsyncPulsedive(base_url=stub.url) as pud:
+                return await pud.search('afobal', export=True)
+
+        assert run(main()).startswith('iid,indicator')
+
+    def test_to_csv(self, stub, tmp_path):
+        stub.routes['search.php'] = lambda params: (200, b'iid,indicator\n1,afobal.cl\n')
+        filename = str(tmp_path / 'out.csv')
+
+        reports = []
+
+        async def main():
+            async with aio.AsyncPulsedive(base_url=stub.url) as pud:
+                size = await pud.search.to_csv('afobal', filename=filename, progress=reports.append)
+                with pytest.raises(pulsedive.PulsediveException):
+                    await pud.search.to_csv('afobal', filename=filename, parts=2)
+                return size
+
+        assert run(main()) == 26
+        with open(filename) as f:
+            assert f.read() == 'iid,indicator\n1,afobal.cl\n'
+        assert reports[-1].bytes == 26
+
+    def test_error(self, stub):
+        stub.routes['info.php'] = lambda params: (200, {'error': 'Indicator not found.'})
+
+        async def main():
+            async with aio.AsyncPulsedive(base_url=stub.url) as pud:
+                await pud.threat(name='unknown')
+
+        with pytest.raises(pulsedive.PulsediveException):
+            run(main())
+
+    def test_concurrency_cap(self, stub):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def info(params):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return 200, {'iid': params['iid']}
+        stub.routes['info.php'] = info
+
+        async def main():
+            async with aio.AsyncPulsedive(base_url=stub.url, max_concurrency=4) as pud:
+                return await asyncio.gather(*[pud.indicator(str(i)) for i in range(20)])
+
+        results = run(main())
+        assert [r['iid'] for r in results] == [str(i) for i in range(20)]
+        assert 1 < running[1] <= 4
+
+    def test_get_many(self, stub):
+        stub.routes['info.php'] = lambda params: (200, {'iid': params.get('iid', '0')})
+
+        async def main():
+            async with aio.AsyncPulsedive(base_url=stub.url) as pud:
+                return [r async for r in pud.indicator.get_many(iids=['3', '1', '3', '2'])]
+
+        results = run(main())
+        assert [r.iid for r in results] == ['3', '1', '2']
+        assert [r.result['iid'] for r in results] == ['3', '1', '2']
+
+    def test_get_many_is_lazy(self, stub):
+        stub.routes['info.php'] = lambda params: (200, {'iid': params.get('iid', '0')})
+        consumed = []
+
+        def iids():
+            for i in range(100):
+                consumed.append(i)
+                yield str(i)
+
+        async def main():
+            async with aio.AsyncPulsedive(base_url=stub.url, max_concurrency=2) as pud:
+                results = pud.indicator.get_many(iids=iids(), ordered=False)
+                await results.__anext__()
+                seen = len(consumed)
+                rest = [r async for r in results]
+                return seen, rest
+
+        seen, rest = run(main())
+        assert seen <= 2 * 2 + 1
+        assert len(rest) == 99
+
+    def test_iter_indicators(self, emulator):
+        async def main():
+            async with aio.AsyncPulsedive(base_url=emulator.url) as pud:
+                first = [r['iid'] async for r in pud.search.iter_indicators('zeus')]
+                second = [r['iid'] async for r in pud.search.iter_indicators(prefetch=False)]
+                return first, second
+
+        first, second = run(main())
+        assert first == second == [str(i) for i in range(1, 121)]
+        assert [params['page'] for _, _, params, _ in emulator.requests] == ['0', '1', '2'] * 2
+
+    def test_iter_links(self, emulator):
+        async def main():
+            async with aio.AsyncPulsedive(base_url=emulator.url) as pud:
+                threat = [link['iid'] async for link in pud.threat.iter_links(1)]
+                feed = [link['iid'] async for link in pud.feed.iter_links(1)]
+                return threat, feed
+
+        threat, feed = run(main())
+        assert len(threat) == len(feed) == 50
+
+    def test_submit_many(self, emulator):
+        async def main():
+            async with aio.AsyncPulsedive(base_url=emulator.url) as pud:
+                pud.analyze.initial_delay = 0.02
+                return await asyncio.gather(*pud.analyze.submit_many(['host1.example', 'host2.example']))
+
+        results = run(main())
+        assert [r['data']['indicator'] for r in results] == ['host1.example', 'host2.example']
+
+    def test_submit_many_unknown_qid(self, stub):
+        stub.routes['analyze.php'] = lambda params: (
+            200, {'qid': 1} if 'ioc' in params else {'error': 'Request not found.'})
+
+        async def main():
+            async with aio.AsyncPulsedive(base_url=stub.url) as pud:
+                pud.analyze.initial_delay = 0.01
+                await pud.analyze.submit_many(['a.example'])[0]
+
+        with pytest.raises(pulsedive.PulsediveException):
+            run(main())
+        assert len(stub.requests) == 2
+
+    def test_feed_diff_is_rejected(self, stub):
+        async def main():
+            async with aio.AsyncPulsedive(base_url=stub.url) as pud:
+                pud.feed.diff(1)
+
+        with pytest.raises(pulsedive.PulsediveException):
+            run(main())
+        assert stub.requests == []
+
+    def test_sync_only_options(self, stub):
+        async def main():
+            async with aio.AsyncPulsedive(base_url=stub.url) as pud:
+                for options in ({'priority': 'bulk'}, {'cache': False}):
+                    with pytest.raises(pulsedive.PulsediveException):
+                        await pud.indicator('1', **options)
+
+        run(main())
+        assert stub.requests == []
+
+    def test_streamed_response_holds_its_slot(self, stub):
+        # Large enough not to be buffered whole while it is not read
+        body = os.urandom(4 << 20)
+        stub.routes['info.php'] = lambda params: (200, {'iid': '2'}) if params['iid'] == '2' else (200, body)
+
+        async def main():
+            # The session's connection limit would also hold the second request
+            async with aiohttp.ClientSession() as session, \
+                    aio.AsyncPulsedive(base_url=stub.url, max_concurrency=1, session=session) as pud:
+                for finish in ('read', 'release'):
+                    r = await pud.get('info.php', {'iid': '1'}, raw=True, stream=True)
+                    other = asyncio.ensure_future(pud.indicator('2'))
+                    await asyncio.sleep(0.05)
+                    assert not other.done()
+                    if finish == 'read':
+                        await r.read()
+                    else:
+                        r.release()
+                    assert (await asyncio.wait_for(other, 5))['iid'] == '2'
+                    r.release()
+
+        run(main())
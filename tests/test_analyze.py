@@ -1,6 +1,10 @@
+import itertools
+import threading
 import time
+
 import pytest
 import pulsedive
+from pulsedive.polling import ResultsPoller
 
 
 class TestAnalyze:
@@ -33,3 +37,90 @@ class TestAnalyze:
         # assert 'success' in result
         # assert result['data']['indicator'] == 'google.com'
 
+
+
+class AnalyzeQueue:
+    """
+    Stub of analyze.php where job ``n`` is ready after ``n`` polls
+    """
+    def __init__(self):
+        self.qids = itertools.count(1)
+        self.polls = {}
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, params):
+        with self.lock:
+            if 'ioc' in params:
+                qid = next(self.qids)
+                self.values[qid] = params['ioc']
+                self.polls[qid] = 0
+                return 200, {'qid': qid, 'status': 'queued'}
+            qid = int(params['qid'])
+            self.polls[qid] += 1
+            if self.polls[qid] < qid:
+                return 200, {'error': 'Still processing.'}
+            return 200, {'success': 'Analysis complete.', 'qid': qid,
+                         'data': {'indicator': self.values[qid]}}
+
+
+class TestSubmitMany:
+    def test_resolves_each_future(self, stub, stub_pud):
+        queue = AnalyzeQueue()
+        stub.routes['analyze.php'] = queue
+        stub_pud.analyze.poller = ResultsPoller(stub_pud.analyze, max_polls=2,
+                                                initial_delay=0.01, min_delay=0.01, max_delay=0.05)
+        values = ['a.example', 'b.example', 'c.example', 'd.example']
+        futures = stub_pud.analyze.submit_many(values)
+        results = [f.result(timeout=10) for f in futures]
+        assert len(results) == 4
+        assert all('success' in r for r in results)
+        assert sorted(queue.values.values()) == ['YS5leGFtcGxl', 'Yi5leGFtcGxl', 'Yy5leGFtcGxl', 'ZC5leGFtcGxl']
+        assert sum(queue.polls.values()) >= 1 + 2 + 3 + 4
+
+    def test_enrich_and_probe(self, stub, stub_pud):
+        queue = AnalyzeQueue()
+        stub.routes['analyze.php'] = queue
+        stub_pud.analyze.poller = ResultsPoller(stub_pud.analyze, initial_delay=0.01)
+        stub_pud.analyze.submit_many(['a.example'], enrich=False, probe=True)[0].result(timeout=10)
+        _, _, params, _ = stub.requests[0]
+        assert params['enrich'] == '0'
+        assert params['probe'] == '1'
+
+    def test_options_are_passed_to_polls(self, stub, stub_pud):
+        stub.routes['analyze.php'] = AnalyzeQueue()
+        stub_pud.analyze.poller = ResultsPoller(stub_pud.analyze, initial_delay=0.01, min_delay=0.01)
+        stub_pud.analyze.submit_many(['b.example'], probe=True, sanitize=False)[0].result(timeout=10)
+        polls = [params for _, _, params, _ in stub.requests if 'qid' in params]
+        assert polls and all(params['sanitize'] == '0' and 'probe' not in params for params in polls)
+
+    def test_timeout(self, stub, stub_pud):
+        stub.routes['analyze.php'] = lambda params: (200, {'qid': 1} if 'ioc' in params else {'error': 'Not ready'})
+        stub_pud.analyze.poller = ResultsPoller(stub_pud.analyze, initial_delay=0.01,
+                                                min_delay=0.01, timeout=0.1)
+        future = stub_pud.analyze.submit_many(['a.example'])[0]
+        with pytest.raises(pulsedive.PulsediveException):
+            future.result(timeout=10)
+
+    def test_unknown_qid(self, stub, stub_pud):
+        stub.routes['analyze.php'] = lambda params: (200, {'error': 'Request not found.'})
+        poller = ResultsPoller(stub_pud.analyze, initial_delay=0.01)
+        with pytest.raises(pulsedive.PulsediveException):
+            poller.watch(1).result(timeout=5)
+        assert len(stub.requests) == 1
+        poller.close()
+
+    def test_submit_error(self, stub, stub_pud):
+        stub.routes['analyze.php'] = lambda params: (200, {'error': 'Invalid indicator.'})
+        future = stub_pud.analyze.submit_many(['a.example'])[0]
+        with pytest.raises(pulsedive.PulsediveException):
+            future.result(timeout=10)
+
+    def test_watch_and_close(self, stub, stub_pud):
+        stub.routes['analyze.php'] = lambda params: (200, {'error': 'Not ready'})
+        poller = ResultsPoller(stub_pud.analyze, initial_delay=10)
+        future = poller.watch(1)
+        time.sleep(0.1)
+        assert poller.pending() == 1
+        poller.close()
+        assert future.cancelled()
@@ -0,0 +1,47 @@
+import pytest
+from pulsedive.bloom import BloomFilter, build_filter
+
+
+class TestBloomFilter:
+    def test_no_false_negatives(self):
+        values = ['d{}.example'.format(i) for i in range(5000)]
+        bf = BloomFilter.from_values(values, error_rate=0.01)
+        assert all(v in bf for v in values)
+        assert len(bf) == 5000
+
+    def test_false_positive_rate(self):
+        bf = BloomFilter.from_values(('d{}.example'.format(i) for i in range(5000)),
+                                     error_rate=0.01, capacity=5000)
+        false_positives = sum('other{}.example'.format(i) in bf for i in range(20000))
+        assert false_positives / 20000 < 0.02
+
+    def test_save_and_load(self, tmp_path):
+        path = str(tmp_path / 'iocs.bloom')
+        bf = BloomFilter.from_values(['a.example', 'b.example'])
+        bf.save(path)
+        loaded = BloomFilter.load(path)
+        assert 'a.example' in loaded
+        assert 'b.example' in loaded
+        assert 'c.example' not in loaded
+        assert len(loaded) == 2
+        assert loaded.num_bits == bf.num_bits
+        with pytest.raises(TypeError):
+            loaded.add('c.example')
+        loaded.close()
+
+    def test_load_rejects_other_files(self, tmp_path):
+        path = tmp_path / 'other'
+        path.write_bytes(b'x' * 64)
+        with pytest.raises(ValueError):
+            BloomFilter.load(str(path))
+
+    def test_build_filter(self, stub, stub_pud):
+        stub.routes['info.php'] = lambda params: (200, {'results': [
+            {'iid': '1', 'indicator': 'feed{}.example'.format(params.get('fid', params.get('tid')))}]})
+        stub.routes['search.php'] = lambda params: (200, {'page_current': 0, 'results': [
+            {'iid': '2', 'indicator': '10.0.0.1'}]})
+        bf = build_filter(stub_pud, feeds=[1], threats=[2], searches=[{'risk': ['high']}])
+        assert 'feed1.example' in bf
+        assert 'feed2.example' in bf
+        assert '10.0.0.1' in bf
+        assert len(bf) == 3
@@ -0,0 +1,207 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+import pulsedive
+from pulsedive.cache import MemoryCache, SQLiteCache, make_key
+
+
+def info_route(params):
+    if params.get('indicator') == 'unknown.example':
+        return 200, {'error': 'Indicator not found.'}
+    if params.get('indicator') == 'limited.example':
+        return 200, {'error': 'API limit reached.'}
+    return 200, {'iid': params.get('iid', '1')}
+
+
+@pytest.fixture
+def cached_pud(stub):
+    stub.routes['info.php'] = info_route
+    stub.routes['analyze.php'] = lambda params: (200, {'qid': 1})
+    with pulsedive.Pulsedive(base_url=stub.url, cache=MemoryCache(maxsize=2)) as pud:
+        yield pud
+
+
+class TestMakeKey:
+    def test_normalizes_values(self):
+        assert make_key('GET', 'info.php', {'iid': 1}) == make_key('GET', 'info.php', {'iid': '1'})
+        assert (make_key('GET', 'search.php', {'risk[]': ['high', 'low']}) ==
+                make_key('GET', 'search.php', {'risk[]': ['low', 'high']}))
+
+    def test_ignores_api_key(self):
+        assert make_key('GET', 'info.php', {'iid': 1, 'key': 'a'}) == make_key('GET', 'info.php', {'iid': 1})
+
+    def test_includes_flags(self):
+        assert (make_key('GET', 'info.php', {'iid': 1, 'pretty': 0}) !=
+                make_key('GET', 'info.php', {'iid': 1, 'pretty': 1}))
+
+
+class TestMemoryCache:
+    def test_lru_eviction(self):
+        cache = MemoryCache(maxsize=2)
+        cache.set('a', {}, 10)
+        cache.set('b', {}, 10)
+        cache.get('a')
+        cache.set('c', {}, 10)
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.stats()['evictions'] == 1
+
+    def test_expiry(self):
+        cache = MemoryCache()
+        cache.set('a', {}, 0.01)
+        time.sleep(0.02)
+        assert cache.get('a') is None
+        assert cache.stats()['expirations'] == 1
+
+    def test_ttl_for(self):
+        cache = MemoryCache(ttl=10, ttls={'search.php': 5}, negative_ttl=1)
+        assert cache.ttl_for('info.php', {}) == 10
+        assert cache.ttl_for('search.php', {}) == 5
+        assert cache.ttl_for('analyze.php', {}) == 0
+        assert cache.ttl_for('info.php', {'error': 'Indicator not found.'}) == 1
+        assert cache.ttl_for('info.php', {'error': 'API limit reached.'}) == 0
+
+
+def write_entries(path, start, count):
+    cache = SQLiteCache(path)
+    for i in range(start, start + count):
+        cache.set('key{}'.format(i), {'iid': str(i)}, 60)
+    cache.close()
+
+
+class TestSQLiteCache:
+    def test_roundtrip(self, tmp_path):
+        cache = SQLiteCache(str(tmp_path / 'cache.db'))
+        cache.set('a', {'iid': '1', 'results': [1, 2]}, 10)
+        assert cache.get('a') == {'iid': '1', 'results': [1, 2]}
+        assert cache.get('b') is None
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+        assert cache.stats()['size'] == 1
+
+    def test_expiry(self, tmp_path):
+        cache = SQLiteCache(str(tmp_path / 'cache.db'))
+        cache.set('a', {}, -1)
+        assert cache.get('a') is None
+        assert cache.stats()['expirations'] == 1
+        cache.compact()
+        assert len(cache) == 0
+
+    def test_compaction(self, tmp_path):
+        cache = SQLiteCache(str(tmp_path / 'cache.db'), max_entries=10, compact_every=5)
+        for i in range(23):
+            cache.set('key{}'.format(i), {}, 60 + i)
+        assert len(cache) <= 13
+        cache.compact(vacuum=True)
+        assert len(cache) == 10
+        assert cache.get('key22') is not None
+        assert cache.get('key0') is None
+
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / 'cache.db')
+        SQLiteCache(path).set('a', {'iid': '1'}, 60)
+        assert SQLiteCache(path).get('a') == {'iid': '1'}
+
+    def test_concurrent_threads(self, tmp_path):
+        cache = SQLiteCache(str(tmp_path / 'cache.db'))
+
+        def work(n):
+            for i in range(50):
+                cache.set('{}-{}'.format(n, i), {'n': n}, 60)
+                cache.get('{}-{}'.format(n, i))
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(cache) == 200
+        cache.close()
+
+    @pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason='requires /proc')
+    def test_connections_are_bounded(self, stub, tmp_path):
+        stub.routes['info.php'] = info_route
+        path = str(tmp_path / 'cache.db')
+
+        def open_connections():
+            fds = os.listdir('/proc/self/fd')
+            return sum(1 for fd in fds if os.path.realpath('/proc/self/fd/' + fd) == path)
+
+        cache = SQLiteCache(path, pool_size=4)
+        with pulsedive.Pulsedive(base_url=stub.url, cache=cache) as pud:
+            for i in range(30):
+                list(pud.indicator.get_many(iids=range(i * 8, i * 8 + 16), max_workers=8))
+            # SQLite may keep the file of a closed connection open for reuse
+            # while other connections hold locks, so this is not exact
+            assert open_connections() <= 2 * 4
+            assert len(cache) == 30 * 8 + 8
+        cache.close()
+        assert open_connections() == 0
+
+    def test_concurrent_processes(self, tmp_path):
+        path = str(tmp_path / 'cache.db')
+        SQLiteCache(path)
+        procs = [multiprocessing.Process(target=write_entries, args=(path, n * 100, 100))
+                 for n in range(3)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+            assert p.exitcode == 0
+        cache = SQLiteCache(path)
+        assert len(cache) == 300
+        assert cache.get('key250') == {'iid': '250'}
+
+    def test_client(self, stub, tmp_path):
+        stub.routes['info.php'] = info_route
+        path = str(tmp_path / 'cache.db')
+        with pulsedive.Pulsedive(base_url=stub.url, cache=SQLiteCache(path)) as pud:
+            pud.indicator('1')
+        with pulsedive.Pulsedive(base_url=stub.url, cache=SQLiteCache(path)) as pud:
+            assert pud.indicator('1') == {'iid': '1'}
+        assert len(stub.requests) == 1
+
+
+class TestClientCache:
+    def test_hit(self, stub, cached_pud):
+        assert cached_pud.indicator('1') == cached_pud.indicator(1)
+        assert len(stub.requests) == 1
+        assert cached_pud.cache.stats()['hits'] == 1
+        assert cached_pud.cache.stats()['misses'] == 1
+
+    def test_flags_are_part_of_key(self, stub, cached_pud):
+        cached_pud.indicator('1')
+        cached_pud.indicator('1', pretty=True)
+        assert len(stub.requests) == 2
+
+    def test_negative_caching(self, stub, cached_pud):
+        for _ in range(3):
+            with pytest.raises(pulsedive.PulsediveException):
+                cached_pud.indicator(value='unknown.example')
+        assert len(stub.requests) == 1
+
+    def test_other_errors_are_not_cached(self, stub, cached_pud):
+        for _ in range(2):
+            with pytest.raises(pulsedive.PulsediveException):
+                cached_pud.indicator(value='limited.example')
+        assert len(stub.requests) == 2
+
+    def test_bypass(self, stub, cached_pud):
+        cached_pud.indicator('1')
+        cached_pud.indicator('1', cache=False)
+        cached_pud.indicator('1', raw=True)
+        assert len(stub.requests) == 3
+
+    def test_post_and_analyze_not_cached(self, stub, cached_pud):
+        cached_pud.analyze('pulsedive.com')
+        cached_pud.analyze('pulsedive.com')
+        cached_pud.analyze.results(1)
+        cached_pud.analyze.results(1)
+        assert len(stub.requests) == 4
+
+    def test_default_cache(self):
+        assert isinstance(pulsedive.Pulsedive(cache=True).cache, MemoryCache)
+        assert pulsedive.Pulsedive().cache is None
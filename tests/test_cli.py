@@ -0,0 +1,162 @@
+import csv
+import io
+import json
+import subprocess
+import sys
+
+import pytest
+import pulsedive
+import requests
+from pulsedive.cli import Checkpoint, JSONLWriter, describe_error, enrich, main, read_values
+from pulsedive.testing import StubServer
+
+VALUES = ['host{}.example'.format(i) for i in range(1, 41)] + ['missing.invalid']
+
+
+@pytest.fixture
+def iocs(tmp_path):
+    path = tmp_path / 'iocs.txt'
+    path.write_text('# indicators\n\n' + '\n'.join(VALUES) + '\n')
+    return str(path)
+
+
+def run(server, *args, **streams):
+    stdout = streams.get('stdout', io.StringIO())
+    stderr = io.StringIO()
+    status = main(['--base-url', server.url, 'enrich'] + list(args) + ['-q'],
+                  stdin=streams.get('stdin'), stdout=stdout, stderr=stderr)
+    return status, stdout.getvalue(), stderr.getvalue()
+
+
+class TestCli:
+    def test_jsonl(self, emulator, iocs, tmp_path):
+        output = str(tmp_path / 'out.jsonl')
+        status, _, _ = run(emulator, iocs, '-o', output, '-w', '4')
+        assert status == 0
+        with open(output) as f:
+            results = [json.loads(line) for line in f]
+        assert sorted(r['indicator'] for r in results) == sorted(VALUES)
+        assert [r for r in results if 'error' in r][0]['indicator'] == 'missing.invalid'
+
+    def test_csv_from_stdin(self, emulator):
+        stdin = io.StringIO('host1.example\nhost2.example\n')
+        status, out, _ = run(emulator, '-f', 'csv', '--columns', 'iid,indicator,risk', stdin=stdin)
+        assert status == 0
+        rows = list(csv.reader(io.StringIO(out)))
+        assert rows[0] == ['iid', 'indicator', 'risk']
+        assert sorted(row[1] for row in rows[1:]) == ['host1.example', 'host2.example']
+
+    def test_resume(self, emulator, iocs, tmp_path):
+        output = str(tmp_path / 'out.jsonl')
+        ckpt = str(tmp_path / 'iocs.ckpt')
+
+        class Interrupting(JSONLWriter):
+            def write(self, result):
+                if self.written == 10:
+                    raise KeyboardInterrupt()
+                self.written += 1
+                JSONLWriter.write(self, result)
+
+        with open(output, 'w') as f, pulsedive.Pulsedive(base_url=emulator.url) as pud:
+            writer = Interrupting(f)
+            writer.written = 0
+            checkpoint = Checkpoint(ckpt)
+            with open(iocs) as values, pytest.raises(KeyboardInterrupt):
+                enrich(pud, read_values(values), writer, checkpoint, workers=4, flush=f.flush)
+            checkpoint.close()
+        finished = len(Checkpoint(ckpt))
+        assert finished >= 10
+
+        del emulator.requests[:]
+        status, _, _ = run(emulator, iocs, '-o', output, '--checkpoint', ckpt)
+        assert status == 0
+        assert len(emulator.requests) == len(VALUES) - finished
+        with open(output) as f:
+            assert sorted(json.loads(line)['indicator'] for line in f) == sorted(VALUES)
+
+        del emulator.requests[:]
+        run(emulator, iocs, '-o', output, '--checkpoint', ckpt)
+        assert emulator.requests == []
+
+    def test_resume_csv_to_stdout(self, emulator, tmp_path):
+        ckpt = str(tmp_path / 'iocs.ckpt')
+        checkpoint = Checkpoint(ckpt)
+        checkpoint.add(0)
+        checkpoint.close()
+        stdin = io.StringIO('host1.example\nhost2.example\n')
+        status, out, err = run(emulator, '-f', 'csv', '--columns', 'iid,indicator',
+                               '--checkpoint', ckpt, stdin=stdin)
+        assert status == 0
+        assert list(csv.reader(io.StringIO(out))) == [['iid', 'indicator'], ['2', 'host2.example']]
+        assert 'not written again' in err
+
+    def test_resume_into_missing_output(self, emulator, iocs, tmp_path):
+        output = str(tmp_path / 'out.csv')
+        ckpt = str(tmp_path / 'iocs.ckpt')
+        checkpoint = Checkpoint(ckpt)
+        checkpoint.add(0)
+        checkpoint.close()
+        status, _, err = run(emulator, iocs, '-o', output, '--checkpoint', ckpt)
+        assert status == 2
+        assert 'missing or empty' in err
+        assert emulator.requests == []
+        assert not (tmp_path / 'out.csv').exists()
+
+    def test_failures_are_not_checkpointed(self, iocs, tmp_path):
+        ckpt = str(tmp_path / 'iocs.ckpt')
+        with StubServer(error_rate=1) as server:
+            status, out, err = run(server, iocs, '--checkpoint', ckpt, '--retries', '0')
+        assert status == 1
+        assert out == ''
+        assert err.count('Failed to look up') == len(VALUES)
+        assert len(Checkpoint(ckpt)) == 0
+
+    @pytest.mark.parametrize('status, body', [(401, {'error': 'Invalid API key.'}),
+                                              (200, {'error': 'API limit exceeded.'})])
+    def test_api_errors_are_not_final(self, stub, iocs, tmp_path, status, body):
+        ckpt = str(tmp_path / 'iocs.ckpt')
+        stub.routes['info.php'] = lambda params: (status, body)
+        status, out, err = run(stub, iocs, '--checkpoint', ckpt)
+        assert status == 1
+        assert out == ''
+        assert err.count('Failed to look up') == len(VALUES)
+        assert len(Checkpoint(ckpt)) == 0
+
+    def test_errors_do_not_show_the_key(self, stub, iocs, tmp_path):
+        output = str(tmp_path / 'out.jsonl')
+        stub.routes['info.php'] = lambda params: (
+            (404, {'error': 'Indicator not found.'}) if params['indicator'] == 'missing.invalid'
+            else (403, {'error': 'Invalid API key.'}))
+        stderr = io.StringIO()
+        status = main(['--key', 'SECRETKEY123', '--base-url', stub.url, 'enrich', iocs, '-o', output,
+                       '-q'], stderr=stderr)
+        err = stderr.getvalue()
+        assert status == 1
+        with open(output) as f:
+            assert json.loads(f.read())['error'] == 'HTTP 404: Indicator not found.'
+        assert 'Failed to look up host1.example: HTTP 403: Invalid API key.' in err
+        assert 'SECRETKEY123' not in err
+
+        error = requests.ConnectionError("Max retries exceeded with url: "
+                                         "/api/info.php?indicator=a.example&key=SECRETKEY123 (refused)")
+        assert describe_error(error) == ("Max retries exceeded with url: "
+                                         "/api/info.php?indicator=a.example&key=<hidden> (refused)")
+
+    def test_checkpoint_compaction(self, tmp_path):
+        path = str(tmp_path / 'ckpt')
+        checkpoint = Checkpoint(path)
+        for position in (0, 1, 3, 2, 5):
+            checkpoint.add(position)
+        checkpoint.close()
+        checkpoint = Checkpoint(path)
+        assert checkpoint.below == 4 and checkpoint.done == {5}
+        assert 3 in checkpoint and 4 not in checkpoint
+        checkpoint.close()
+        with open(path) as f:
+            assert f.read() == '<4\n5\n'
+
+    def test_module(self, emulator):
+        proc = subprocess.run([sys.executable, '-m', 'pulsedive', '--base-url', emulator.url,
+                               'enrich', '-q'], input=b'host3.example\n', stdout=subprocess.PIPE,
+                              check=True)
+        assert json.loads(proc.stdout)['iid'] == '3'
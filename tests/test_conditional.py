@@ -0,0 +1,101 @@
+import pytest
+import pulsedive
+from pulsedive.cache import ValidatorStore
+from pulsedive.metrics import MetricsCollector
+
+
+class TestConditionalRequests:
+    @pytest.fixture(params=['requests', 'urllib3'])
+    def conditional_pud(self, request, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url, transport=request.param,
+                                 conditional=True) as client:
+            yield client
+
+    def test_not_modified(self, conditional_pud):
+        events = []
+        conditional_pud.add_hook('after_response', events.append)
+        first = conditional_pud.feed.links(1)
+        second = conditional_pud.feed.links(1)
+        assert first == second
+        assert [e.status for e in events] == [200, 304]
+        assert events[1].cache == 'hit'
+        stats = conditional_pud.stats()
+        assert stats['not_modified'] == 1
+        assert stats['bytes_saved'] >= events[0].bytes
+
+    def test_compression(self, conditional_pud):
+        conditional_pud.threat.links(1)
+        stats = conditional_pud.stats()
+        assert 0 < stats['bytes_saved'] < stats['bytes_received']
+
+    def test_changed_resource(self, stub):
+        versions = iter([{'fid': '1', 'v': 1}, {'fid': '1', 'v': 2}, {'fid': '1', 'v': 2}])
+        stub.routes['info.php'] = lambda params: (200, next(versions))
+        with pulsedive.Pulsedive(base_url=stub.url, conditional=True) as pud:
+            assert pud.feed.get(1)['v'] == 1
+            assert pud.feed.get(1)['v'] == 2
+            assert pud.feed.get(1)['v'] == 2
+            assert pud.stats()['not_modified'] == 1
+
+    def test_last_modified(self, stub):
+        stub.etags = True
+        stub.routes['info.php'] = lambda params: (
+            200, {'tid': '1'}, {'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT', 'ETag': ''})
+        with pulsedive.Pulsedive(base_url=stub.url, conditional=True) as pud:
+            pud.threat.links(1)
+            pud.threat.links(1)
+            assert pud.stats()['not_modified'] == 1
+
+    def test_errors_are_not_stored(self, stub):
+        stub.routes['info.php'] = lambda params: (200, {'error': 'Indicator not found.'})
+        store = ValidatorStore()
+        with pulsedive.Pulsedive(base_url=stub.url, conditional=store) as pud:
+            with pytest.raises(pulsedive.PulsediveException):
+                pud.indicator(value='unknown.example')
+        assert len(store) == 0
+
+    def test_unexpected_not_modified(self, stub):
+        stub.routes['info.php'] = lambda params: (304, b'')
+        with pulsedive.Pulsedive(base_url=stub.url) as pud:
+            with pytest.raises(pulsedive.PulsediveException, match='304'):
+                pud.feed.get(1)
+
+    def test_analyze_is_not_revalidated(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url, conditional=True) as pud:
+            qid = pud.analyze('host1.example')['qid']
+            pud.analyze.results(qid)
+            pud.analyze.results(qid)
+            assert pud.stats()['not_modified'] == 0
+            assert len(pud.validators) == 0
+
+    def test_disabled_by_default(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url) as pud:
+            pud.feed.links(1)
+            pud.feed.links(1)
+            assert pud.stats()['not_modified'] == 0
+
+    def test_metrics(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url, conditional=True) as pud:
+            metrics = MetricsCollector().install(pud)
+            pud.feed.links(1)
+            pud.feed.links(1)
+        text = metrics.to_prometheus()
+        assert 'pulsedive_response_bytes_saved_total{endpoint="info.php"}' in text
+        assert 'pulsedive_cache_total{endpoint="info.php",result="hit"} 1' in text
+
+    def test_store_eviction(self):
+        store = ValidatorStore(maxsize=2)
+        for i in range(3):
+            store.set(i, '"{}"'.format(i), None, {}, 10)
+        assert store.get(0) is None
+        assert store.get(2).etag == '"2"'
+
+    def test_store_size_limit(self):
+        store = ValidatorStore(maxbytes=25)
+        for i in range(3):
+            store.set(i, '"{}"'.format(i), None, {}, 10)
+        assert store.get(0) is None
+        assert store.nbytes() == 20
+        store.set(1, '"1"', None, {}, 30)
+        assert store.get(1) is None
+        assert store.nbytes() == 10
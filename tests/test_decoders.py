@@ -0,0 +1,50 @@
+import json
+
+import pytest
+import pulsedive
+from pulsedive.decoders import get_decoder
+
+
+class TestDecoders:
+    def test_stdlib(self):
+        assert get_decoder('json')(b'{"a": [1, "\\u00e9"]}') == {'a': [1, u'\xe9']}
+
+    def test_auto(self):
+        assert get_decoder('auto')(b'{"a": [1, "\\u00e9"]}') == {'a': [1, u'\xe9']}
+
+    @pytest.mark.parametrize('name', ['orjson', 'msgspec'])
+    def test_optional(self, name):
+        pytest.importorskip(name)
+        assert get_decoder(name)(b'{"results": [{"iid": "1"}]}') == {'results': [{'iid': '1'}]}
+
+    def test_callable(self):
+        decode = get_decoder(json.loads)
+        assert decode is json.loads
+
+    def test_unknown(self):
+        with pytest.raises(ValueError):
+            get_decoder('simplejson')
+        with pytest.raises(ValueError):
+            pulsedive.Pulsedive(decoder='simplejson')
+
+
+class TestClientDecoder:
+    def test_decoder_receives_bytes(self, emulator):
+        bodies = []
+
+        def decode(body):
+            bodies.append(body)
+            return json.loads(body.decode('utf-8'))
+
+        with pulsedive.Pulsedive(base_url=emulator.url, decoder=decode) as pud:
+            assert pud.indicator(value='host7.example')['iid'] == '7'
+        assert isinstance(bodies[0], bytes)
+
+    def test_decode_time_is_reported(self, emulator):
+        events = []
+        with pulsedive.Pulsedive(base_url=emulator.url) as pud:
+            pud.add_hook('after_response', events.append)
+            pud.feed.links(1)
+            assert pud.stats()['decode_time'] > 0
+        assert events[0].decode_time > 0
+        assert events[0].bytes > 0
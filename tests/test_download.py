@@ -0,0 +1,171 @@
+import os
+
+import pytest
+import pulsedive
+from pulsedive.download import parse_content_range, split_ranges
+from pulsedive.exceptions import PulsediveException
+from pulsedive.testing import StubServer
+
+
+class Interrupted(Exception):
+    pass
+
+
+def expected_csv(server, filename):
+    with pulsedive.Pulsedive(base_url=server.url) as pud:
+        pud.search.to_csv(filename=filename, limit=None)
+    with open(filename, 'rb') as f:
+        return f.read()
+
+
+class TestRanges:
+    def test_split(self):
+        assert split_ranges(10, 3) == [(0, 3), (4, 6), (7, 9)]
+        assert split_ranges(2, 4) == [(0, 0), (1, 1)]
+
+    def test_content_range(self):
+        assert parse_content_range('bytes 0-0/1234') == (0, 0, 1234)
+        assert parse_content_range('bytes 10-19/*') == (10, 19, None)
+        assert parse_content_range(None) is None
+
+
+class TestChunkedExport:
+    @pytest.fixture
+    def server(self):
+        with StubServer(search_size=3000) as server:
+            yield server
+
+    def test_parts(self, server, tmp_path):
+        expected = expected_csv(server, str(tmp_path / 'single.csv'))
+        filename = str(tmp_path / 'parts.csv')
+        del server.requests[:]
+        with pulsedive.Pulsedive(base_url=server.url) as pud:
+            size = pud.search.to_csv(filename=filename, limit=None, parts=4)
+        with open(filename, 'rb') as f:
+            assert f.read() == expected
+        assert size == len(expected)
+        # A probe for the size, then one request per part
+        assert len(server.requests) == 5
+        assert sorted(os.listdir(str(tmp_path))) == ['parts.csv', 'single.csv']
+
+    def test_resume(self, server, tmp_path):
+        expected = expected_csv(server, str(tmp_path / 'single.csv'))
+        filename = str(tmp_path / 'resumed.csv')
+
+        def interrupt(progress):
+            if progress.bytes >= 65536:
+                raise Interrupted()
+
+        with pulsedive.Pulsedive(base_url=server.url) as pud:
+            with pytest.raises(Interrupted):
+                pud.search.to_csv(filename=filename, limit=None, progress=interrupt)
+            assert not os.path.exists(filename)
+            written = os.path.getsize(filename + '.part')
+            assert written >= 65536
+
+            updates = []
+            pud.search.to_csv(filename=filename, limit=None, resume=True, progress=updates.append)
+        with open(filename, 'rb') as f:
+            assert f.read() == expected
+        assert updates[0].bytes == written
+        assert updates[-1].bytes == len(expected)
+        assert sorted(os.listdir(str(tmp_path))) == ['resumed.csv', 'single.csv']
+
+    def test_resume_parts(self, server, tmp_path):
+        expected = expected_csv(server, str(tmp_path / 'single.csv'))
+        filename = str(tmp_path / 'resumed.csv')
+        seen = []
+
+        def interrupt(progress):
+            seen.append(progress)
+            if len(seen) == 3:
+                raise Interrupted()
+
+        with pulsedive.Pulsedive(base_url=server.url) as pud:
+            with pytest.raises(Interrupted):
+                pud.search.to_csv(filename=filename, limit=None, parts=3, progress=interrupt)
+            pud.search.to_csv(filename=filename, limit=None, resume=True)
+        with open(filename, 'rb') as f:
+            assert f.read() == expected
+
+    def test_progress(self, server, tmp_path):
+        updates = []
+        with pulsedive.Pulsedive(base_url=server.url) as pud:
+            size = pud.search.to_csv(filename=str(tmp_path / 'out.csv'), limit=None,
+                                     parts=2, progress=updates.append)
+        assert updates[-1].bytes == updates[-1].total == size
+        assert all(a.bytes < b.bytes for a, b in zip(updates, updates[1:]))
+        assert updates[-1].rate > 0
+
+    def test_no_range_support(self, tmp_path):
+        with StubServer(search_size=3000, ranges=False) as server:
+            expected = expected_csv(server, str(tmp_path / 'single.csv'))
+            filename = str(tmp_path / 'out.csv')
+            with pulsedive.Pulsedive(base_url=server.url) as pud:
+                assert pud.search.to_csv(filename=filename, limit=None, parts=4) == len(expected)
+                with open(filename + '.part', 'wb') as f:
+                    f.write(expected[:100])
+                with open(filename + '.part.json', 'w') as f:
+                    f.write('{"total": null, "etag": null, "ranges": [[0, null]]}')
+                pud.search.to_csv(filename=filename, limit=None, resume=True)
+        with open(filename, 'rb') as f:
+            assert f.read() == expected
+
+    def test_changed_export(self, stub, tmp_path):
+        versions = iter(range(100))
+
+        def export(params):
+            return 200, 'version {}\n'.format(next(versions)).encode('utf-8') * 100, \
+                {'Content-Type': 'text/csv'}
+        stub.routes['search.php'] = export
+        with pulsedive.Pulsedive(base_url=stub.url) as pud:
+            with pytest.raises(PulsediveException):
+                pud.search.to_csv(filename=str(tmp_path / 'out.csv'), limit=None, parts=2)
+
+    def test_parts_need_validator(self, tmp_path):
+        with StubServer(search_size=3000, etags=False) as server:
+            expected = expected_csv(server, str(tmp_path / 'single.csv'))
+            del server.requests[:]
+            with pulsedive.Pulsedive(base_url=server.url) as pud:
+                size = pud.search.to_csv(filename=str(tmp_path / 'out.csv'), limit=None, parts=4)
+        assert size == len(expected)
+        # The probe, then a single request as the parts could not be checked
+        assert len(server.requests) == 2
+
+    def test_parts_with_last_modified(self, stub, tmp_path):
+        stub.etags = False
+        body = b'value\n' * 1000
+        stub.routes['search.php'] = lambda params: (
+            200, body, {'Content-Type': 'text/csv', 'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+        with pulsedive.Pulsedive(base_url=stub.url) as pud:
+            assert pud.search.to_csv(filename=str(tmp_path / 'out.csv'), limit=None, parts=2) == len(body)
+        assert len(stub.requests) == 3
+
+    def test_resume_without_validator(self, stub, tmp_path):
+        stub.etags = False
+        versions = iter(range(10))
+        stub.routes['search.php'] = lambda params: (
+            200, 'version {}\n'.format(next(versions)).encode('utf-8') * 10000,
+            {'Content-Type': 'text/csv'})
+        filename = str(tmp_path / 'out.csv')
+
+        def interrupt(progress):
+            if progress.bytes >= 65536:
+                raise Interrupted()
+
+        with pulsedive.Pulsedive(base_url=stub.url) as pud:
+            with pytest.raises(Interrupted):
+                pud.search.to_csv(filename=filename, limit=None, progress=interrupt)
+            pud.search.to_csv(filename=filename, limit=None, resume=True)
+        with open(filename, 'rb') as f:
+            assert f.read() == b'version 1\n' * 10000
+
+    def test_changed_size(self, stub, tmp_path):
+        sizes = iter(range(100, 200))
+
+        def export(params):
+            return 200, b'x' * next(sizes), {'Content-Type': 'text/csv', 'ETag': '"same"'}
+        stub.routes['search.php'] = export
+        with pulsedive.Pulsedive(base_url=stub.url) as pud:
+            with pytest.raises(PulsediveException):
+                pud.search.to_csv(filename=str(tmp_path / 'out.csv'), limit=None, parts=2)
@@ -0,0 +1,61 @@
+import pytest
+import pulsedive
+from pulsedive import export
+from pulsedive.models import Link
+from pulsedive.testing import make_link
+
+
+class TestColumns:
+    def test_single_pass(self):
+        results = (make_link(i) for i in range(1, 4))
+        data = export.to_columns(results)
+        assert list(data) == list(export.INDICATOR_COLUMNS)
+        assert data['iid'] == [1, 2, 3]
+        assert data['indicator'] == ['host1.example', 'host2.example', 'host3.example']
+
+    def test_response_and_models(self):
+        response = {'results': [make_link(1), make_link(2)]}
+        models = [Link.from_dict(make_link(1)), Link.from_dict(make_link(2))]
+        assert export.to_columns(response) == export.to_columns(models)
+
+    def test_consistent_schema(self):
+        data = export.to_columns([{'iid': '5', 'risk': 'low', 'unexpected': 1}])
+        assert list(data) == list(export.INDICATOR_COLUMNS)
+        assert data['iid'] == [5]
+        assert data['stamp_linked'] == [None]
+        assert export.to_columns([]) == dict((c, []) for c in export.INDICATOR_COLUMNS)
+
+    def test_nested_columns(self):
+        columns = ('iid', 'summary.properties.geo.country', 'summary.missing.key', 'summary')
+        data = export.to_columns([make_link(1)], columns)
+        assert data['summary.properties.geo.country'] == ['US']
+        assert data['summary.missing.key'] == [None]
+        assert data['summary'][0].startswith('{"properties"')
+
+    def test_batches(self):
+        batches = list(export.iter_columns((make_link(i) for i in range(10)), batch_size=4))
+        assert [len(batch['iid']) for batch in batches] == [4, 4, 2]
+
+    def test_streamed_links(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url) as pud:
+            data = export.to_columns(pud.feed.iter_links(1))
+        assert len(data['iid']) == 50
+
+
+class TestOptionalBackends:
+    def test_dataframe(self):
+        pd = pytest.importorskip('pandas')
+        df = export.to_dataframe([make_link(1), {'risk': 'low'}])
+        assert list(df.columns) == list(export.INDICATOR_COLUMNS)
+        assert str(df['iid'].dtype) == 'Int64'
+        assert pd.isna(df['iid'][1])
+
+    def test_arrow_and_parquet(self, tmp_path):
+        pytest.importorskip('pyarrow')
+        import pyarrow.parquet as pq
+        table = export.to_arrow([make_link(i) for i in range(10)], batch_size=3)
+        assert table.num_rows == 10
+        assert table.schema == export.schema()
+        path = str(tmp_path / 'links.parquet')
+        assert export.to_parquet((make_link(i) for i in range(10)), path, batch_size=3) == 10
+        assert pq.read_table(path).schema == export.schema()
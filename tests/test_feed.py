@@ -15,3 +15,11 @@ class TestFeed:
         assert 'iid' in result['results'][0]
 
 
+
+class TestIterLinks:
+    def test_feed_iter_links(self, stub, stub_pud):
+        results = [{'iid': str(i)} for i in range(10)]
+        stub.routes['info.php'] = lambda params: (200, {'results': results})
+        assert list(stub_pud.feed.iter_links(1)) == results
+        _, _, params, _ = stub.requests[0]
+        assert params['fid'] == '1'
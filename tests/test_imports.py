@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+
+import pytest
+import pulsedive
+
+HEAVY = ('requests', 'urllib3', 'httpx', 'aiohttp', 'sqlite3', 'concurrent.futures',
+         'email.utils', 'http.client', 'ssl')
+
+
+def loaded_after(code):
+    script = '{}\nimport json, sys\nprint(json.dumps(sorted(sys.modules)))'.format(code)
+    out = subprocess.check_output([sys.executable, '-c', script])
+    return set(json.loads(out.decode('utf-8')))
+
+
+class TestLazyImports:
+    def test_import_does_not_load_heavy_modules(self):
+        modules = loaded_after('import pulsedive\npulsedive.Pulsedive()')
+        assert not modules.intersection(HEAVY)
+
+    def test_first_request_loads_transport(self):
+        modules = loaded_after('import pulsedive\npulsedive.Pulsedive().transport')
+        assert 'requests' in modules
+
+
+class TestLazyClients:
+    def test_sub_clients_are_created_on_first_access(self):
+        pud = pulsedive.Pulsedive()
+        assert 'indicator' not in pud.__dict__
+        assert pud.indicator is pud.indicator
+        assert pud.indicator.pud is pud
+        assert 'threat' not in pud.__dict__
+
+    def test_transport_is_created_on_first_access(self, emulator):
+        pud = pulsedive.Pulsedive(base_url=emulator.url)
+        assert pud._transport is None
+        pud.indicator('1')
+        assert pud._transport is pud.transport
+        pud.close()
+
+    def test_close_unused_client(self):
+        pud = pulsedive.Pulsedive()
+        pud.close()
+        assert pud._transport is None
+        assert 'analyze' not in pud.__dict__
+
+    def test_unknown_transport_fails_early(self):
+        with pytest.raises(ValueError):
+            pulsedive.Pulsedive(transport='curl')
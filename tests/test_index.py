@@ -0,0 +1,68 @@
+import pytest
+from pulsedive.index import LocalIndex
+
+
+def link(iid, value, risk='high', type_='domain'):
+    return {'iid': str(iid), 'indicator': value, 'type': type_, 'risk': risk}
+
+
+@pytest.fixture
+def links(stub):
+    data = {
+        ('fid', '1'): [link(1, 'a.example'), link(2, 'b.example', 'low')],
+        ('fid', '2'): [link(2, 'b.example', 'low'), link(3, '10.0.0.1', 'critical', 'ip')],
+        ('tid', '7'): [link(1, 'a.example')],
+    }
+
+    def route(params):
+        key = ('fid', params['fid']) if 'fid' in params else ('tid', params['tid'])
+        return 200, {'results': data[key]}
+
+    stub.routes['info.php'] = route
+    return data
+
+
+@pytest.fixture
+def index(tmp_path, stub_pud):
+    index = LocalIndex(str(tmp_path / 'index.db'), stub_pud)
+    yield index
+    index.close()
+
+
+class TestLocalIndex:
+    def test_sync_and_lookup(self, links, index):
+        assert index.sync_feed(1) == 2
+        index.sync(feeds=[2], threats=[7])
+        assert len(index) == 3
+        entry = index.lookup('a.example')
+        assert entry.iid == 1
+        assert entry.risk == 'high'
+        assert entry.feeds == (1,)
+        assert entry.threats == (7,)
+        assert index.lookup('b.example').feeds == (1, 2)
+        assert index.risk('10.0.0.1') == 'critical'
+        assert 'c.example' not in index
+        assert index.lookup('c.example') is None
+
+    def test_resync_applies_changes(self, links, index):
+        index.sync(feeds=[1, 2])
+        links[('fid', '1')] = [link(2, 'b.example', 'medium'), link(4, 'd.example')]
+        links[('fid', '2')][0]['risk'] = 'medium'
+        index.resync()
+        assert 'a.example' not in index
+        assert index.lookup('d.example').feeds == (1,)
+        assert index.risk('b.example') == 'medium'
+        assert index.lookup('b.example').feeds == (1, 2)
+        assert [(kind, id, count) for kind, id, _, count in index.sources()] == [('feed', 1, 2), ('feed', 2, 2)]
+
+    def test_remove(self, links, index):
+        index.sync(feeds=[1, 2])
+        index.remove('feed', 2)
+        assert '10.0.0.1' not in index
+        assert index.lookup('b.example').feeds == (1,)
+
+    def test_persists(self, links, index, tmp_path):
+        index.sync(feeds=[1])
+        reopened = LocalIndex(str(tmp_path / 'index.db'))
+        assert reopened.lookup('a.example').feeds == (1,)
+        reopened.close()
@@ -47,3 +47,34 @@ class TestIndicator:
             pud.indicator.get()
 
 
+
+class TestIndicatorGetMany:
+    @staticmethod
+    def route(params):
+        if params.get('indicator') == 'unknown.example':
+            return 200, {'error': 'Indicator not found.'}
+        return 200, {'iid': params.get('iid', '0'), 'indicator': params.get('indicator', 'x')}
+
+    def test_ordered(self, stub, stub_pud):
+        stub.routes['info.php'] = self.route
+        values = ['d{}.example'.format(i) for i in range(30)]
+        results = list(stub_pud.indicator.get_many(values=values, iids=['1', '2'], max_workers=4))
+        assert [r.value for r in results[:30]] == values
+        assert [r.iid for r in results[30:]] == ['1', '2']
+        assert all(r.error is None for r in results)
+
+    def test_deduplicates(self, stub, stub_pud):
+        stub.routes['info.php'] = self.route
+        results = list(stub_pud.indicator.get_many(values=['a', 'b', 'a'], iids=[1, '1']))
+        assert len(results) == 3
+        assert len(stub.requests) == 3
+
+    def test_errors_are_captured(self, stub, stub_pud):
+        stub.routes['info.php'] = self.route
+        results = list(stub_pud.indicator.get_many(values=['a', 'unknown.example', 'b'], ordered=False))
+        assert sorted(r.value for r in results) == ['a', 'b', 'unknown.example']
+        failed = [r for r in results if r.error is not None]
+        assert len(failed) == 1
+        assert failed[0].value == 'unknown.example'
+        assert isinstance(failed[0].error, pulsedive.PulsediveException)
+        assert failed[0].result is None
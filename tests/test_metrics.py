@@ -0,0 +1,120 @@
+import pytest
+import requests
+import pulsedive
+from pulsedive.cache import MemoryCache
+from pulsedive.metrics import MetricsCollector, RequestEvent
+
+
+def info_route(params):
+    if params.get('indicator') == 'unknown.example':
+        return 200, {'error': 'Indicator not found.'}
+    if params.get('iid') == '500':
+        return 500, {}
+    return 200, {'iid': params.get('iid', '1')}
+
+
+@pytest.fixture
+def recorder(stub_pud, stub):
+    stub.routes['info.php'] = info_route
+    stub.routes['analyze.php'] = lambda params: (200, {'qid': 1})
+    events = []
+    for name in ('before_send', 'after_response', 'error'):
+        stub_pud.add_hook(name, lambda event, name=name: events.append((name, event)))
+    return events
+
+
+class TestHooks:
+    def test_success(self, stub_pud, recorder):
+        stub_pud.indicator('1')
+        assert [name for name, _ in recorder] == ['before_send', 'after_response']
+        event = recorder[1][1]
+        assert event.endpoint == 'info.php'
+        assert event.method == 'GET'
+        assert event.operation == 'indicator.get'
+        assert event.status == 200
+        assert event.bytes == len(b'{"iid": "1"}')
+        assert event.elapsed >= event.decode_time >= 0
+        assert event.error is None
+
+    def test_operation_names(self, stub_pud, recorder):
+        stub_pud.threat.links(1)
+        stub_pud.feed.get(fid=1)
+        stub_pud.analyze.results(1)
+        operations = [e.operation for name, e in recorder if name == 'after_response']
+        assert operations == ['threat.links', 'feed.get', 'analyze.results']
+
+    def test_stream_operation(self, stub, stub_pud, recorder):
+        stub.routes['info.php'] = lambda params: (200, {'results': [{'iid': '1'}]})
+        assert list(stub_pud.feed.iter_links(1)) == [{'iid': '1'}]
+        assert recorder[-1][1].operation == 'feed.iter_links'
+
+    def test_api_error(self, stub_pud, recorder):
+        with pytest.raises(pulsedive.PulsediveException):
+            stub_pud.indicator(value='unknown.example')
+        assert [name for name, _ in recorder] == ['before_send', 'after_response', 'error']
+        assert isinstance(recorder[-1][1].error, pulsedive.PulsediveException)
+
+    def test_http_error(self, stub_pud, recorder):
+        with pytest.raises(requests.HTTPError):
+            stub_pud.indicator('500')
+        assert [name for name, _ in recorder] == ['before_send', 'error']
+        assert recorder[-1][1].status == 500
+
+    def test_cache_outcome(self, stub):
+        stub.routes['info.php'] = info_route
+        with pulsedive.Pulsedive(base_url=stub.url, cache=MemoryCache()) as pud:
+            events = []
+            pud.add_hook('after_response', events.append)
+            pud.indicator('1')
+            pud.indicator('1')
+        assert [e.cache for e in events] == ['miss', 'hit']
+        assert events[1].status is None
+
+    def test_unknown_hook(self, stub_pud):
+        with pytest.raises(ValueError):
+            stub_pud.add_hook('on_send', print)
+
+    def test_remove_hook(self, stub_pud, stub):
+        stub.routes['info.php'] = info_route
+        events = []
+        stub_pud.add_hook('after_response', events.append)
+        stub_pud.remove_hook('after_response', events.append)
+        stub_pud.indicator('1')
+        assert events == []
+
+
+class TestMetricsCollector:
+    def test_histogram(self):
+        metrics = MetricsCollector(buckets=(0.1, 1))
+        for elapsed in (0.05, 0.1, 0.5, 2):
+            event = RequestEvent('info.php', 'GET', 'indicator.get')
+            event.status = 200
+            event.elapsed = elapsed
+            metrics.observe(event)
+        text = metrics.to_prometheus()
+        assert 'pulsedive_request_duration_seconds_bucket{endpoint="info.php",le="0.1"} 2' in text
+        assert 'pulsedive_request_duration_seconds_bucket{endpoint="info.php",le="1.0"} 3' in text
+        assert 'pulsedive_request_duration_seconds_bucket{endpoint="info.php",le="+Inf"} 4' in text
+        assert 'pulsedive_request_duration_seconds_count{endpoint="info.php"} 4' in text
+        assert ('pulsedive_requests_total{endpoint="info.php",operation="indicator.get",status="200"} 4'
+                in text)
+        assert metrics.throughput()['info.php'] > 0
+
+    def test_install(self, stub_pud, stub):
+        stub.routes['info.php'] = info_route
+        metrics = MetricsCollector().install(stub_pud)
+        stub_pud.indicator('1')
+        with pytest.raises(pulsedive.PulsediveException):
+            stub_pud.indicator(value='unknown.example')
+        text = metrics.to_prometheus()
+        assert 'pulsedive_request_duration_seconds_count{endpoint="info.php"} 2' in text
+        assert ('pulsedive_errors_total{endpoint="info.php",error="PulsediveException",'
+                'operation="indicator.get"} 1' in text)
+        assert 'pulsedive_response_bytes_total{endpoint="info.php"}' in text
+
+    def test_label_escaping(self):
+        metrics = MetricsCollector()
+        event = RequestEvent('a"b\\c', 'GET')
+        event.elapsed = 0.1
+        metrics.observe(event)
+        assert 'endpoint="a\\"b\\\\c"' in metrics.to_prometheus()
@@ -0,0 +1,101 @@
+import json
+import tracemalloc
+
+import pytest
+import pulsedive
+from pulsedive.models import Feed, Indicator, Link, SearchHit, Threat
+from pulsedive.testing import make_indicator, make_link
+
+
+class TestModels:
+    def test_round_trip(self):
+        data = make_link(7)
+        link = Link.from_dict(data)
+        assert link.iid == 7
+        assert link.value == 'host7.example'
+        assert link.risk == data['risk']
+        assert link.summary == data['summary']
+        expected = dict(data, iid=7)
+        assert link.to_dict() == expected
+
+    def test_sections_are_decoded_lazily(self):
+        ind = Indicator.from_dict(make_indicator(3))
+        assert isinstance(ind._properties, bytes)
+        assert ind.properties['dns']['NS'] == ['ns1.example', 'ns2.example']
+        assert isinstance(ind._properties, dict)
+        assert ind.comments == []
+
+    def test_strings_are_interned(self):
+        a = Link.from_dict(json.loads(json.dumps(make_link(1))))
+        b = Link.from_dict(json.loads(json.dumps(make_link(1))))
+        assert a.value is b.value
+        assert a.type is b.type
+
+    def test_item_access(self):
+        ind = Indicator.from_dict(dict(make_indicator(3), unknown_field='x'))
+        assert ind['indicator'] == 'host3.example'
+        assert ind['properties'] == ind.properties
+        assert ind['unknown_field'] == 'x'
+        assert ind.get('missing') is None
+        with pytest.raises(KeyError):
+            Link.from_dict(make_link(1))['missing']
+
+    def test_no_instance_dict(self):
+        for model in (Link, SearchHit, Indicator, Threat, Feed):
+            obj = model.from_dict({})
+            assert not hasattr(obj, '__dict__')
+
+    def test_memory(self):
+        data = json.dumps([make_link(i) for i in range(5000)])
+
+        def allocated(build):
+            tracemalloc.start()
+            result = build(json.loads(data))
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            assert len(result) == 5000
+            return size
+
+        as_dicts = allocated(lambda items: items)
+        as_models = allocated(lambda items: [Link.from_dict(item) for item in items])
+        # The models are built from the dicts, so subtract the dicts themselves
+        assert as_models - as_dicts < as_dicts / 2
+
+
+class TestClientModels:
+    @pytest.fixture
+    def model_pud(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url, models=True) as client:
+            yield client
+
+    def test_get(self, model_pud):
+        assert isinstance(model_pud.indicator(value='host7.example'), Indicator)
+        assert isinstance(model_pud.threat(1), Threat)
+        assert isinstance(model_pud.feed.get(1), Feed)
+
+    def test_links(self, model_pud):
+        links = model_pud.feed.links(1)['results']
+        assert len(links) == 50
+        assert all(isinstance(link, Link) for link in links)
+        assert all(isinstance(link, Link) for link in model_pud.threat.iter_links(1))
+        grouped = model_pud.indicator.links(7)
+        assert all(isinstance(link, Link) for link in grouped['Active DNS'])
+
+    def test_search(self, model_pud):
+        hits = list(model_pud.search.iter_indicators())
+        assert len(hits) == 120
+        assert all(isinstance(hit, SearchHit) for hit in hits)
+        assert all(isinstance(t, Threat) for t in model_pud.search.threat()['results'])
+
+    def test_per_call(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url) as pud:
+            assert isinstance(pud.indicator('1'), dict)
+            assert isinstance(pud.indicator('1', models=True), Indicator)
+
+    def test_cache_keeps_dicts(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url, cache=True) as pud:
+            pud.feed.links(1, models=True)
+            assert isinstance(pud.feed.links(1)['results'][0], dict)
+
+    def test_raw_is_not_converted(self, model_pud):
+        assert model_pud.indicator('1', raw=True).status_code == 200
@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+
+import pytest
+import pulsedive
+from pulsedive.pivot import PivotGraph
+from pulsedive.testing import StubServer
+
+
+class TestPivotGraph:
+    def test_edges_are_deduplicated(self):
+        graph = PivotGraph()
+        a = graph.add_node(('indicator', 1), 'host1.example')
+        b = graph.add_node(('threat', 2), 'Threat 2', 1)
+        assert graph.add_node(('threat', 2)) == b
+        assert graph.add_edge(a, b)
+        assert not graph.add_edge(b, a)
+        assert not graph.add_edge(a, a)
+        assert graph.edge_count == 1
+        assert graph.neighbors(('threat', 2)) == [('indicator', 1)]
+        assert list(graph.edges()) == [(('indicator', 1), ('threat', 2))]
+
+    def test_to_dict(self):
+        graph = PivotGraph()
+        graph.add_edge(graph.add_node(('indicator', 1), 'host1.example'),
+                       graph.add_node(('feed', 3), 'Feed 3', 1))
+        data = json.loads(json.dumps(graph.to_dict()))
+        assert data['nodes'][1] == {'kind': 'feed', 'id': 3, 'label': 'Feed 3', 'depth': 1}
+        assert data['edges'] == [[0, 1]]
+
+
+class TestPivotCrawler:
+    @pytest.fixture
+    def server(self):
+        with StubServer(links_size=50) as server:
+            yield server
+
+    def test_depth(self, server):
+        with pulsedive.Pulsedive(base_url=server.url) as pud:
+            graph = pud.pivot('host7.example', depth=2, fanout=10)
+        assert graph.nodes[0] == ('indicator', 7)
+        assert graph.labels[0] == 'host7.example'
+        assert sorted(graph.neighbors(('indicator', 7))) == [('feed', 8), ('threat', 8)]
+        assert graph.label(('threat', 8)) == 'Threat 8'
+        # Threat 8 and feed 8 link to the same 10 indicators in the stub
+        assert len(graph) == 1 + 2 + 10
+        assert graph.edge_count == 2 + 20
+        assert max(graph.depths) == 2
+        assert not graph.errors
+
+    def test_nodes_are_fetched_once(self, server):
+        with pulsedive.Pulsedive(base_url=server.url) as pud:
+            graph = pud.pivot(7, depth=4, fanout=5)
+        fetched = [(params.get('iid'), params.get('tid'), params.get('fid'))
+                   for _, _, params, _ in server.requests]
+        assert len(fetched) == len(set(fetched))
+        assert len(graph.to_dict()['edges']) == graph.edge_count > 0
+
+    def test_max_nodes(self, server):
+        with pulsedive.Pulsedive(base_url=server.url) as pud:
+            graph = pud.pivot(('threat', 1), depth=3, max_nodes=30)
+        assert len(graph) == 30
+        assert graph.nodes[0] == ('threat', 1)
+
+    def test_concurrent_fetches(self, server):
+        lock = threading.Lock()
+        running = [0, 0]
+        info = server.routes['info.php']
+
+        def slow_info(params):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return info(params)
+        server.routes['info.php'] = slow_info
+        with pulsedive.Pulsedive(base_url=server.url) as pud:
+            pud.pivot(('feed', 1), depth=2, fanout=8, max_workers=4)
+        assert running[1] > 1
+
+    def test_errors_are_kept(self, server):
+        info = server.routes['info.php']
+
+        def info_without_threats(params):
+            if 'tid' in params:
+                return 200, {'error': 'Threat not found.'}
+            return info(params)
+        server.routes['info.php'] = info_without_threats
+        with pulsedive.Pulsedive(base_url=server.url) as pud:
+            graph = pud.pivot(7, depth=2)
+        assert list(graph.errors) == [('threat', 8)]
+        assert ('threat', 8) in graph
+        assert len(graph.neighbors(('feed', 8))) > 1
@@ -1 +1,104 @@
-# TODO: Pulsedive Tests
+import threading
+import time
+
+import pytest
+import pulsedive
+
+
+def indicator_route(params):
+    return 200, {'iid': params.get('iid', '1'), 'indicator': 'afobal.cl'}
+
+
+class TestSession:
+    def test_connections_are_reused(self, stub, stub_pud):
+        stub.routes['info.php'] = indicator_route
+        stub_pud.indicator('1')
+        stub_pud.threat('1')
+        stub_pud.feed.links('1')
+        ports = set(address for _, _, _, address in stub.requests)
+        assert len(stub.requests) == 3
+        assert len(ports) == 1
+
+    def test_sub_clients_share_session(self, stub_pud):
+        for client in (stub_pud.indicator, stub_pud.threat, stub_pud.feed,
+                       stub_pud.search, stub_pud.analyze):
+            assert client.pud.session is stub_pud.session
+
+    def test_keep_alive_disabled(self, stub):
+        stub.routes['info.php'] = indicator_route
+        with pulsedive.Pulsedive(base_url=stub.url, keep_alive=False) as pud:
+            pud.indicator('1')
+            pud.indicator('2')
+        ports = set(address for _, _, _, address in stub.requests)
+        assert len(ports) == 2
+
+    def test_close_does_not_close_external_session(self, stub):
+        import requests
+        session = requests.Session()
+        closed = []
+        session.close = lambda: closed.append(True)
+        with pulsedive.Pulsedive(base_url=stub.url, session=session) as pud:
+            assert pud.session is session
+        assert not closed
+
+    def test_api_error_raises(self, stub, stub_pud):
+        stub.routes['info.php'] = lambda params: (200, {'error': 'Indicator not found.'})
+        with pytest.raises(pulsedive.PulsediveException):
+            stub_pud.indicator(value='unknown.example')
+
+
+class TestCoalescing:
+    @staticmethod
+    def run_concurrently(fn, n=10):
+        results, errors = [], []
+
+        def work():
+            try:
+                results.append(fn())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results, errors
+
+    @staticmethod
+    def slow(body):
+        def route(params):
+            time.sleep(0.2)
+            return 200, body
+        return route
+
+    def test_identical_requests_share_one_call(self, stub):
+        stub.routes['info.php'] = self.slow({'iid': '1'})
+        with pulsedive.Pulsedive(base_url=stub.url, coalesce=True) as pud:
+            results, errors = self.run_concurrently(lambda: pud.indicator(value='afobal.cl'))
+            assert pud.stats()['coalesced'] == 9
+        assert results == [{'iid': '1'}] * 10
+        assert not errors
+        assert len(stub.requests) == 1
+
+    def test_errors_are_shared(self, stub):
+        stub.routes['info.php'] = self.slow({'error': 'Indicator not found.'})
+        with pulsedive.Pulsedive(base_url=stub.url, coalesce=True) as pud:
+            results, errors = self.run_concurrently(lambda: pud.indicator(value='unknown.example'))
+        assert len(errors) == 10
+        assert all(isinstance(e, pulsedive.PulsediveException) for e in errors)
+        assert len(stub.requests) == 1
+
+    def test_different_requests_are_not_coalesced(self, stub):
+        stub.routes['info.php'] = self.slow({'iid': '1'})
+        counter = iter(range(100))
+        with pulsedive.Pulsedive(base_url=stub.url, coalesce=True) as pud:
+            self.run_concurrently(lambda: pud.indicator(next(counter)), n=4)
+            assert pud.stats()['coalesced'] == 0
+        assert len(stub.requests) == 4
+
+    def test_disabled_by_default(self, stub):
+        stub.routes['info.php'] = self.slow({'iid': '1'})
+        with pulsedive.Pulsedive(base_url=stub.url) as pud:
+            self.run_concurrently(lambda: pud.indicator('1'), n=3)
+        assert len(stub.requests) == 3
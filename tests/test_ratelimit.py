@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+import requests
+import pulsedive
+from pulsedive.ratelimit import Retry, TokenBucket, get_bucket, parse_retry_after
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class TestTokenBucket:
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=50, burst=5)
+        start = time.monotonic()
+        waits = [bucket.acquire() for _ in range(10)]
+        assert waits[:5] == [0, 0, 0, 0, 0]
+        assert time.monotonic() - start >= 0.09
+
+    def test_shared_between_threads(self):
+        bucket = TokenBucket(rate=100, burst=1)
+        start = time.monotonic()
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(11)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert time.monotonic() - start >= 0.09
+
+    def test_pause(self):
+        bucket = TokenBucket(rate=1000)
+        bucket.pause(0.05)
+        assert bucket.acquire() > 0.04
+
+    def test_per_api_key(self):
+        assert get_bucket('key-a', 5) is get_bucket('key-a', 5.0)
+        assert get_bucket('key-a', 5) is not get_bucket('key-b', 5)
+
+    def test_conflicting_rates(self):
+        get_bucket('key-a', 5)
+        with pytest.raises(pulsedive.PulsediveException):
+            get_bucket('key-a', 10)
+        with pytest.raises(pulsedive.PulsediveException):
+            pulsedive.Pulsedive('key-a', rate_limit=10)
+
+
+class TestRetry:
+    def test_parse_retry_after(self):
+        assert parse_retry_after('3') == 3
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('soon') is None
+        assert 0 <= parse_retry_after('Thu, 01 Jan 1970 00:00:00 GMT') <= 1
+
+    def test_delay(self):
+        retry = Retry(total=2, backoff_factor=1, max_backoff=10)
+        assert retry.delay(0, FakeResponse(200)) is None
+        assert retry.delay(0, FakeResponse(404)) is None
+        assert 0 <= retry.delay(1, FakeResponse(503)) <= 2
+        assert retry.delay(2, FakeResponse(503)) is None
+        assert retry.delay(0, FakeResponse(429, {'Retry-After': '4'})) == 4
+        assert retry.delay(0, FakeResponse(429, {'Retry-After': '40'})) is None
+        assert retry.delay(0, FakeResponse(503), 'POST') is None
+        assert retry.delay(0, FakeResponse(429, {'Retry-After': '4'}), 'POST') == 4
+
+
+class TestClientRetry:
+    def test_retries_until_success(self, stub):
+        statuses = [503, 429, 200]
+
+        def route(params):
+            status = statuses.pop(0)
+            return status, {'iid': '1'}, {'Retry-After': '0'}
+
+        stub.routes['info.php'] = route
+        with pulsedive.Pulsedive(base_url=stub.url, retry=Retry(backoff_factor=0.01)) as pud:
+            assert pud.indicator('1') == {'iid': '1'}
+            stats = pud.stats()
+        assert stats['requests'] == 3
+        assert stats['retries'] == 2
+
+    def test_gives_up(self, stub):
+        stub.routes['info.php'] = lambda params: (503, {})
+        with pulsedive.Pulsedive(base_url=stub.url, retry=Retry(total=2, backoff_factor=0.01)) as pud:
+            with pytest.raises(requests.HTTPError):
+                pud.indicator('1')
+            assert pud.stats()['requests'] == 3
+            assert pud.stats()['retry_time'] > 0
+
+    def test_post_is_not_retried_on_server_errors(self, stub):
+        stub.routes['analyze.php'] = lambda params: (502, {})
+        with pulsedive.Pulsedive(base_url=stub.url, retry=Retry(backoff_factor=0.01)) as pud:
+            with pytest.raises(requests.HTTPError):
+                pud.analyze('pulsedive.com')
+        assert len(stub.requests) == 1
+
+    def test_no_retry_by_default(self, stub):
+        stub.routes['info.php'] = lambda params: (503, {})
+        with pulsedive.Pulsedive(base_url=stub.url) as pud:
+            with pytest.raises(requests.HTTPError):
+                pud.indicator('1')
+        assert len(stub.requests) == 1
+
+    def test_rate_limit(self, stub):
+        stub.routes['info.php'] = lambda params: (200, {'iid': '1'})
+        # Tokens are 50ms apart so the waits do not depend on the latency of requests
+        bucket = TokenBucket(rate=20, burst=1)
+        with pulsedive.Pulsedive(base_url=stub.url, rate_limit=bucket) as pud:
+            for _ in range(4):
+                pud.indicator('1')
+            assert pud.stats()['throttled_time'] > 0.03
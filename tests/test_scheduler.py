@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+import pulsedive
+from pulsedive.metrics import MetricsCollector
+from pulsedive.scheduler import PriorityScheduler
+
+
+def wait_queued(scheduler, n):
+    deadline = time.monotonic() + 5
+    while sum(q['queued'] for q in scheduler.stats()['queues'].values()) < n:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def start(scheduler, priority, order):
+    def run():
+        scheduler.acquire(priority)
+        order.append(priority)
+        scheduler.release()
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+class TestPriorityScheduler:
+    def test_priority_order(self):
+        scheduler = PriorityScheduler(concurrency=1)
+        order = []
+        scheduler.acquire()
+        threads = [start(scheduler, 'bulk', order)]
+        wait_queued(scheduler, 1)
+        threads.append(start(scheduler, 'normal', order))
+        wait_queued(scheduler, 2)
+        threads.append(start(scheduler, 'interactive', order))
+        wait_queued(scheduler, 3)
+        scheduler.release()
+        for thread in threads:
+            thread.join()
+        assert order == ['interactive', 'normal', 'bulk']
+
+    def test_aging(self):
+        scheduler = PriorityScheduler(concurrency=1, aging=0.05)
+        order = []
+        scheduler.acquire()
+        threads = [start(scheduler, 'bulk', order)]
+        wait_queued(scheduler, 1)
+        time.sleep(0.15)
+        threads.append(start(scheduler, 'interactive', order))
+        wait_queued(scheduler, 2)
+        scheduler.release()
+        for thread in threads:
+            thread.join()
+        assert order == ['bulk', 'interactive']
+
+    def test_stats(self):
+        scheduler = PriorityScheduler(concurrency=1)
+        order = []
+        scheduler.acquire('interactive')
+        thread = start(scheduler, 'bulk', order)
+        wait_queued(scheduler, 1)
+        assert scheduler.stats()['queues']['bulk']['queued'] == 1
+        time.sleep(0.02)
+        scheduler.release()
+        thread.join()
+        stats = scheduler.stats()
+        assert stats['active'] == 0
+        assert stats['queues']['bulk']['granted'] == 1
+        assert stats['queues']['bulk']['max_queued'] == 1
+        assert stats['queues']['bulk']['max_wait'] >= 0.02
+        assert stats['queues']['interactive']['wait_time'] == 0
+
+    def test_unknown_priority(self):
+        with pytest.raises(ValueError):
+            PriorityScheduler().acquire('urgent')
+        with pytest.raises(ValueError):
+            PriorityScheduler(priorities=('high', 'low'), default='normal')
+        assert PriorityScheduler(priorities=('high', 'low')).default == 'low'
+
+
+class TestClientScheduler:
+    def test_concurrency(self, stub):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def info(params):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return 200, {'iid': params['iid']}
+        stub.routes['info.php'] = info
+
+        events = []
+        with pulsedive.Pulsedive(base_url=stub.url, scheduler=2) as pud:
+            pud.add_hook('after_response', events.append)
+            results = list(pud.indicator.get_many(iids=range(1, 9), priority='bulk'))
+            stats = pud.stats()['scheduler']
+        assert all(res.error is None for res in results)
+        assert running[1] == 2
+        assert stats['queues']['bulk']['granted'] == 8
+        assert stats['queues']['bulk']['max_queued'] > 0
+        assert all(event.priority == 'bulk' for event in events)
+        assert sum(event.queue_time for event in events) > 0
+
+    def test_default_priority(self, emulator):
+        events = []
+        with pulsedive.Pulsedive(base_url=emulator.url, scheduler=True) as pud:
+            pud.add_hook('after_response', events.append)
+            pud.feed.get(1)
+            with pytest.raises(ValueError):
+                pud.feed.get(1, priority='urgent')
+        assert events[0].priority == 'normal'
+        assert events[0].queue_time == 0
+
+    def test_without_scheduler(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url) as pud:
+            assert pud.feed.get(1, priority='interactive')['fid'] == '1'
+            assert 'scheduler' not in pud.stats()
+
+    def test_metrics(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url, scheduler=2) as pud:
+            metrics = MetricsCollector().install(pud)
+            pud.feed.get(1, priority='interactive')
+            text = metrics.to_prometheus()
+        assert 'pulsedive_scheduled_total{priority="interactive"} 1' in text
+        assert 'pulsedive_scheduler_queue_depth{priority="bulk"} 0' in text
+        assert 'pulsedive_scheduler_active 0' in text
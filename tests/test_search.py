@@ -1,3 +1,9 @@
+import time
+
+import pytest
+import pulsedive
+
+
 # TODO: Finish Search Tests
 class TestSearch:
     def test_call(self, pud):
@@ -27,3 +33,48 @@ class TestSearch:
         assert not isinstance(result, dict)
 
 
+
+class TestIterIndicators:
+    @staticmethod
+    def paged_route(pages, page_size=3):
+        def route(params):
+            current = int(params.get('page', 0))
+            body = {
+                'page_current': current,
+                'results': [{'iid': str(current * page_size + i)} for i in range(page_size)]
+            }
+            if current + 1 < pages:
+                body['page_next'] = current + 1
+            return 200, body
+        return route
+
+    def test_walks_all_pages(self, stub, stub_pud):
+        stub.routes['search.php'] = self.paged_route(4)
+        results = list(stub_pud.search.iter_indicators('zeus'))
+        assert [r['iid'] for r in results] == [str(i) for i in range(12)]
+        pages = [params.get('page') for _, _, params, _ in stub.requests]
+        assert sorted(pages) == ['0', '1', '2', '3']
+        assert all('limit' not in params for _, _, params, _ in stub.requests)
+
+    def test_without_prefetch(self, stub, stub_pud):
+        stub.routes['search.php'] = self.paged_route(2)
+        results = list(stub_pud.search.iter_indicators(prefetch=False))
+        assert len(results) == 6
+
+    def test_prefetches_next_page(self, stub, stub_pud):
+        stub.routes['search.php'] = self.paged_route(5)
+        iterator = stub_pud.search.iter_indicators()
+        next(iterator)
+        time.sleep(0.1)
+        assert len(stub.requests) == 2
+        iterator.close()
+        assert len(stub.requests) == 2
+
+    def test_single_page(self, stub, stub_pud):
+        stub.routes['search.php'] = lambda params: (200, {'page_current': 0, 'results': [{'iid': '1'}]})
+        assert list(stub_pud.search.iter_indicators()) == [{'iid': '1'}]
+        assert len(stub.requests) == 1
+
+    def test_export_not_supported(self, stub_pud):
+        with pytest.raises(pulsedive.PulsediveException):
+            list(stub_pud.search.iter_indicators(export=True))
@@ -0,0 +1,90 @@
+import os
+import tracemalloc
+
+import pytest
+import pulsedive
+from pulsedive.exceptions import PulsediveException
+from pulsedive.snapshots import SnapshotStore, diff_sorted
+from pulsedive.testing import make_link
+
+
+def links(iids):
+    return ({'iid': str(iid), 'indicator': 'host{}.example'.format(iid)} for iid in iids)
+
+
+class TestSnapshotStore:
+    def test_diff_sorted(self):
+        added, removed = diff_sorted([1, 3, 5, 7], [2, 3, 7, 8, 9])
+        assert list(added) == [2, 8, 9]
+        assert list(removed) == [1, 5]
+        assert [list(a) for a in diff_sorted([], [])] == [[], []]
+
+    def test_first_and_next_snapshots(self, tmp_path):
+        store = SnapshotStore(str(tmp_path), run_size=7)
+        first = store.diff(1, links([5, 3, 9, 3, 1] + list(range(100, 130))))
+        assert first.previous is None and first.since is None
+        assert first.current == 34
+        assert len(first.added) == 34
+
+        second = store.diff(1, links([9, 1, 2] + list(range(110, 140))))
+        assert sorted(link['iid'] for link in second.added) == \
+            ['130', '131', '132', '133', '134', '135', '136', '137', '138', '139', '2']
+        assert list(second.removed) == [3, 5] + list(range(100, 110))
+        assert second.previous == 34 and second.current == 33
+        assert second.since is not None
+
+        with store.load(1) as snapshot:
+            assert list(snapshot) == [1, 2, 9] + list(range(110, 140))
+            assert 110 in snapshot and 3 not in snapshot
+
+    def test_without_update(self, tmp_path):
+        store = SnapshotStore(str(tmp_path))
+        store.diff(1, links([1, 2]))
+        assert len(store.diff(1, links([3]), update=False).added) == 1
+        assert len(store.diff(1, links([3])).added) == 1
+        assert os.listdir(str(tmp_path)) == ['feed-1.snap']
+
+    def test_failed_diff_keeps_snapshot(self, tmp_path):
+        store = SnapshotStore(str(tmp_path))
+        store.diff(1, links([1, 2]))
+
+        def broken():
+            yield {'iid': '3'}
+            raise ValueError()
+        with pytest.raises(ValueError):
+            store.diff(1, broken())
+        assert os.listdir(str(tmp_path)) == ['feed-1.snap']
+        with store.load(1) as snapshot:
+            assert list(snapshot) == [1, 2]
+
+    def test_memory_follows_delta(self, tmp_path):
+        store = SnapshotStore(str(tmp_path), run_size=4096)
+        size = 100000
+        store.diff(1, links(range(size)))
+
+        tracemalloc.start()
+        diff = store.diff(1, links(range(10, size + 10)))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert len(diff.added) == 10 and len(diff.removed) == 10
+        # A list of the IDs alone would take more than 8 bytes per indicator
+        assert peak < size * 8
+
+
+class TestSnapshotDiff:
+    def test_diff(self, stub, tmp_path):
+        versions = [range(1, 6), range(3, 9)]
+        stub.routes['info.php'] = lambda params: (
+            200, {'results': [make_link(iid) for iid in versions[0]]})
+        with pulsedive.Pulsedive(base_url=stub.url, snapshots=str(tmp_path)) as pud:
+            assert len(pud.feed.diff(1).added) == 5
+            versions.pop(0)
+            diff = pud.feed.diff(1)
+        assert [link['indicator'] for link in diff.added] == \
+            ['host6.example', 'host7.example', 'host8.example']
+        assert list(diff.removed) == [1, 2]
+
+    def test_requires_store(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url) as pud:
+            with pytest.raises(PulsediveException):
+                pud.feed.diff(1)
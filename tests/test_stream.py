@@ -0,0 +1,61 @@
+import json
+
+import pytest
+import pulsedive
+from pulsedive.stream import iter_json_array
+
+
+def chunked(data, size):
+    data = data.encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestIterJsonArray:
+    doc = {
+        'page_current': 0,
+        'results': [{'iid': i, 'indicator': 'd{}.example'.format(i), 'risk': 1.5 * i,
+                     'tags': ['a', {'b': None}], 'note': 'café ☃ "q" \\\\'}
+                    for i in range(50)],
+        'page_next': 12345,
+    }
+
+    @pytest.mark.parametrize('size', [1, 2, 7, 64, 100000])
+    def test_chunk_sizes(self, size):
+        text = json.dumps(self.doc, ensure_ascii=False, indent=2)
+        assert list(iter_json_array(chunked(text, size))) == self.doc['results']
+
+    def test_scalar_elements(self):
+        text = '{"results": [1, 22, 333, true, null, "x", 4.5e3]}'
+        assert list(iter_json_array(chunked(text, 1))) == [1, 22, 333, True, None, 'x', 4500.0]
+
+    def test_empty_and_missing(self):
+        assert list(iter_json_array([b'{"results": []}'])) == []
+        assert list(iter_json_array([b'{}'])) == []
+        assert list(iter_json_array([b'{"other": [1, 2]}'])) == []
+
+    def test_other_key(self):
+        assert list(iter_json_array([b'{"a": [1], "b": [2, 3]}'], key='b')) == [2, 3]
+
+    def test_error(self):
+        with pytest.raises(pulsedive.PulsediveException):
+            list(iter_json_array([b'{"error": "Threat not found."}']))
+
+    def test_truncated(self):
+        with pytest.raises(ValueError):
+            list(iter_json_array(chunked('{"results": [{"iid": 1}, {"iid"', 4)))
+
+    def test_buffer_is_bounded(self):
+        from pulsedive.stream import _Buffer
+        item = (json.dumps({'iid': 1, 'indicator': 'x' * 100}) + ',').encode('utf-8')
+        buf = _Buffer([b'{"results": ['] + [item] * 2000 + [b'1]}'], 'utf-8')
+        decoder = json.JSONDecoder()
+        buf.expect('{')
+        buf.value(decoder)
+        buf.expect(':')
+        buf.expect('[')
+        sizes = []
+        for _ in range(2000):
+            buf.value(decoder)
+            buf.expect(',')
+            sizes.append(len(buf.text))
+        assert max(sizes) < 4 * len(item)
@@ -0,0 +1,74 @@
+import importlib.util
+import os
+import time
+
+import pytest
+import pulsedive
+from pulsedive.testing import StubServer
+
+
+def load_benchmarks():
+    path = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'bench_client.py')
+    spec = importlib.util.spec_from_file_location('bench_client', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestEmulator:
+    def test_indicator(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url) as pud:
+            ind = pud.indicator(value='host7.example')
+            assert ind['iid'] == '7'
+            assert ind['indicator'] == 'host7.example'
+            assert 'dns' in pud.indicator.properties('7')
+            with pytest.raises(pulsedive.PulsediveException):
+                pud.indicator(value='unknown.invalid')
+
+    def test_links(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url) as pud:
+            assert len(pud.feed.links(1)['results']) == 50
+            assert len(list(pud.threat.iter_links(1))) == 50
+
+    def test_search_pages(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url) as pud:
+            results = list(pud.search.iter_indicators())
+        assert [int(r['iid']) for r in results] == list(range(1, 121))
+
+    def test_search_export(self, emulator, tmp_path):
+        filename = str(tmp_path / 'out.csv')
+        with pulsedive.Pulsedive(base_url=emulator.url) as pud:
+            pud.search.to_csv(filename=filename, limit=None)
+        with open(filename) as f:
+            assert len(f.readlines()) == 121
+
+    def test_analyze(self, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url) as pud:
+            qid = pud.analyze('host3.example')['qid']
+            assert pud.analyze.results(qid)['status'] == 'processing'
+            time.sleep(0.1)
+            assert pud.analyze.results(qid)['data']['iid'] == '3'
+
+    def test_error_rate(self):
+        with StubServer(error_rate=1, routes={}) as server:
+            with pulsedive.Pulsedive(base_url=server.url) as pud:
+                with pytest.raises(Exception):
+                    pud.indicator('1')
+
+
+class TestBenchmarks:
+    def test_quick_run(self):
+        bench = load_benchmarks()
+        results = bench.run(['single_lookup', 'links_stream'], quick=True)
+        assert set(results) == {'single_lookup', 'links_stream'}
+        assert results['links_stream']['ops'] == 2000
+        assert results['single_lookup']['requests'] == 50
+        assert results['single_lookup']['p99'] >= results['single_lookup']['p50'] > 0
+
+    def test_compare(self):
+        bench = load_benchmarks()
+        baseline = {'links': {'throughput': 100.0, 'p99': 0.1, 'peak_kb': 1000.0}}
+        same = {'links': {'throughput': 95.0, 'p99': 0.11, 'peak_kb': 1100.0}}
+        worse = {'links': {'throughput': 50.0, 'p99': 0.2, 'peak_kb': 2000.0}}
+        assert bench.compare(same, baseline, 0.2) == []
+        assert len(bench.compare(worse, baseline, 0.2)) == 3
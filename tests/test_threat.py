@@ -46,3 +46,17 @@ class TestThreat:
             pud.threat.get()
 
 
+
+class TestIterLinks:
+    def test_threat_iter_links(self, stub, stub_pud):
+        results = [{'iid': str(i), 'indicator': 'd{}.example'.format(i)} for i in range(100)]
+        stub.routes['info.php'] = lambda params: (200, {'results': results})
+        assert list(stub_pud.threat.iter_links(1)) == results
+        _, _, params, _ = stub.requests[0]
+        assert params['tid'] == '1'
+        assert params['get'] == 'links'
+
+    def test_threat_iter_links_error(self, stub, stub_pud):
+        stub.routes['info.php'] = lambda params: (200, {'error': 'Threat not found.'})
+        with pytest.raises(pulsedive.PulsediveException):
+            list(stub_pud.threat.iter_links(1))
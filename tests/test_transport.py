@@ -0,0 +1,154 @@
+import json
+
+import pytest
+import pulsedive
+from pulsedive.transport import (Headers, HTTPXTransport, RecordReplayTransport,
+                                 RequestsTransport, Urllib3Transport, get_transport)
+
+TRANSPORTS = ['requests', 'urllib3']
+
+
+def echo_route(params):
+    return 200, {'params': params}
+
+
+class TestTransports:
+    @pytest.fixture(params=TRANSPORTS)
+    def transport_pud(self, request, emulator):
+        with pulsedive.Pulsedive(base_url=emulator.url, transport=request.param) as client:
+            yield client
+
+    def test_get(self, transport_pud):
+        assert transport_pud.indicator(value='host7.example')['iid'] == '7'
+
+    def test_api_error(self, transport_pud):
+        with pytest.raises(pulsedive.PulsediveException):
+            transport_pud.indicator(value='unknown.invalid')
+
+    def test_post(self, transport_pud):
+        assert 'qid' in transport_pud.analyze('host1.example')
+
+    def test_stream(self, transport_pud):
+        assert len(list(transport_pud.feed.iter_links(1))) == 50
+
+    def test_to_csv(self, transport_pud, tmp_path):
+        filename = str(tmp_path / 'out.csv')
+        transport_pud.search.to_csv(filename=filename, limit=None)
+        with open(filename) as f:
+            assert len(f.readlines()) == 121
+
+    @pytest.mark.parametrize('name', TRANSPORTS)
+    def test_list_params(self, stub, name):
+        stub.routes['search.php'] = echo_route
+        with pulsedive.Pulsedive(base_url=stub.url, transport=name) as pud:
+            pud.search.indicator(risk=['high', 'critical'])
+        _, _, params, _ = stub.requests[0]
+        assert params['risk[]'] == ['high', 'critical']
+
+    @pytest.mark.parametrize('name', TRANSPORTS)
+    def test_connections_are_reused(self, emulator, name):
+        with pulsedive.Pulsedive(base_url=emulator.url, transport=name) as pud:
+            for i in range(3):
+                pud.indicator(i + 1)
+        assert len(set(address for _, _, _, address in emulator.requests)) == 1
+
+    @pytest.mark.parametrize('name', TRANSPORTS)
+    def test_retry_after_http_error(self, stub, name):
+        calls = []
+
+        def route(params):
+            calls.append(params)
+            return (503, {'error': 'down'}, {'Retry-After': '0'}) if len(calls) == 1 else (200, {'iid': '1'})
+
+        stub.routes['info.php'] = route
+        with pulsedive.Pulsedive(base_url=stub.url, transport=name, retry=1) as pud:
+            assert pud.indicator('1') == {'iid': '1'}
+
+    def test_http_error(self, stub):
+        stub.routes['info.php'] = lambda params: (500, {})
+        with pulsedive.Pulsedive(base_url=stub.url, transport='urllib3') as pud:
+            with pytest.raises(pulsedive.PulsediveException):
+                pud.indicator('1')
+
+    def test_external_transport_is_not_closed(self, emulator):
+        transport = Urllib3Transport()
+        with pulsedive.Pulsedive(base_url=emulator.url, transport=transport) as pud:
+            pud.indicator('1')
+        closed = []
+        transport.close = lambda: closed.append(True)
+        pud.close()
+        assert not closed
+
+    def test_session_is_exposed(self):
+        with pulsedive.Pulsedive() as pud:
+            assert isinstance(pud.transport, RequestsTransport)
+            assert pud.session is pud.transport.session
+        with pulsedive.Pulsedive(transport='urllib3') as pud:
+            assert pud.session is None
+
+    def test_unknown_transport(self):
+        with pytest.raises(ValueError):
+            get_transport('curl')
+
+    def test_httpx(self, emulator):
+        pytest.importorskip('httpx')
+        with pulsedive.Pulsedive(base_url=emulator.url, transport=HTTPXTransport(http2=False)) as pud:
+            assert pud.indicator(value='host7.example')['iid'] == '7'
+            assert len(list(pud.feed.iter_links(1))) == 50
+
+    def test_headers_are_case_insensitive(self):
+        headers = Headers({'Retry-After': '1'})
+        assert headers['retry-after'] == '1'
+        assert headers.get('RETRY-AFTER') == '1'
+        assert 'retry-after' in headers
+
+
+class TestRecordReplay:
+    def workload(self, pud):
+        return [pud.indicator(value='host7.example'),
+                pud.feed.links(1),
+                list(pud.threat.iter_links(2)),
+                pud.analyze('host3.example')]
+
+    def test_round_trip(self, emulator, tmp_path):
+        path = str(tmp_path / 'traffic.jsonl')
+        with pulsedive.Pulsedive(api_key='secret', base_url=emulator.url,
+                                 transport=RecordReplayTransport(path, mode='record')) as pud:
+            recorded = self.workload(pud)
+            pud.transport.close()
+        sent = len(emulator.requests)
+
+        with pulsedive.Pulsedive(api_key='secret', base_url=emulator.url,
+                                 transport=RecordReplayTransport(path)) as pud:
+            assert self.workload(pud) == recorded
+        assert len(emulator.requests) == sent
+
+        with open(path) as f:
+            assert 'secret' not in f.read()
+
+    def test_replay_missing_raises(self, tmp_path):
+        path = tmp_path / 'traffic.jsonl'
+        path.write_text('')
+        with pulsedive.Pulsedive(transport=RecordReplayTransport(str(path))) as pud:
+            with pytest.raises(pulsedive.PulsediveException):
+                pud.indicator('1')
+
+    def test_responses_are_served_in_order(self, tmp_path):
+        path = tmp_path / 'traffic.jsonl'
+        key = RecordReplayTransport._key('GET', 'https://pulsedive.com/api/analyze.php',
+                                         {'qid': 1, 'pretty': 0, 'sanitize': 1})
+        lines = [{'key': key, 'status': 200, 'headers': {}, 'text': json.dumps(body)}
+                 for body in ({'status': 'processing'}, {'status': 'done'})]
+        path.write_text(''.join(json.dumps(line) + '\n' for line in lines))
+        with pulsedive.Pulsedive(transport=RecordReplayTransport(str(path))) as pud:
+            statuses = [pud.analyze.results(1)['status'] for _ in range(3)]
+        assert statuses == ['processing', 'done', 'done']
+
+    def test_auto_records_only_new_requests(self, emulator, tmp_path):
+        path = str(tmp_path / 'traffic.jsonl')
+        for _ in range(2):
+            transport = RecordReplayTransport(path, mode='auto')
+            with pulsedive.Pulsedive(base_url=emulator.url, transport=transport) as pud:
+                pud.indicator('1')
+            transport.close()
+        assert len(emulator.requests) == 1
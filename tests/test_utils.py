@@ -0,0 +1,40 @@
+from pulsedive.testing import make_indicator
+from pulsedive.utils import flatten
+
+
+def recursive_flatten(value, prefix=''):
+    if isinstance(value, list):
+        ret = {}
+        for idx, e in enumerate(value):
+            ret.update(recursive_flatten(e, prefix='{}[{}]'.format(prefix, idx)))
+        return ret
+    if isinstance(value, dict):
+        ret = {}
+        for field, e in value.items():
+            ret.update(recursive_flatten(e, prefix='{}[{}]'.format(prefix, field)))
+        return ret
+    return {prefix: value}
+
+
+class TestFlatten:
+    def test_same_as_recursive(self):
+        payload = make_indicator(42)
+        flat = flatten(payload)
+        assert flat == recursive_flatten(payload)
+        assert list(flat) == list(recursive_flatten(payload))
+
+    def test_keys(self):
+        assert flatten({'a': {'b': [1, {'c': 2}]}, 'd': [], 'e': None}) == {
+            '[a][b][0]': 1, '[a][b][1][c]': 2, '[e]': None}
+        assert flatten(3) == {'': 3}
+
+    def test_separator(self):
+        assert flatten({'a': {'b': [1, 2]}}, sep='.') == {'a.b.0': 1, 'a.b.1': 2}
+
+    def test_deep(self):
+        value = 'leaf'
+        for _ in range(5000):
+            value = {'x': value}
+        flat = flatten(value, sep='.')
+        assert list(flat.values()) == ['leaf']
+        assert list(flat)[0].count('x') == 5000